@@ -0,0 +1,52 @@
+# -*- coding: utf-8
+"""
+Benchmarks for parkrundata. Run them from the repository root, eg::
+
+    python -m benchmarks.serialization
+"""
+import os
+
+import django
+
+
+def setup(database=None):
+    """
+    Configures Django with the test settings and an empty database, in
+    memory unless a `database` file is given.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+    if database is not None:
+        from django.conf import settings
+        settings.DATABASES["default"]["NAME"] = database
+    django.setup()
+
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+
+
+def seed(events, countries=20):
+    """Replaces all Countries and Events with a synthetic catalogue."""
+    from parkrundata import stats
+    from parkrundata.models import Country, Event
+
+    Event.objects.all().delete()
+    Country.objects.all().delete()
+    Country.objects.bulk_create([
+        Country(name="Country %d" % i, url="http://www.parkrun%d.org" % i)
+        for i in range(countries)
+    ])
+    country_ids = list(Country.objects.values_list("id", flat=True))
+    Event.objects.bulk_create((
+        Event(
+            country_id=country_ids[i % countries],
+            name="Event %d" % i,
+            slug="event%d" % i,
+            is_juniors=not i % 5,
+            is_restricted=not i % 17,
+            is_discontinued=not i % 23,
+            latitude="%.6f" % ((i * 0.7919) % 180 - 90),
+            longitude="%.6f" % ((i * 1.3117) % 360 - 180),
+        ) for i in range(events)
+    ), batch_size=2000)
+    # bulk_create() skips the signals that keep CountryEventStats counted
+    stats.rebuild()
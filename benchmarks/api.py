@@ -0,0 +1,230 @@
+# -*- coding: utf-8
+"""
+Measures latency, throughput, query counts and peak memory of the
+parkrundata endpoints and serializers over synthetic catalogues.
+
+    python -m benchmarks.api [--scales 100 10000] [--huge] [--output run.json]
+                             [--baseline previous.json] [--threshold 0.2]
+                             [--cache] [--snapshot]
+
+By default it runs at 100 and 10,000 events. --huge adds a run at
+1,000,000, the scale where unindexed lookups and offset pagination show
+up, but seeding that takes minutes, so it's opt-in.
+
+Results are written as JSON. With --baseline, any scenario whose median
+latency grew by more than --threshold (a fraction) or which makes more
+queries than in the baseline is reported and the exit status is 1.
+"""
+import argparse
+import base64
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from benchmarks import seed, setup
+
+
+# Opt-in with --huge
+HUGE = 1000000
+
+
+def scenarios(client, scale):
+    """Returns (name, callable) pairs, each making one request or call."""
+    from django.contrib.auth import get_user_model
+    from rest_framework.renderers import JSONRenderer
+    from parkrundata.fastpath import FastRepresentation
+    from parkrundata.models import Country, Event
+    from parkrundata.serializers import EventSerializer
+
+    user, _ = get_user_model().objects.get_or_create(username="benchmark")
+    writer = client.__class__()
+    writer.force_authenticate(user=user)
+
+    event = Event.objects.order_by("id")[scale // 2]
+    country = Country.objects.first()
+    last_id = Event.objects.order_by("-id").values_list("id", flat=True)[0]
+    deep_cursor = base64.b64encode(
+        urlencode({"p": max(last_id - 100, 0)}).encode()).decode()
+    page = list(Event.objects.order_by("id")[:100])
+    batch_ids = ",".join(str(item.id) for item in page)
+    counter = iter(range(sys.maxsize))
+
+    def create():
+        i = next(counter)
+        return writer.post("/events/", {
+            "country": country.id, "name": "Benchmark %d" % i,
+            "slug": "benchmark%d" % i, "latitude": "1.5",
+            "longitude": "-1.5"}, format="json")
+
+    def update():
+        i = next(counter)
+        return writer.patch("/events/%d/" % event.id,
+                            {"name": "Updated %d" % i}, format="json")
+
+    def fast_path():
+        representation = FastRepresentation(EventSerializer())
+        return JSONRenderer().render(representation.to_list(
+            representation.rows(Event.objects.order_by("id")[:100])))
+
+    return [
+        ("countries.list", lambda: client.get("/countries/")),
+        ("countries.retrieve",
+         lambda: client.get("/countries/%d/" % country.id)),
+        ("events.list", lambda: client.get("/events/")),
+        ("events.list.deep",
+         lambda: client.get("/events/", {"cursor": deep_cursor})),
+        ("events.list.filtered", lambda: client.get(
+            "/events/", {"country": country.id, "is_juniors": "true"})),
+        ("events.retrieve", lambda: client.get("/events/%d/" % event.id)),
+        ("events.batch.100",
+         lambda: client.get("/events/batch/", {"ids": batch_ids})),
+        ("events.create", create),
+        ("events.update", update),
+        ("serializer.events.100", lambda: JSONRenderer().render(
+            EventSerializer(page, many=True).data)),
+        ("fastpath.events.100", fast_path),
+    ]
+
+
+def measure(function, iterations):
+    from django.db import connection
+
+    result = function()  # warm up
+    if getattr(result, "status_code", 200) >= 400:
+        raise RuntimeError("Got %d: %s" % (result.status_code,
+                                           result.content[:200]))
+
+    queries = []
+    with connection.execute_wrapper(
+            lambda execute, sql, *args: queries.append(sql) or execute(
+                sql, *args)):
+        function()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "queries": len(queries),
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "throughput_per_s": iterations / elapsed,
+        "peak_memory_bytes": peak,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Returns a list of regressions of `results` against `baseline`."""
+    regressions = []
+    for scale, current in results["results"].items():
+        previous = baseline.get("results", {}).get(scale, {})
+        for name, metrics in current.items():
+            if name not in previous:
+                continue
+            before = previous[name]
+            limit = before["p50_ms"] * (1 + threshold)
+            if metrics["p50_ms"] > limit:
+                regressions.append(
+                    "%s @ %s: p50 %.2fms, was %.2fms" % (
+                        name, scale, metrics["p50_ms"], before["p50_ms"]))
+            if metrics["queries"] > before["queries"]:
+                regressions.append(
+                    "%s @ %s: %d queries, was %d" % (
+                        name, scale, metrics["queries"], before["queries"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+",
+                        default=[100, 10000])
+    parser.add_argument("--huge", action="store_true",
+                        help="Also run at %d events" % HUGE)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--cache", action="store_true",
+                        help="Leave the response cache on")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Serve reads from the in-memory snapshot")
+    args = parser.parse_args()
+    if args.huge and HUGE not in args.scales:
+        args.scales.append(HUGE)
+
+    setup()
+    import django
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+    from parkrundata.snapshot import bump_version
+
+    settings = {"DEBUG": False, "ALLOWED_HOSTS": ["testserver"]}
+    if args.snapshot:
+        settings["PARKRUNDATA_SNAPSHOT"] = True
+        if not args.cache:
+            # The snapshot version lives in the cache, so keep one but
+            # don't let it store responses
+            settings["PARKRUNDATA_CACHE_TIMEOUT"] = 0
+    elif not args.cache:
+        settings["CACHES"] = {"default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "timestamp": time.time(),
+            "cache": args.cache,
+            "snapshot": args.snapshot,
+        },
+        "results": {},
+    }
+    with override_settings(**settings):
+        for scale in args.scales:
+            seed(scale)
+            # seed() bulk creates, which doesn't bump the snapshot version
+            bump_version()
+            client = APIClient()
+            current = results["results"][str(scale)] = {}
+            for name, function in scenarios(client, scale):
+                current[name] = measure(function, args.iterations)
+                print("%-24s %9d  p50 %8.2fms  p95 %8.2fms  %3d queries" % (
+                    name, scale, current[name]["p50_ms"],
+                    current[name]["p95_ms"], current[name]["queries"]),
+                    file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline),
+                                  args.threshold)
+        for regression in regressions:
+            print("REGRESSION: " + regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8
+"""
+Compares the NumPy distance matrix with a Python loop of
+parkrundata.spatial.haversine() over the events' Decimal coordinates, and
+times the streamed /events/distances/ and /events/near-route/ endpoints.
+
+    python -m benchmarks.distances [--sizes 500 2000] [--repeat 3]
+"""
+import argparse
+import time
+
+from benchmarks import seed, setup
+
+
+def best_of(repeat, function):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--route-points", type=int, default=500)
+    args = parser.parse_args()
+
+    setup()
+    import numpy
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+    from parkrundata import distances
+    from parkrundata.models import Event
+    from parkrundata.snapshot import bump_version
+    from parkrundata.spatial import haversine
+
+    client = APIClient()
+    print("%6s %12s %12s %8s %14s %10s %12s" % (
+        "size", "loop ms", "numpy ms", "speedup", "endpoint ms", "MB",
+        "route ms"))
+    for size in args.sizes:
+        seed(size)
+        # seed() bulk creates, which doesn't bump the catalogue version
+        bump_version()
+        rows = list(Event.objects.order_by("id").values_list(
+            "id", "latitude", "longitude"))
+        ids = ",".join(str(pk) for pk, _, _ in rows)
+
+        def loop():
+            return [[haversine(lat1, lon1, lat2, lon2)
+                     for _, lat2, lon2 in rows]
+                    for _, lat1, lon1 in rows]
+
+        def vectorised():
+            vectors = distances.store.get().vectors
+            return distances.distance_matrix(vectors, vectors)
+
+        def endpoint():
+            response = client.get("/events/distances/", {"ids": ids})
+            return b"".join(response.streaming_content)
+
+        route = ";".join("%f,%f" % (50 + i * 10.0 / args.route_points,
+                                    -5 + i * 10.0 / args.route_points)
+                         for i in range(args.route_points))
+
+        def near_route():
+            return client.get("/events/near-route/",
+                              {"route": route, "within_km": 10})
+
+        with override_settings(DEBUG=False):
+            slow, expected = best_of(1, loop)
+            fast, actual = best_of(args.repeat, vectorised)
+            if not numpy.allclose(actual, expected, rtol=0, atol=1e-3):
+                raise SystemExit("Distances differ at %d events" % size)
+            served, content = best_of(args.repeat, endpoint)
+            routed, _ = best_of(args.repeat, near_route)
+        print("%6d %12.1f %12.1f %7.0fx %14.1f %10.1f %12.1f" % (
+            size, slow * 1000, fast * 1000, slow / fast, served * 1000,
+            len(content) / 1e6, routed * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8
+"""
+Times building the event search index from the database, saving it and
+reading it back from disk, and searching it, against scoring the same
+searches against every event in turn, a name__icontains scan (which only
+finds exact substrings) and through /events/search/.
+
+    python -m benchmarks.search [--events 2000 20000] [--queries 200]
+"""
+import argparse
+import heapq
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks import seed, setup
+
+
+PLACES = [
+    "Bushy", "Fulham", "Richmond", "Hampton", "Kingston", "Wimbledon",
+    "Brockwell", "Dulwich", "Crystal", "Greenwich", "Victoria", "Albert",
+    "Heaton", "Delamere", "Cannon", "Hill", "Newcastle", "Leeds", "York",
+    "Bath", "Exeter", "Gödöllő", "Neckarau", "Dougnes", "Malahide",
+    "Marymoor", "Cornwall", "Aberdeen", "Cardiff", "Swansea",
+]
+KINDS = ["Park", "Palace", "Common", "Heath", "Forest", "Lakes", "Gardens",
+         "Fields", "Riverside", "Beach"]
+
+
+def name(i):
+    text = "%s %s %s" % (PLACES[i % len(PLACES)],
+                         PLACES[i // len(PLACES) % len(PLACES)],
+                         KINDS[i // len(PLACES) ** 2 % len(KINDS)])
+    # Names must be unique in each country
+    repeat = i // (len(PLACES) ** 2 * len(KINDS))
+    return text + " %d" % (repeat + 1) if repeat else text
+
+
+def misspell(text, rng):
+    """Drops, doubles or swaps one letter of `text`."""
+    i = rng.randrange(1, len(text) - 1)
+    change = rng.choice(["drop", "double", "swap"])
+    if change == "drop":
+        return text[:i] + text[i + 1:]
+    if change == "double":
+        return text[:i] + text[i] + text[i:]
+    return text[:i - 1] + text[i] + text[i - 1] + text[i + 1:]
+
+
+def timings(function, queries):
+    found = []
+    for query in queries:
+        started = time.perf_counter()
+        function(query)
+        found.append((time.perf_counter() - started) * 1000)
+    found.sort()
+    return statistics.median(found), found[int(len(found) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, nargs="+",
+                        default=[2000, 20000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    setup()
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+    from parkrundata import search
+    from parkrundata.models import Event
+
+    client = APIClient()
+    rng = random.Random(1)
+    path = os.path.join(tempfile.mkdtemp(), "search.pickle")
+    print("%6s %9s %9s %9s %7s %17s %17s %17s %17s" % (
+        "events", "build ms", "save ms", "load ms", "MB", "index p50/p95",
+        "scan p50/p95", "icontains p50/p95", "endpoint p50/p95"))
+    for size in args.events:
+        seed(size)
+        events = list(Event.objects.order_by("pk"))
+        for i, event in enumerate(events):
+            event.name = name(i)
+            event.slug = event.name.lower().replace(" ", "")
+        Event.objects.bulk_update(events, ["name", "slug"], batch_size=2000)
+        queries = [rng.choice(events).name for _ in range(args.queries)]
+        queries = [misspell(query, rng) if i % 2 else
+                   query.split()[0] + " " + query.split()[-1]
+                   for i, query in enumerate(queries)]
+
+        index = search.EventSearchIndex()
+        started = time.perf_counter()
+        index.build()
+        built = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index.save(path)
+        saved = time.perf_counter() - started
+
+        started = time.perf_counter()
+        loaded = search.EventSearchIndex()
+        if not loaded.read(path):
+            raise SystemExit("The index wasn't saved")
+        read = time.perf_counter() - started
+
+        def scan(query):
+            wanted = search.trigrams(query)
+            minimum = search.MIN_SCORE * len(wanted)
+            ranked = []
+            for pk, document in loaded._documents.items():
+                count = len(wanted & document)
+                if count >= minimum:
+                    ranked.append((-count, len(document), pk))
+            return heapq.nsmallest(10, ranked)
+
+        def icontains(query):
+            return list(Event.objects.filter(
+                name__icontains=query).values_list("pk", flat=True))
+
+        def endpoint(query):
+            return client.get("/events/search/", {"q": query})
+
+        search.search_index.invalidate()
+        with override_settings(DEBUG=False):
+            index_times = timings(
+                lambda query: loaded.search(query, 10), queries)
+            brute_times = timings(scan, queries)
+            scan_times = timings(icontains, queries)
+            endpoint_times = timings(endpoint, queries)
+        print("%6d %9.1f %9.1f %9.1f %7.1f %8.2f/%-8.2f %8.2f/%-8.2f "
+              "%8.2f/%-8.2f %8.2f/%-8.2f" % (
+                  size, built * 1000, saved * 1000, read * 1000,
+                  os.path.getsize(path) / 1e6, *index_times, *brute_times,
+                  *scan_times, *endpoint_times))
+
+
+if __name__ == "__main__":
+    main()
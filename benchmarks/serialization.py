@@ -0,0 +1,61 @@
+# -*- coding: utf-8
+"""
+Compares EventSerializer with the values_list() fast path used by the
+events list, checking that both render identical JSON.
+
+    python -m benchmarks.serialization [--rows 1000 10000 100000]
+"""
+import argparse
+import time
+
+from benchmarks import seed, setup
+
+
+def best_of(repeat, function):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+",
+                        default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.renderers import JSONRenderer
+    from parkrundata.fastpath import FastRepresentation
+    from parkrundata.models import Event
+    from parkrundata.serializers import EventSerializer
+
+    renderer = JSONRenderer()
+    print("%8s %14s %14s %8s" % ("rows", "serializer ms", "fast path ms",
+                                 "speedup"))
+    for rows in args.rows:
+        seed(rows)
+        queryset = Event.objects.order_by("id")
+
+        def serializer():
+            return renderer.render(
+                EventSerializer(queryset.all(), many=True).data)
+
+        def fast_path():
+            representation = FastRepresentation(EventSerializer())
+            return renderer.render(representation.to_list(
+                representation.rows(queryset.all())))
+
+        slow, expected = best_of(args.repeat, serializer)
+        fast, actual = best_of(args.repeat, fast_path)
+        if actual != expected:
+            raise SystemExit("Fast path output differs at %d rows" % rows)
+        print("%8d %14.1f %14.1f %7.1fx" % (
+            rows, slow * 1000, fast * 1000, slow / fast))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# -*- coding: utf-8
+"""
+Measures how long a fresh process takes to run django.setup() and then
+to serve its first request to each of a few endpoints, and which modules
+each phase imports, from python -X importtime.
+
+Every run is a new interpreter, so nothing is imported or cached ahead of
+time. The reported times are medians over --repeat runs.
+
+    python -m benchmarks.startup [--paths /countries/ /events/1/]
+                                 [--repeat 5] [--top 10]
+                                 [--output run.json]
+                                 [--baseline previous.json]
+                                 [--threshold 0.2]
+
+Results are written as JSON. With --baseline, any path whose median setup
+or first request time grew by more than --threshold (a fraction) is
+reported and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import seed, setup
+
+
+PATHS = ["/countries/", "/events/", "/events/1/", "/metrics/"]
+# Written to stderr between the phases, among the -X importtime lines
+MARKER = "-- first request"
+
+
+def child(database, path):
+    """Runs in the measured process: set up, serve `path` once."""
+    import io
+
+    import django
+    from django.conf import settings
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+    settings.DATABASES["default"]["NAME"] = database
+    settings.ALLOWED_HOSTS = ["testserver"]
+    settings.PARKRUNDATA_METRICS_ALLOWED_IPS = ["127.0.0.1"]
+
+    started = time.perf_counter()
+    django.setup()
+    setup_s = time.perf_counter() - started
+    print(MARKER, file=sys.stderr, flush=True)
+
+    from django.core.handlers.wsgi import WSGIHandler
+
+    statuses = []
+    started = time.perf_counter()
+    response = WSGIHandler()({
+        "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "",
+        "SERVER_NAME": "testserver", "SERVER_PORT": "80",
+        "HTTP_HOST": "testserver", "REMOTE_ADDR": "127.0.0.1",
+        "wsgi.input": io.BytesIO(), "wsgi.url_scheme": "http",
+    }, lambda status, headers: statuses.append(status))
+    b"".join(response)
+    response.close()
+    first_s = time.perf_counter() - started
+
+    json.dump({"setup_ms": setup_s * 1000, "first_request_ms": first_s * 1000,
+               "status": int(statuses[0].split()[0])}, sys.stdout)
+
+
+def parse_importtime(lines):
+    """
+    Returns {"setup": ..., "first_request": ...}, each a dict from module
+    name to its own import time in microseconds.
+    """
+    phases = {"setup": {}, "first_request": {}}
+    phase = phases["setup"]
+    for line in lines:
+        if line.strip() == MARKER:
+            phase = phases["first_request"]
+        elif line.startswith("import time:") and "|" in line:
+            own, _, name = line[len("import time:"):].split("|")
+            if own.strip().isdigit():
+                phase[name.strip()] = int(own)
+    return phases
+
+
+def run(database, path):
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "benchmarks.startup",
+         "--child", database, path],
+        capture_output=True, text=True, check=True,
+        env=dict(os.environ, DJANGO_SETTINGS_MODULE="tests.settings"))
+    result = json.loads(process.stdout)
+    result["imports"] = parse_importtime(process.stderr.splitlines())
+    return result
+
+
+def summarise(runs, top):
+    """Medians of `runs` of one path, with the imports of the first."""
+    summary = {
+        "setup_ms": statistics.median(run["setup_ms"] for run in runs),
+        "first_request_ms": statistics.median(
+            run["first_request_ms"] for run in runs),
+        "status": runs[0]["status"],
+    }
+    for phase, imports in runs[0]["imports"].items():
+        slowest = sorted(imports.items(), key=lambda item: -item[1])
+        summary[phase + "_imports"] = {
+            "modules": len(imports),
+            "ms": sum(imports.values()) / 1000,
+            "slowest": [[name, own / 1000] for name, own in slowest[:top]],
+        }
+    return summary
+
+
+def compare(results, baseline, threshold):
+    """Returns a list of regressions of `results` against `baseline`."""
+    regressions = []
+    previous = baseline.get("results", {})
+    for path, current in results["results"].items():
+        if path not in previous:
+            continue
+        for metric in ("setup_ms", "first_request_ms"):
+            before = previous[path][metric]
+            if current[metric] > before * (1 + threshold):
+                regressions.append("%s %s: %.1fms, was %.1fms" % (
+                    path, metric, current[metric], before))
+    return regressions
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        return child(*sys.argv[2:])
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--paths", nargs="+", default=PATHS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10,
+                        help="How many of the slowest imports to list")
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    database = os.path.join(directory, "startup.sqlite3")
+    setup(database)
+    import django
+
+    seed(args.events)
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "timestamp": time.time(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    for path in args.paths:
+        runs = [run(database, path) for _ in range(args.repeat)]
+        current = results["results"][path] = summarise(runs, args.top)
+        print("%-16s setup %7.1fms (%3d modules)  first request %7.1fms "
+              "(%3d modules)  status %d" % (
+                  path, current["setup_ms"],
+                  current["setup_imports"]["modules"],
+                  current["first_request_ms"],
+                  current["first_request_imports"]["modules"],
+                  current["status"]), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline),
+                                  args.threshold)
+        for regression in regressions:
+            print("REGRESSION: " + regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8
+"""
+Compares payload size and encode/decode time of the JSON, MessagePack and
+fixed binary event formats, checking that each decodes to the same events.
+
+    python -m benchmarks.wire [--rows 1000 10000 100000]
+"""
+import argparse
+import json
+
+from benchmarks import seed, setup
+from benchmarks.serialization import best_of
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+",
+                        default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+    from decimal import Decimal
+    from rest_framework.renderers import JSONRenderer
+    from parkrundata import wire
+    from parkrundata.fastpath import FastRepresentation
+    from parkrundata.models import Event
+    from parkrundata.renderers import BinaryEventRenderer, MessagePackRenderer
+    from parkrundata.serializers import EventSerializer
+
+    formats = [
+        ("json", JSONRenderer().render, lambda content: [
+            dict(item, latitude=Decimal(item["latitude"]),
+                 longitude=Decimal(item["longitude"]))
+            for item in json.loads(content.decode())]),
+        ("binary", BinaryEventRenderer().render, wire.decode_events),
+    ]
+    if wire.msgpack is not None:
+        formats.insert(1, ("msgpack", MessagePackRenderer().render,
+                           lambda content: wire.decode_coordinates(
+                               wire.msgpack.unpackb(content, raw=False))))
+
+    print("%8s %8s %12s %10s %10s" % ("rows", "format", "bytes",
+                                      "encode ms", "decode ms"))
+    for rows in args.rows:
+        seed(rows)
+        representation = FastRepresentation(EventSerializer())
+        data = representation.to_list(
+            representation.rows(Event.objects.order_by("id")))
+
+        expected = None
+        for name, encode, decode in formats:
+            encode_time, content = best_of(args.repeat, lambda: encode(data))
+            decode_time, decoded = best_of(args.repeat,
+                                           lambda: decode(content))
+            if expected is None:
+                expected = decoded
+            elif decoded != expected:
+                raise SystemExit("%s output differs at %d rows" % (
+                    name, rows))
+            print("%8d %8s %12d %10.1f %10.1f" % (
+                rows, name, len(content), encode_time * 1000,
+                decode_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 # -*- coding: utf-8
 from django.apps import AppConfig
+from django.core import checks
 
 
 class ParkrundataConfig(AppConfig):
     name = 'parkrundata'
+    default_auto_field = 'django.db.models.AutoField'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .checks import check_replica_settings
+
+        checks.register(check_replica_settings)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .renderers import MSGPACK_RENDERERS
+from .serializers import BatchQuerySerializer
+
+
+NOT_FOUND = "Not found."
+
+
+def chunk_size(queryset):
+    """
+    Returns how many values an `__in` lookup added to `queryset` can take
+    without going over the database's limit on query parameters (999 for
+    older SQLite), or None if there is no limit.
+    """
+    limit = connections[queryset.db].features.max_query_params
+    if limit is None:
+        return None
+    try:
+        used = len(queryset.query.sql_with_params()[1])
+    except EmptyResultSet:
+        used = 0
+    return max(limit - used, 1)
+
+
+def in_chunks(queryset, lookup, values):
+    """
+    Yields the rows of `queryset` whose `lookup` is one of `values`, making
+    one query for each chunk of values that fits in a query.
+    """
+    values = list(dict.fromkeys(values))
+    size = chunk_size(queryset) or len(values) or 1
+    queryset = queryset.order_by()
+    for start in range(0, len(values), size):
+        yield from queryset.filter(
+            **{lookup + "__in": values[start:start + size]})
+
+
+class BatchRetrieveMixin(object):
+    """
+    Adds a `batch` list route that retrieves many objects, named by
+    `?ids=1,2,3` or another key of `batch_query_serializer`, in a single
+    `WHERE ... IN (...)` query (or one per chunk, under the database's
+    parameter limit).
+
+    Results come back in the order they were asked for. An object that
+    doesn't exist, or that the viewset's queryset and filters exclude, is
+    replaced by its key and a "detail" of "Not found.".
+    """
+    batch_query_serializer = BatchQuerySerializer
+    # The fields each key's values are matched against, in order. The last
+    # one is the one looked up with `__in`.
+    batch_lookups = {"ids": ("id",)}
+
+    def get_batch_items(self, lookups, keys):
+        """Returns {key: representation} for the `keys` that exist."""
+        queryset = self.filter_queryset(self.get_queryset())
+        representation = self.get_fast_representation()
+        if representation is not None:
+            indexes = [representation.column(lookup) for lookup in lookups]
+            rows = in_chunks(representation.rows(queryset), lookups[-1],
+                             [key[-1] for key in keys])
+            return {tuple(row[index] for index in indexes):
+                    representation.to_dict(row) for row in rows}
+
+        meta = queryset.model._meta
+        attnames = [meta.get_field(lookup).attname for lookup in lookups]
+        objects = {
+            tuple(getattr(obj, attname) for attname in attnames): obj
+            for obj in in_chunks(queryset, lookups[-1],
+                                 [key[-1] for key in keys])}
+        data = self.get_serializer(list(objects.values()), many=True).data
+        return dict(zip(objects, data))
+
+    @action(detail=False, renderer_classes=(
+        api_settings.DEFAULT_RENDERER_CLASSES + MSGPACK_RENDERERS))
+    def batch(self, request):
+        params = self.batch_query_serializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        (name, keys), = params.validated_data.items()
+        lookups = self.batch_lookups[name]
+
+        items = self.get_batch_items(lookups, keys)
+        return Response([
+            items[key] if key in items else
+            dict(zip(lookups, key), detail=NOT_FOUND) for key in keys])
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from rest_framework.exceptions import ValidationError
+
+from .models import Country, Event
+from .serializers import BulkEventSerializer
+from .signals import events_bulk_changed
+
+
+BATCH_SIZE = 500
+
+EVENT_FIELDS = [
+    "country_id", "name", "slug", "is_juniors", "is_restricted",
+    "is_discontinued", "latitude", "longitude",
+]
+
+
+def _validate(items):
+    """
+    Validates each item on its own, returning a list of validated data
+    (None where invalid) and a list of errors aligned with `items`.
+    """
+    validated, errors = [], []
+    for item in items:
+        serializer = BulkEventSerializer(data=item)
+        if serializer.is_valid():
+            data = dict(serializer.validated_data)
+            data["country_id"] = data.pop("country")
+            validated.append(data)
+            errors.append({})
+        else:
+            validated.append(None)
+            errors.append(serializer.errors)
+    return validated, errors
+
+
+def _add_error(errors, index, field, message):
+    errors[index].setdefault(field, []).append(message)
+
+
+def _fetch_missing_pks(events):
+    if all(event.pk is not None for event in events):
+        return
+    # Not every database hands back primary keys from bulk_create
+    created = Event.objects.filter(
+        country_id__in={event.country_id for event in events},
+        slug__in={event.slug for event in events},
+    ).values_list("country_id", "slug", "id")
+    pks = {(country_id, slug): pk for country_id, slug, pk in created}
+    for event in events:
+        event.pk = pks[(event.country_id, event.slug)]
+
+
+def upsert_events(items, dry_run=False):
+    """
+    Creates or updates Events from a list of EventSerializer-style dicts,
+    matching existing Events on (country, slug).
+
+    Everything is validated up front against a single fetch of the existing
+    Events in the countries concerned, and then written with bulk_create and
+    bulk_update in one transaction. If any item is invalid nothing is
+    written and a ValidationError is raised with a list of errors aligned
+    with `items`. Fields missing from an item keep their current value, or
+    the model default for new Events.
+
+    Returns a list of {"status", "id"} results where status is one of
+    "created", "updated" or "unchanged". With `dry_run` nothing is written
+    and created Events have no id.
+    """
+    if not isinstance(items, list):
+        raise ValidationError(
+            {"non_field_errors": ["Expected a list of items."]})
+
+    validated, errors = _validate(items)
+    country_ids = {data["country_id"] for data in validated if data}
+    countries = Country.objects.in_bulk(list(country_ids))
+    existing = {}
+    names = {}
+    for event in Event.objects.filter(country_id__in=countries):
+        existing[(event.country_id, event.slug)] = event
+        names[(event.country_id, event.name)] = event.pk
+
+    # Work out which Event each item refers to and free up the names of
+    # any Events that are being renamed before checking for clashes.
+    targets = [None] * len(items)
+    seen = {}
+    for index, data in enumerate(validated):
+        if data is None:
+            continue
+        if data["country_id"] not in countries:
+            _add_error(errors, index, "country", (
+                'Invalid pk "%s" - object does not exist.'
+                % data["country_id"]))
+            continue
+        key = (data["country_id"], data["slug"])
+        if key in seen:
+            _add_error(errors, index, "slug", (
+                "Duplicate of item %d: slug must be unique within a "
+                "country." % seen[key]))
+            continue
+        seen[key] = index
+        event = existing.get(key)
+        targets[index] = event.pk if event else ("new", index)
+        if event and names.get((event.country_id, event.name)) == event.pk:
+            del names[(event.country_id, event.name)]
+
+    for index, data in enumerate(validated):
+        if targets[index] is None:
+            continue
+        key = (data["country_id"], data["name"])
+        if names.setdefault(key, targets[index]) != targets[index]:
+            _add_error(errors, index, "name",
+                       "Event with this country and name already exists.")
+
+    if any(errors):
+        raise ValidationError(errors)
+
+    now = timezone.now()
+    to_create, to_update, results = [], [], []
+    for index, data in enumerate(validated):
+        event = existing.get((data["country_id"], data["slug"]))
+        if event is None:
+            event = Event(**data)
+            to_create.append(event)
+            results.append({"status": "created", "event": event})
+            continue
+        changed = [field for field, value in data.items()
+                   if getattr(event, field) != value]
+        if changed:
+            for field in changed:
+                setattr(event, field, data[field])
+            event.modified = now
+            to_update.append(event)
+        results.append({"status": "updated" if changed else "unchanged",
+                        "event": event})
+
+    if dry_run or not (to_create or to_update):
+        return [{"status": result["status"], "id": result["event"].pk}
+                for result in results]
+
+    try:
+        with transaction.atomic():
+            # Updates go first so new Events can take names freed by renames
+            if to_update:
+                Event.objects.bulk_update(
+                    to_update, EVENT_FIELDS + ["modified"],
+                    batch_size=BATCH_SIZE)
+            Event.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+            _fetch_missing_pks(to_create)
+            events_bulk_changed.send(sender=Event,
+                                     instances=to_create + to_update,
+                                     created=to_create)
+    except IntegrityError as exc:
+        raise ValidationError({"non_field_errors": [str(exc)]})
+
+    for event in to_create + to_update:
+        event.tracker.set_saved_fields()
+
+    return [{"status": result["status"], "id": result["event"].pk}
+            for result in results]
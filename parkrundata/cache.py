@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import random
+import threading
+import uuid
+
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .conf import get_setting
+
+
+KEY_PREFIX = "parkrundata"
+
+
+def get_cache():
+    return caches[get_setting("CACHE")]
+
+
+class CacheStats(object):
+    """Process-local hit/miss counters for the response cache."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+stats = CacheStats()
+
+
+def get_counter(key):
+    """
+    Returns the shared counter at `key`, or None if the cache can't hold
+    it. A missing counter starts at a random value, so one that is evicted
+    can't come back at a value a process already saw.
+    """
+    cache = get_cache()
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, random.getrandbits(48), None)
+        value = cache.get(key)
+    return value
+
+
+def incr_counter(key):
+    """
+    Adds one to the shared counter at `key`, returning its new value, or
+    None if it had to start again.
+    """
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, random.getrandbits(48), None)
+        return None
+
+
+def generation_key(model, pk=None):
+    key = "%s:generation:%s" % (KEY_PREFIX, model._meta.label_lower)
+    if pk is not None:
+        key += ":%s" % pk
+    return key
+
+
+def lookup_id(**lookup):
+    """
+    Returns an id for generation_key() for an object looked up by fields
+    other than its primary key, like lookup_id(country=1, slug="bushy").
+    """
+    return ",".join("%s=%s" % item for item in sorted(lookup.items()))
+
+
+def get_generations(keys):
+    """
+    Returns the current generation for each key, starting new ones as
+    needed. Generations are random rather than counters so a key that is
+    evicted can never come back at a value that was already used.
+    """
+    cache = get_cache()
+    generations = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys
+               if key not in generations}
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+    return [generations[key] for key in keys]
+
+
+def invalidate(model, pks=()):
+    """
+    Starts a new generation for `model` lists and for each of `pks`, so any
+    cached response built from the old data is never read again.
+    """
+    keys = [generation_key(model)] + [generation_key(model, pk) for pk in pks]
+    get_cache().set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+
+class CachedResponseMixin(object):
+    """
+    Caches rendered list and retrieve responses.
+
+    Entries are keyed on the full URL, the negotiated media type and the
+    current generations of the models in `cache_dependencies` (the
+    viewset's own model first), so saving or deleting a row makes stale
+    entries unreachable. A detail response only depends on the generation
+    of its own object, not on the whole table.
+    """
+    cache_dependencies = ()
+
+    def get_cache_dependencies(self):
+        return self.cache_dependencies
+
+    def get_cache_object_id(self):
+        """
+        Returns the id the object to retrieve is invalidated by: its primary
+        key, or a lookup_id() for views that look it up by other fields.
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.kwargs[lookup_url_kwarg]
+
+    def get_cache_key(self):
+        model = self.get_queryset().model
+        if self.action == "retrieve":
+            keys = [generation_key(model, self.get_cache_object_id())]
+        else:
+            keys = [generation_key(model)]
+        keys += [generation_key(dependency)
+                 for dependency in self.get_cache_dependencies()
+                 if dependency is not model]
+
+        state = [self.request.build_absolute_uri(),
+                 self.request.accepted_media_type] + get_generations(keys)
+        digest = hashlib.sha1(repr(state).encode("utf-8")).hexdigest()
+        return "%s:response:%s" % (KEY_PREFIX, digest)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        # Imported here, to keep DRF out of django.setup() via the signals
+        from rest_framework.response import Response
+
+        if request.accepted_renderer.format == "api":
+            # The browsable API is different for every user
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_cache_key()
+        cached = cache.get(key)
+        stats.record(cached is not None)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            def store(response):
+                cache.set(key, (response.content, response["Content-Type"]),
+                          get_setting("CACHE_TIMEOUT"))
+            response.add_post_render_callback(store)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
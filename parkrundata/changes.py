@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import datetime
+import json
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from rest_framework.exceptions import ValidationError
+
+from .models import EventTombstone
+
+
+# How far behind the present a caught up watermark is held. `modified` and
+# `deleted` are set before the row is committed, so a row saved before a
+# poll but committed after it can be older than the rows that poll saw.
+LATE_COMMIT_MARGIN = datetime.timedelta(minutes=10)
+
+
+def encode_token(watermarks):
+    data = json.dumps(watermarks, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+
+def decode_token(token):
+    """
+    Returns the (modified, id) watermarks for changed rows and the
+    (deleted, id) watermarks for tombstones encoded in a token.
+    """
+    empty = {"changed": None, "deleted": None}
+    if not token:
+        return empty
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        watermarks = {}
+        for key in empty:
+            mark = data.get(key)
+            if mark is not None:
+                timestamp, pk = parse_datetime(mark[0]), int(mark[1])
+                if timestamp is None:
+                    raise ValueError(mark[0])
+                mark = (timestamp, pk)
+            watermarks[key] = mark
+        return watermarks
+    except (AttributeError, IndexError, TypeError, ValueError):
+        raise ValidationError({"since": ["Invalid continuation token."]})
+
+
+def _after(queryset, field, mark):
+    if mark is None:
+        return queryset
+    timestamp, pk = mark
+    return queryset.filter(
+        Q(**{field + "__gt": timestamp}) | Q(**{field: timestamp,
+                                                "id__gt": pk}))
+
+
+def _page(queryset, field, mark, limit):
+    rows = list(_after(queryset, field, mark).order_by(field, "id")[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        mark = (getattr(rows[-1], field), rows[-1].id)
+    return rows, mark, more
+
+
+def _hold_back(mark, more, cutoff):
+    if more or mark is None or mark[0] < cutoff:
+        return mark
+    return (cutoff, 0)
+
+
+def get_changes(queryset, token, limit):
+    """
+    Returns up to `limit` rows from `queryset` and up to `limit` Event
+    tombstones recorded after the watermarks in `token`, ordered by
+    (modified, id) and (deleted, id) respectively, along with a token to
+    continue from and whether there is more to fetch.
+
+    Once either is caught up its watermark is held LATE_COMMIT_MARGIN
+    behind the present, so rows committed late are sent on the next poll,
+    and rows changed within the margin are sent again.
+    """
+    watermarks = decode_token(token)
+    cutoff = timezone.now() - LATE_COMMIT_MARGIN
+    changed, changed_mark, more_changed = _page(
+        queryset, "modified", watermarks["changed"], limit)
+    deleted, deleted_mark, more_deleted = _page(
+        EventTombstone.objects.all(), "deleted", watermarks["deleted"], limit)
+    changed_mark = _hold_back(changed_mark, more_changed, cutoff)
+    deleted_mark = _hold_back(deleted_mark, more_deleted, cutoff)
+
+    next_token = encode_token({
+        key: mark and (mark[0].isoformat(), mark[1])
+        for key, mark in [("changed", changed_mark),
+                          ("deleted", deleted_mark)]
+    })
+    return changed, deleted, next_token, more_changed or more_deleted
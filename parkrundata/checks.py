@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from django.conf import settings
+from django.core import checks
+
+from .conf import get_setting
+
+
+ROUTER = "parkrundata.routers.ReplicaRouter"
+
+
+def check_replica_settings(app_configs=None, **kwargs):
+    """Checks the settings ReplicaRouter depends on."""
+    replicas = list(get_setting("REPLICA_DATABASES"))
+    if not replicas:
+        return []
+
+    errors = []
+    primary = get_setting("PRIMARY_DATABASE")
+    for alias in [primary] + replicas:
+        if alias not in settings.DATABASES:
+            errors.append(checks.Error(
+                "Database %r is not in DATABASES." % alias,
+                hint="Check PARKRUNDATA_PRIMARY_DATABASE and "
+                     "PARKRUNDATA_REPLICA_DATABASES.",
+                id="parkrundata.E001"))
+    if primary in replicas:
+        errors.append(checks.Error(
+            "The primary database %r is also listed as a replica." % primary,
+            id="parkrundata.E002"))
+    if errors:
+        return errors
+
+    if ROUTER not in [router if isinstance(router, str) else
+                      "%s.%s" % (type(router).__module__,
+                                 type(router).__name__)
+                      for router in settings.DATABASE_ROUTERS]:
+        errors.append(checks.Warning(
+            "PARKRUNDATA_REPLICA_DATABASES is set but the replicas are "
+            "never read from.",
+            hint="Add %r to DATABASE_ROUTERS." % ROUTER,
+            id="parkrundata.W001"))
+    for alias in [primary] + replicas:
+        if not settings.DATABASES[alias].get("CONN_MAX_AGE", 0):
+            errors.append(checks.Warning(
+                "Database %r opens a new connection for every request." %
+                alias,
+                hint="Set CONN_MAX_AGE to keep connections open between "
+                     "requests, or put a connection pooler in front of the "
+                     "database.",
+                id="parkrundata.W002"))
+    return errors
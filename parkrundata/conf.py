@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+from django.conf import settings
+
+
+DEFAULTS = {
+    # Alias of the Django cache used for cached API responses
+    "CACHE": "default",
+    # Seconds a cached response is kept for if nothing invalidates it
+    "CACHE_TIMEOUT": 60 * 60 * 24,
+    # Whether MetricsMiddleware adds a Server-Timing header to responses
+    "SERVER_TIMING": True,
+    # Client addresses allowed to scrape the metrics endpoint
+    "METRICS_ALLOWED_IPS": ("127.0.0.1", "::1"),
+    # Database alias ReplicaRouter sends writes and unsafe requests to
+    "PRIMARY_DATABASE": "default",
+    # Aliases of the read replicas ReplicaRouter takes turns reading from
+    "REPLICA_DATABASES": (),
+    # Seconds reads stay on the primary after a write, covering replica lag
+    "REPLICA_STICKY_SECONDS": 5,
+    # Whether list and retrieve are served from an in-memory snapshot of
+    # the catalogue, rebuilt in each process when it changes
+    "SNAPSHOT": False,
+    # Events of the same kind (juniors or not) closer together than this,
+    # in km, are rejected as duplicates when created or moved through the
+    # API. None turns the check off.
+    "DUPLICATE_RADIUS_KM": 0.1,
+    # File build_search_index saves the event search index to, which
+    # processes read, and catch up with the database, instead of building
+    # the index themselves. It is unpickled, so only the site should be able
+    # to write there. None builds it in each process.
+    "SEARCH_INDEX_PATH": None,
+}
+
+
+def get_setting(name):
+    """Returns the PARKRUNDATA_<name> setting, falling back to DEFAULTS."""
+    return getattr(settings, "PARKRUNDATA_" + name, DEFAULTS[name])
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import Event
+from .routers import use_primary
+from .snapshot import get_version
+from .spatial import EARTH_RADIUS_KM
+
+
+# Rows of a distance matrix computed at a time, bounding the memory used
+# by each step to about BLOCK_CELLS floats
+BLOCK_CELLS = 1 << 20
+
+
+class NumPyUnavailable(APIException):
+    status_code = 501
+    default_detail = "Install numpy to enable distance queries."
+    default_code = "numpy_unavailable"
+
+
+def unit_vectors(latitudes, longitudes):
+    """
+    Returns an n x 3 array of the points on the unit sphere at `latitudes`
+    and `longitudes`, in degrees.
+    """
+    phi = numpy.radians(numpy.asarray(latitudes, dtype=numpy.float64))
+    lam = numpy.radians(numpy.asarray(longitudes, dtype=numpy.float64))
+    cos_phi = numpy.cos(phi)
+    return numpy.column_stack(
+        (cos_phi * numpy.cos(lam), cos_phi * numpy.sin(lam), numpy.sin(phi)))
+
+
+def angles(dots):
+    """
+    The angles between unit vectors with dot products `dots`, from their
+    chord lengths, which keeps short distances accurate to well under a
+    metre. This is the haversine formula.
+    """
+    half_chord = numpy.sqrt(numpy.clip((1 - dots) / 2, 0, 1))
+    return 2 * numpy.arcsin(half_chord)
+
+
+def distance_matrix(origins, destinations):
+    """
+    Returns the great-circle distances in km from each of the `origins` to
+    each of the `destinations`, both arrays of unit_vectors().
+    """
+    return EARTH_RADIUS_KM * angles(origins @ destinations.T)
+
+
+def iter_distance_rows(origins, destinations):
+    """
+    Yields the rows of distance_matrix() in whole metres, computing them a
+    block at a time. Integers are also about three times quicker to write
+    as JSON than floats.
+    """
+    block = max(BLOCK_CELLS // max(len(destinations), 1), 1)
+    for start in range(0, len(origins), block):
+        matrix = distance_matrix(origins[start:start + block], destinations)
+        yield from numpy.rint(matrix * 1000).astype(numpy.int64).tolist()
+
+
+def route_distances(points, route):
+    """
+    Returns the great-circle distance in radians from each of `points` to
+    the polyline through `route`, both arrays of unit_vectors().
+
+    Each segment's distance is the cross-track distance to its great circle
+    where the nearest point on the circle lies between the segment's ends,
+    and the distance to the nearer end otherwise.
+    """
+    starts, ends = route[:-1], route[1:]
+    normals = numpy.cross(starts, ends)
+    lengths = numpy.linalg.norm(normals, axis=1)
+    # Segments with both ends at the same point only have their ends
+    spans = lengths > 1e-12
+    normals[spans] /= lengths[spans, None]
+    # A point's projection onto a segment's great circle lies between its
+    # ends when it is on the inner side of the planes through each end
+    # perpendicular to the segment
+    after_start = numpy.cross(normals, starts)
+    before_end = numpy.cross(ends, normals)
+
+    nearest = numpy.full(len(points), numpy.pi)
+    block = max(BLOCK_CELLS // max(len(points), 1), 1)
+    for first in range(0, len(normals), block):
+        part = slice(first, first + block)
+        cross_track = numpy.abs(numpy.arcsin(numpy.clip(
+            points @ normals[part].T, -1, 1)))
+        after = points @ after_start[part].T >= 0
+        before = points @ before_end[part].T >= 0
+        within = after & before & spans[part]
+        to_ends = numpy.minimum(angles(points @ starts[part].T),
+                                angles(points @ ends[part].T))
+        nearest = numpy.minimum(nearest, numpy.where(
+            within, cross_track, to_ends).min(axis=1))
+    return nearest
+
+
+class EventCoordinates(object):
+    """
+    Unit vectors of every Event's coordinates, in primary key order, as
+    they were at catalogue `version`.
+    """
+
+    def __init__(self, version, ids, vectors):
+        self.version = version
+        self.ids = ids
+        self.vectors = vectors
+
+    @classmethod
+    def load(cls, version):
+        with use_primary():
+            rows = list(Event.objects.order_by("pk").values_list(
+                "pk", "latitude", "longitude").iterator())
+        ids = numpy.array([row[0] for row in rows], dtype=numpy.int64)
+        vectors = unit_vectors([row[1] for row in rows],
+                               [row[2] for row in rows])
+        return cls(version, ids, vectors)
+
+    def positions(self, ids, field):
+        """
+        Returns the positions of `ids` in the arrays, raising a
+        ValidationError on `field` for any that don't exist.
+        """
+        ids = numpy.asarray(ids, dtype=numpy.int64)
+        positions = numpy.searchsorted(self.ids, ids)
+        positions[positions == len(self.ids)] = 0
+        missing = ids[self.ids[positions] != ids] if len(self.ids) else ids
+        if len(missing):
+            raise ValidationError({field: ["Unknown event(s): %s." % (
+                ", ".join(str(pk) for pk in missing[:10]))]})
+        return positions
+
+    def near_route(self, latitudes, longitudes, radius_km):
+        """
+        Returns (distance_km, id) pairs for the Events within `radius_km` of
+        the route through `latitudes` and `longitudes`, nearest first.
+        """
+        route = unit_vectors(latitudes, longitudes)
+        distances = route_distances(self.vectors, route) * EARTH_RADIUS_KM
+        close = numpy.flatnonzero(distances <= radius_km)
+        order = close[numpy.argsort(distances[close], kind="stable")]
+        return list(zip(distances[order].tolist(), self.ids[order].tolist()))
+
+
+class CoordinateStore(object):
+    """
+    Holds this process's EventCoordinates, loading them again whenever the
+    catalogue version in the cache changes.
+    """
+
+    def __init__(self):
+        self.coordinates = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        if numpy is None:
+            raise NumPyUnavailable()
+        version = get_version()
+        if version is None:
+            # Without a cache there is no way to tell when they change
+            return EventCoordinates.load(None)
+        coordinates = self.coordinates
+        if coordinates is None or coordinates.version != version:
+            with self.lock:
+                coordinates = self.coordinates
+                if coordinates is None or coordinates.version != version:
+                    coordinates = self.coordinates = EventCoordinates.load(
+                        version)
+        return coordinates
+
+
+store = CoordinateStore()
+
+
+def iter_matrix_json(origin_ids, destination_ids, origins, destinations):
+    """
+    Yields the distance matrix from `origins` to `destinations` as JSON,
+    {"ids": [...], "to": [...], "distances_m": [[...], ...]}, one row at a
+    time.
+    """
+    yield '{"ids":%s,"to":%s,"distances_m":[' % (
+        json.dumps(origin_ids, separators=(",", ":")),
+        json.dumps(destination_ids, separators=(",", ":")))
+    separator = "\n"
+    for row in iter_distance_rows(origins, destinations):
+        yield separator + json.dumps(row, separators=(",", ":"))
+        separator = ",\n"
+    yield "]}\n"
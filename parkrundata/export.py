@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+from .renderers import CSVRenderer, NDJSONRenderer
+
+
+CHUNK_SIZE = 2000
+
+# Output name and queryset values() lookup for each exported column
+EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("country", "country_id"),
+    ("country_name", "country__name"),
+    ("country_url", "country__url"),
+    ("name", "name"),
+    ("slug", "slug"),
+    ("is_juniors", "is_juniors"),
+    ("is_restricted", "is_restricted"),
+    ("is_discontinued", "is_discontinued"),
+    ("latitude", "latitude"),
+    ("longitude", "longitude"),
+]
+
+
+def iter_rows(queryset):
+    """
+    Yields each Event in `queryset` joined with its Country as a tuple of
+    EXPORT_COLUMNS values, streaming from the database in chunks.
+    """
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    rows = queryset.order_by("id").values_list(*lookups)
+    return rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+def iter_ndjson(queryset):
+    renderer = NDJSONRenderer()
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in iter_rows(queryset):
+        yield renderer.render_line(dict(zip(names, row)))
+
+
+def iter_csv(queryset):
+    renderer = CSVRenderer()
+    yield renderer.render_rows([[name for name, _ in EXPORT_COLUMNS]])
+    batch = []
+    for row in iter_rows(queryset):
+        batch.append(row)
+        if len(batch) == CHUNK_SIZE:
+            yield renderer.render_rows(batch)
+            batch = []
+    if batch:
+        yield renderer.render_rows(batch)
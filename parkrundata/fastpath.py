@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+import decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import QuerySet
+from django.http import Http404
+
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+
+# Fields whose to_representation() leaves database values unchanged
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    PrimaryKeyRelatedField,
+)
+
+
+class Unsupported(Exception):
+    pass
+
+
+def decimal_formatter(field):
+    """
+    Returns a function equivalent to `field.to_representation` for database
+    Decimals, with the quantize context worked out once up front.
+    """
+    normalize = getattr(field, "normalize_output", False)
+    if field.decimal_places is None or field.localize or normalize:
+        return field.to_representation
+
+    exponent = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+    coerce_to_string = getattr(field, "coerce_to_string",
+                               serializers.api_settings
+                               .COERCE_DECIMAL_TO_STRING)
+
+    if coerce_to_string:
+        def format_decimal(value):
+            return "{:f}".format(
+                value.quantize(exponent, rounding=rounding, context=context))
+    else:
+        def format_decimal(value):
+            return value.quantize(exponent, rounding=rounding,
+                                  context=context)
+    return format_decimal
+
+
+class FastRepresentation(object):
+    """
+    Builds the same output as a ModelSerializer instance straight from
+    values_list() rows, skipping model instantiation and DRF's per-field
+    attribute lookups.
+
+    Only plain model fields, primary key relations and nested
+    ModelSerializers are supported; Unsupported is raised for anything else
+    so callers can fall back to the serializer.
+    """
+
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        self.columns = []
+        self.builder = self._compile(serializer, model, "")
+        # Always fetch the primary key, which pagination orders on
+        if model._meta.pk.name not in self.columns:
+            self.columns.append(model._meta.pk.name)
+
+    def column(self, lookup):
+        """Selects `lookup` too, returning its index in the rows."""
+        if lookup not in self.columns:
+            self.columns.append(lookup)
+        return self.columns.index(lookup)
+
+    def _compile(self, serializer, model, prefix):
+        plan = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            source = field.source
+            if source == "*" or "." in source or getattr(field, "many",
+                                                         False):
+                raise Unsupported(name)
+
+            if isinstance(field, serializers.ModelSerializer):
+                related_model = model._meta.get_field(source).related_model
+                nested = self._compile(field, related_model,
+                                       prefix + source + "__")
+                pk_index = self.column("%s%s__%s" % (
+                    prefix, source, related_model._meta.pk.name))
+                plan.append((name, pk_index, nested, True))
+                continue
+
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                raise Unsupported(name)
+            if isinstance(field, PrimaryKeyRelatedField):
+                if field.pk_field is not None:
+                    raise Unsupported(name)
+                lookup = prefix + model_field.attname
+            elif model_field.is_relation:
+                raise Unsupported(name)
+            else:
+                lookup = prefix + source
+
+            if isinstance(field, serializers.DecimalField):
+                formatter = decimal_formatter(field)
+            elif isinstance(field, IDENTITY_FIELDS):
+                formatter = None
+            else:
+                formatter = field.to_representation
+            plan.append((name, self.column(lookup), formatter, False))
+
+        def build(row):
+            item = {}
+            for name, index, formatter, nested in plan:
+                value = row[index]
+                if value is None or formatter is None:
+                    item[name] = value
+                elif nested:
+                    item[name] = formatter(row)
+                else:
+                    item[name] = formatter(value)
+            return item
+        return build
+
+    def rows(self, queryset):
+        """Returns `queryset` as named values_list() rows for to_dict()."""
+        return queryset.values_list(*self.columns, named=True)
+
+    def to_dict(self, row):
+        return self.builder(row)
+
+    def to_list(self, rows):
+        build = self.builder
+        return [build(row) for row in rows]
+
+
+class FastReadMixin(object):
+    """
+    Serves list and retrieve from FastRepresentation when the viewset's
+    serializer allows it, falling back to the serializer otherwise.
+    """
+
+    def get_fast_representation(self):
+        try:
+            return FastRepresentation(self.get_serializer())
+        except Unsupported:
+            return None
+
+    def list(self, request, *args, **kwargs):
+        representation = self.get_fast_representation()
+        if representation is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.get_fast_rows(representation)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(representation.to_list(page))
+        return Response(representation.to_list(rows))
+
+    def get_fast_rows(self, representation):
+        """
+        Returns the rows to list: a values_list() queryset, or a sequence of
+        rows already in memory in primary key order.
+        """
+        return representation.rows(self.filter_queryset(self.get_queryset()))
+
+    def get_fast_object_rows(self, representation):
+        """
+        Returns the values_list() queryset, or in-memory sequence of rows,
+        for the object to retrieve, or None if the lookup value can't match
+        any row.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            return representation.rows(queryset.filter(**lookup))
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    def retrieve(self, request, *args, **kwargs):
+        representation = self.get_fast_representation()
+        if representation is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        rows = self.get_fast_object_rows(representation)
+        if isinstance(rows, QuerySet):
+            row = rows.first()
+        else:
+            row = next(iter(rows or ()), None)
+        if row is None:
+            raise Http404
+        self.check_object_permissions(request, row)
+        return Response(representation.to_dict(row))
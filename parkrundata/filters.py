@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+from django.db.models import CharField, Q
+from django.db.models.lookups import StartsWith
+
+from rest_framework.filters import BaseFilterBackend
+
+from .serializers import EventFilterSerializer
+from .wire import to_microdegrees
+
+
+def glob_escape(text):
+    """Escapes the SQLite GLOB wildcards in `text`."""
+    return "".join("[%s]" % char if char in "*?[" else char
+                   for char in text)
+
+
+@CharField.register_lookup
+class CaseSensitiveStartsWith(StartsWith):
+    """
+    startswith that is case-sensitive on every backend. SQLite's LIKE
+    ignores case, and can only use an index on a column with NOCASE
+    collation, so there it is a GLOB, which does neither.
+    """
+    lookup_name = "case_sensitive_startswith"
+
+    def as_sqlite(self, compiler, connection):
+        if hasattr(self.rhs, "resolve_expression"):
+            return super().as_sql(compiler, connection)
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        pattern = glob_escape(str(self.rhs)) + "*"
+        return "%s GLOB %%s" % lhs, lhs_params + [pattern]
+
+
+class EventFilterBackend(BaseFilterBackend):
+    """
+    Filters Events on the `country` id, the boolean flags, an exact `slug`
+    and a case-sensitive `name_prefix`, all of which are indexed, and on a
+    `bbox` of min_lon,min_lat,max_lon,max_lat.
+    """
+    lookups = {
+        "country": "country_id",
+        "is_juniors": "is_juniors",
+        "is_restricted": "is_restricted",
+        "is_discontinued": "is_discontinued",
+        "slug": "slug",
+        "name_prefix": "name__case_sensitive_startswith",
+    }
+
+    def get_filters(self, request):
+        # partial so that absent booleans are left out rather than False
+        params = EventFilterSerializer(data=request.GET, partial=True)
+        params.is_valid(raise_exception=True)
+        filters = dict(params.validated_data)
+        return filters, filters.pop("bbox", None)
+
+    def filter_queryset(self, request, queryset, view):
+        filters, bbox = self.get_filters(request)
+        queryset = queryset.filter(**{self.lookups[name]: value
+                                      for name, value in filters.items()})
+        if bbox is not None:
+            queryset = self.filter_bbox(queryset, *bbox)
+        return queryset
+
+    def filter_bbox(self, queryset, min_lon, min_lat, max_lon, max_lat):
+        queryset = queryset.filter(latitude__range=(min_lat, max_lat))
+        if min_lon <= max_lon:
+            return queryset.filter(longitude__range=(min_lon, max_lon))
+        # Crosses the antimeridian
+        west, east = Q(longitude__gte=min_lon), Q(longitude__lte=max_lon)
+        return queryset.filter(west | east)
+
+    def filter_tile(self, queryset, min_lon, min_lat, max_lon, max_lat):
+        """
+        filter_bbox() for a map tile, leaving out its east and north edges,
+        which belong to the neighbouring tiles, unless they are the edges of
+        the map, so each event is in exactly one tile at each zoom.
+        """
+        queryset = queryset.filter(longitude__gte=min_lon,
+                                   latitude__gte=min_lat)
+        if max_lon < 180:
+            queryset = queryset.filter(longitude__lt=max_lon)
+        if max_lat < 90:
+            queryset = queryset.filter(latitude__lt=max_lat)
+        return queryset
+
+    def filter_snapshot(self, request, table, positions, view):
+        """
+        filter_queryset() for positions in a snapshot.Table of Events, or
+        all of them if `positions` is None.
+        """
+        filters, bbox = self.get_filters(request)
+        # Indexed lookups first, while they can still use the index
+        for name in ("country", "slug"):
+            if name in filters:
+                positions = table.where(
+                    positions, self.lookups[name], filters.pop(name))
+        prefix = filters.pop("name_prefix", None)
+        for name, value in filters.items():
+            positions = table.where(positions, self.lookups[name], value)
+        if prefix is not None:
+            positions = table.filter(
+                positions, "name", lambda name: name.startswith(prefix))
+        if bbox is not None:
+            positions = self.filter_snapshot_bbox(table, positions, *bbox)
+        return positions
+
+    def filter_snapshot_bbox(self, table, positions, min_lon, min_lat,
+                             max_lon, max_lat):
+        # Coordinates are held as integer micro-degrees
+        min_lon, min_lat, max_lon, max_lat = [
+            to_microdegrees(value)
+            for value in (min_lon, min_lat, max_lon, max_lat)]
+        positions = table.filter(positions, "latitude",
+                                 lambda lat: min_lat <= lat <= max_lat)
+        if min_lon <= max_lon:
+            return table.filter(positions, "longitude",
+                                lambda lon: min_lon <= lon <= max_lon)
+        return table.filter(positions, "longitude",
+                            lambda lon: lon >= min_lon or lon <= max_lon)
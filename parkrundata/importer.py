@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+import itertools
+import json
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+
+from rest_framework.exceptions import ValidationError
+
+from .bulk import upsert_events
+from .models import Country, Event
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+
+COORDINATE_PLACES = Decimal("0.000001")
+
+# parkrun's seriesid for junior (2k) events
+JUNIOR_SERIES = 2
+
+
+class FeedError(Exception):
+    pass
+
+
+# Features converted and upserted at a time
+BATCH_SIZE = 1000
+# Where the features are in the official layout and in a bare GeoJSON
+# FeatureCollection
+FEATURE_PREFIXES = ("events.features.item", "features.item")
+
+
+def _objects(feed):
+    """
+    Yields (prefix, object) for the "countries" object and each feature in
+    the JSON file `feed`, building each one from ijson's parse events as
+    it is reached, so only one feature is held in memory at a time.
+    """
+    builder = target = None
+    for prefix, event, value in ijson.parse(feed):
+        if builder is None:
+            if event != "start_map" or (
+                    prefix != "countries" and prefix not in FEATURE_PREFIXES):
+                continue
+            builder, target = ijson.ObjectBuilder(), prefix
+        builder.event(event, value)
+        if event == "end_map" and prefix == target:
+            yield target, builder.value
+            builder = None
+
+
+def _stream(feed, countries):
+    # Features can only be resolved by countrycode once the countries have
+    # been read, so in the official layout any that come first wait for them
+    pending = []
+    for prefix, value in _objects(feed):
+        if prefix == "countries":
+            countries.update(value)
+            yield from pending
+            pending = []
+        elif prefix == "features.item" or countries:
+            yield value
+        else:
+            pending.append(value)
+    yield from pending
+
+
+def read_feed(feed):
+    """
+    Returns the countries and an iterator over the event features of a
+    parkrun events feed, read from the open binary file `feed`.
+
+    Both the official ``{"countries": {...}, "events": <FeatureCollection>}``
+    layout and a bare GeoJSON FeatureCollection are understood. When ijson
+    is installed the features are parsed as they are iterated over, and the
+    countries dict is filled in as soon as they are reached; otherwise the
+    whole feed is loaded up front.
+    """
+    if ijson is None:
+        data = json.load(feed, parse_float=Decimal)
+        if "events" in data:
+            return data.get("countries", {}), iter(data["events"]["features"])
+        return {}, iter(data.get("features", []))
+
+    countries = {}
+    return countries, _stream(feed, countries)
+
+
+def batches(iterable, size):
+    """Yields lists of up to `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _normalise_url(url):
+    url = (url or "").strip().lower()
+    for scheme in ("http://", "https://"):
+        if url.startswith(scheme):
+            url = url[len(scheme):]
+    return url.rstrip("/")
+
+
+class CountryResolver(object):
+    """
+    Maps the country name or feed countrycode of a feature to a Country,
+    matching feed countries to existing rows by name and then by URL.
+    """
+
+    def __init__(self, feed_countries):
+        self.feed_countries = feed_countries
+        self.by_name = {}
+        self.by_url = {}
+        for country in Country.objects.all():
+            self.by_name[country.name] = country
+            self.by_url.setdefault(_normalise_url(country.url), country)
+
+    def resolve(self, properties):
+        if "country" in properties:
+            country = self.by_name.get(properties["country"])
+            if country is None:
+                raise FeedError(
+                    "Unknown country %r" % properties["country"])
+            return country
+
+        code = str(properties.get("countrycode"))
+        feed_country = self.feed_countries.get(code)
+        if feed_country is None:
+            raise FeedError("Unknown countrycode %r" % code)
+        country = self.by_name.get(feed_country.get("name"))
+        if country is None:
+            country = self.by_url.get(_normalise_url(feed_country.get("url")))
+        if country is None:
+            raise FeedError(
+                "No Country matches countrycode %r (%s)"
+                % (code, feed_country.get("url")))
+        return country
+
+
+def _coordinate(value):
+    return str(Decimal(str(value)).quantize(COORDINATE_PLACES, ROUND_HALF_UP))
+
+
+def feature_to_item(feature, resolver):
+    """Converts a GeoJSON feature to an EventSerializer-style dict."""
+    properties = feature.get("properties") or {}
+    try:
+        longitude, latitude = feature["geometry"]["coordinates"][:2]
+        slug = properties.get("slug") or properties["eventname"]
+        name = properties.get("name") or properties["EventShortName"]
+    except (KeyError, TypeError, ValueError) as exc:
+        raise FeedError("Malformed feature %r: %s" % (feature.get("id"), exc))
+
+    item = {
+        "country": resolver.resolve(properties).pk,
+        "name": name,
+        "slug": slug,
+        "is_discontinued": False,
+        "latitude": _coordinate(latitude),
+        "longitude": _coordinate(longitude),
+    }
+    # Flags the feed doesn't carry are left out, so they keep their current
+    # value rather than being reset
+    if "is_juniors" in properties:
+        item["is_juniors"] = properties["is_juniors"]
+    elif "seriesid" in properties:
+        item["is_juniors"] = properties["seriesid"] == JUNIOR_SERIES
+    if "is_restricted" in properties:
+        item["is_restricted"] = properties["is_restricted"]
+    return item
+
+
+def import_events(path, dry_run=False):
+    """
+    Brings Events into line with the feed at `path`.
+
+    Events in the feed are created or updated (and undiscontinued) as
+    needed, and Events in the feed's countries that are missing from it are
+    marked discontinued. The features are converted and upserted
+    BATCH_SIZE at a time, all in one transaction. Returns a dict of counts
+    by status, plus the number of events read and the seconds taken.
+    """
+    started = time.monotonic()
+    counts = {"created": 0, "updated": 0, "unchanged": 0, "read": 0}
+    present = set()
+    with open(path, "rb") as feed, transaction.atomic():
+        feed_countries, features = read_feed(feed)
+        resolver = CountryResolver(feed_countries)
+        for batch in batches(features, BATCH_SIZE):
+            items = [feature_to_item(feature, resolver) for feature in batch]
+            try:
+                results = upsert_events(items, dry_run=dry_run)
+            except ValidationError as exc:
+                # Number the errors from the start of the feed
+                if isinstance(exc.detail, list):
+                    raise ValidationError(
+                        [{}] * counts["read"] + list(exc.detail))
+                raise
+            for result in results:
+                counts[result["status"]] += 1
+            present.update((item["country"], item["slug"]) for item in items)
+            counts["read"] += len(items)
+
+        countries = {country for country, _ in present}
+        current = Event.objects.filter(
+            country_id__in=countries, is_discontinued=False).values_list(
+            "country_id", "slug", "name", "latitude", "longitude")
+        discontinued = [
+            {"country": country, "slug": slug, "name": name,
+             "latitude": latitude, "longitude": longitude,
+             "is_discontinued": True}
+            for country, slug, name, latitude, longitude in current
+            if (country, slug) not in present]
+        if discontinued:
+            upsert_events(discontinued, dry_run=dry_run)
+
+    counts["discontinued"] = len(discontinued)
+    counts["seconds"] = time.monotonic() - started
+    return counts
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from django.urls import URLResolver
+from django.urls.resolvers import RegexPattern
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+
+class LazyURLConf(object):
+    """
+    A URLconf whose urlpatterns are only built, by calling `build`, the
+    first time a URL under it is resolved or reversed.
+    """
+
+    def __init__(self, build):
+        self.build = build
+
+    @cached_property
+    def urlpatterns(self):
+        return self.build()
+
+
+class LazyRouter(object):
+    """
+    Like a DRF SimpleRouter, but takes the dotted path of each viewset and
+    only imports it, and DRF, when a URL under its prefix is first resolved
+    (or any of the URLs is reversed).
+    """
+
+    def __init__(self):
+        self.registry = []
+
+    def register(self, prefix, viewset, basename):
+        self.registry.append((prefix, viewset, basename))
+
+    def get_routes(self, viewset, basename):
+        from rest_framework.routers import SimpleRouter
+
+        router = SimpleRouter()
+        router.register("", import_string(viewset), basename=basename)
+        return router.urls
+
+    @property
+    def urls(self):
+        return [
+            URLResolver(RegexPattern(r"^%s/" % prefix), LazyURLConf(
+                lambda viewset=viewset, basename=basename:
+                self.get_routes(viewset, basename)))
+            for prefix, viewset, basename in self.registry]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand, CommandError
+
+from parkrundata.conf import get_setting
+from parkrundata.search import search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the event search index served by /events/search/ and saves "
+        "it to PARKRUNDATA_SEARCH_INDEX_PATH, or to --path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="File to save the index to")
+
+    def handle(self, *args, **options):
+        path = options["path"] or get_setting("SEARCH_INDEX_PATH")
+        if path is None:
+            raise CommandError(
+                "Set PARKRUNDATA_SEARCH_INDEX_PATH or pass --path.")
+        search_index.build()
+        search_index.save(path)
+        self.stdout.write(self.style.SUCCESS(
+            "Saved the search index of %d events to %s" % (
+                len(search_index), path)))
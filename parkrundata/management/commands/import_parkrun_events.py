@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.exceptions import ValidationError
+
+from parkrundata.importer import FeedError, import_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates, updates and discontinues Events to match a parkrun "
+        "events JSON/GeoJSON feed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the events feed")
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report what would change without writing anything")
+
+    def handle(self, *args, **options):
+        try:
+            counts = import_events(options["path"],
+                                   dry_run=options["dry_run"])
+        except (OSError, ValueError, FeedError) as exc:
+            raise CommandError(str(exc))
+        except ValidationError as exc:
+            errors = exc.detail
+            if isinstance(errors, list):
+                errors = "; ".join(
+                    "event %d: %s" % (index, dict(error))
+                    for index, error in enumerate(errors) if error)
+            raise CommandError("Invalid events in feed: %s" % errors)
+
+        seconds = counts["seconds"]
+        rate = counts["read"] / seconds if seconds else 0
+        prefix = "Dry run: would have " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            "%screated %d, updated %d, discontinued %d, left %d unchanged "
+            "(%d events in %.2fs, %.0f events/s)" % (
+                prefix, counts["created"], counts["updated"],
+                counts["discontinued"], counts["unchanged"],
+                counts["read"], seconds, rate)))
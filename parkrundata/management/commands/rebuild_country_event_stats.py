@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand
+
+from parkrundata.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the per-country event counts served by "
+        "/countries/stats/ from the Events table."
+    )
+
+    def handle(self, *args, **options):
+        countries = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            "Rebuilt event stats for %d countries" % countries))
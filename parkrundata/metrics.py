@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+import contextlib
+import threading
+import time
+
+from django.db import connections
+
+from .conf import get_setting
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class RequestMetrics(object):
+    """Timings collected for a single request by MetricsMiddleware."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None
+        self.view_started = None
+        self.view_finished = None
+        self.render_finished = None
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.view_db_seconds = 0.0
+        self.size = None
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_seconds += elapsed
+            if self.view_started is not None and self.view_finished is None:
+                self.view_db_seconds += elapsed
+
+    @property
+    def serialize_seconds(self):
+        """Time spent in the view outside the database."""
+        if self.view_started is None or self.view_finished is None:
+            return 0.0
+        elapsed = self.view_finished - self.view_started
+        return max(elapsed - self.view_db_seconds, 0.0)
+
+    @property
+    def render_seconds(self):
+        if self.view_finished is None or self.render_finished is None:
+            return 0.0
+        return self.render_finished - self.view_finished
+
+    def server_timing(self, total):
+        return ", ".join([
+            'db;dur=%.3f;desc="%d queries"' % (self.db_seconds * 1000,
+                                               self.queries),
+            "serialize;dur=%.3f" % (self.serialize_seconds * 1000),
+            "render;dur=%.3f" % (self.render_seconds * 1000),
+            "total;dur=%.3f" % (total * 1000),
+        ])
+
+
+class Histogram(object):
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+
+class MetricsRegistry(object):
+    """
+    Thread-safe, process-local aggregate of RequestMetrics, rendered in the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.durations = {}
+            self.queries = {}
+            self.totals = {}
+
+    def record(self, metrics, method, status, total):
+        labels = (metrics.view or "", method)
+        with self.lock:
+            key = labels + (str(status),)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.durations.setdefault(
+                labels, Histogram(DURATION_BUCKETS)).observe(total)
+            self.queries.setdefault(
+                labels, Histogram(QUERY_BUCKETS)).observe(metrics.queries)
+            totals = self.totals.setdefault(labels, {
+                "db_seconds": 0.0, "serialize_seconds": 0.0,
+                "render_seconds": 0.0, "response_bytes": 0})
+            totals["db_seconds"] += metrics.db_seconds
+            totals["serialize_seconds"] += metrics.serialize_seconds
+            totals["render_seconds"] += metrics.render_seconds
+            totals["response_bytes"] += metrics.size or 0
+
+    def render(self):
+        lines = []
+
+        def labels(view, method, **extra):
+            pairs = [("view", view), ("method", method)] + sorted(
+                extra.items())
+            return "{%s}" % ",".join(
+                '%s="%s"' % (name, escape(value)) for name, value in pairs)
+
+        def histogram(name, help_text, histograms):
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s histogram" % name)
+            for (view, method), histogram in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",),
+                                        histogram.counts):
+                    cumulative += count
+                    lines.append("%s_bucket%s %d" % (
+                        name, labels(view, method, le=str(bound)),
+                        cumulative))
+                lines.append("%s_sum%s %r" % (
+                    name, labels(view, method), float(histogram.sum)))
+                lines.append("%s_count%s %d" % (
+                    name, labels(view, method), histogram.count))
+
+        with self.lock:
+            lines.append("# HELP parkrundata_requests_total "
+                         "Requests handled.")
+            lines.append("# TYPE parkrundata_requests_total counter")
+            for (view, method, status), count in sorted(
+                    self.requests.items()):
+                lines.append("parkrundata_requests_total%s %d" % (
+                    labels(view, method, status=status), count))
+
+            histogram("parkrundata_request_duration_seconds",
+                      "Time from request to response.", self.durations)
+            histogram("parkrundata_request_queries",
+                      "SQL queries per request.", self.queries)
+
+            for total, help_text in (
+                    ("db_seconds", "Time spent executing SQL."),
+                    ("serialize_seconds",
+                     "Time spent in views outside the database."),
+                    ("render_seconds", "Time spent rendering responses."),
+                    ("response_bytes", "Size of non-streaming responses.")):
+                name = "parkrundata_%s_total" % total
+                lines.append("# HELP %s %s" % (name, help_text))
+                lines.append("# TYPE %s counter" % name)
+                for (view, method), totals in sorted(self.totals.items()):
+                    lines.append("%s%s %r" % (
+                        name, labels(view, method), totals[total]))
+        return "\n".join(lines) + "\n"
+
+
+def escape(value):
+    return (value.replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware(object):
+    """
+    Records SQL query count, database time, serialization and render time
+    and response size for each request into `registry`, and reports them
+    in a Server-Timing header unless PARKRUNDATA_SERVER_TIMING is False.
+
+    Serialization time is the time spent in the view, less the database
+    time within it; render time runs from the view returning to the
+    response being rendered.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = request.parkrundata_metrics = RequestMetrics()
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(metrics.execute_wrapper))
+            response = self.get_response(request)
+
+        if metrics.view_started is not None and metrics.view_finished is None:
+            metrics.view_finished = time.perf_counter()
+        if not response.streaming:
+            metrics.size = len(response.content)
+        total = time.perf_counter() - metrics.started
+
+        registry.record(metrics, request.method, response.status_code, total)
+        if get_setting("SERVER_TIMING"):
+            response["Server-Timing"] = metrics.server_timing(total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = request.parkrundata_metrics
+        match = request.resolver_match
+        metrics.view = match.view_name if match else view_func.__name__
+        metrics.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        metrics = request.parkrundata_metrics
+        metrics.view_finished = time.perf_counter()
+
+        def finished(response):
+            metrics.render_finished = time.perf_counter()
+        response.add_post_render_callback(finished)
+        return response
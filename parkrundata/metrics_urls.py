@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+
+from django.urls import path
+
+from . import views
+
+
+# Included by projects that scrape MetricsMiddleware's totals, apart from
+# parkrundata.urls so the endpoint isn't served unless it's wanted
+urlpatterns = [
+    path("metrics/", views.metrics, name="parkrundata-metrics"),
+]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:22
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parkrundata', '0003_auto_20180718_0605'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventTombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.IntegerField()),
+                ('country_id', models.IntegerField()),
+                ('slug', models.CharField(max_length=256)),
+                ('deleted', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['modified', 'id'], name='parkrundata_modifie_bbc67d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['modified', 'id'], name='parkrundata_modifie_1d9d39_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventtombstone',
+            index=models.Index(fields=['deleted', 'id'], name='parkrundata_deleted_409daa_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parkrundata', '0004_event_changes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['country', 'is_discontinued', 'is_juniors', 'is_restricted'], name='parkrundata_country_966a9e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['is_discontinued', 'is_juniors', 'is_restricted'], name='parkrundata_is_disc_a59f52_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['slug'], name='parkrundata_slug_fb98dd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['name'], name='parkrundata_event_name_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parkrundata', '0005_event_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['latitude', 'longitude'], name='parkrundata_latitud_14e7fe_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:38
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def build_stats(apps, schema_editor):
+    Country = apps.get_model('parkrundata', 'Country')
+    CountryEventStats = apps.get_model('parkrundata', 'CountryEventStats')
+    Event = apps.get_model('parkrundata', 'Event')
+    counts = {
+        row.pop('country_id'): row for row in
+        Event.objects.order_by().values('country_id').annotate(
+            total=Count('id'),
+            juniors=Count('id', filter=Q(is_juniors=True)),
+            restricted=Count('id', filter=Q(is_restricted=True)),
+            discontinued=Count('id', filter=Q(is_discontinued=True)))
+    }
+    CountryEventStats.objects.bulk_create([
+        CountryEventStats(country_id=pk, **counts.get(pk, {}))
+        for pk in Country.objects.values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parkrundata', '0006_event_location_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CountryEventStats',
+            fields=[
+                ('country', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='event_stats', serialize=False, to='parkrundata.country')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('juniors', models.PositiveIntegerField(default=0)),
+                ('restricted', models.PositiveIntegerField(default=0)),
+                ('discontinued', models.PositiveIntegerField(default=0)),
+                ('modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
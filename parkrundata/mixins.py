@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+from calendar import timegm
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from rest_framework.exceptions import ValidationError as APIValidationError
+
+
+class ConditionalGetMixin(object):
+    """
+    Adds ETag and Last-Modified validators to list and retrieve, and
+    answers If-None-Match/If-Modified-Since before anything is serialized.
+
+    A collection is validated by the row count and latest `modified` of the
+    filtered queryset, which costs a single aggregate query. Deletions only
+    show up in Last-Modified if `tombstone_queryset` is set; otherwise lists
+    are validated by ETag alone.
+    """
+    tombstone_queryset = None
+    tombstone_field = "deleted"
+
+    def get_validator_relations(self):
+        """
+        Returns the relations whose `modified` also goes into the
+        validators, for responses that include related objects.
+        """
+        return ()
+
+    def get_validators(self):
+        """Returns an (etag, last_modified) pair for the current request."""
+        queryset = self.filter_queryset(self.get_queryset())
+        timestamps = ["modified"] + [
+            relation + "__modified"
+            for relation in self.get_validator_relations()]
+
+        if self.action == "retrieve":
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            try:
+                row = queryset.filter(**lookup).values_list(
+                    *timestamps).first()
+            except (TypeError, ValueError, ValidationError):
+                row = None
+            if row is None:
+                return None, None
+            last_modified = max(filter(None, row))
+            state = [timestamp.isoformat() for timestamp in row]
+        else:
+            aggregates = {"last_%d" % i: Max(timestamp)
+                          for i, timestamp in enumerate(timestamps)}
+            aggregate = queryset.aggregate(count=Count("pk"), **aggregates)
+            values = [aggregate["last_%d" % i] for i in range(len(timestamps))]
+            last_modified = max(filter(None, values), default=None)
+            state = [aggregate["count"]] + [
+                value and value.isoformat() for value in values]
+            if self.tombstone_queryset is None:
+                last_modified = None
+            elif last_modified is not None:
+                last_deleted = self.tombstone_queryset.aggregate(
+                    last=Max(self.tombstone_field))["last"]
+                if last_deleted is not None:
+                    last_modified = max(last_modified, last_deleted)
+
+        return self.make_validators(state, last_modified)
+
+    def make_validators(self, state, last_modified):
+        """
+        Returns the (etag, last_modified) pair for the data `state` of the
+        response, adding what else the representation depends on.
+        """
+        state = list(state) + [self.request.get_full_path(),
+                               self.request.accepted_media_type]
+        digest = hashlib.sha1(repr(state).encode("utf-8")).hexdigest()
+        return '"%s"' % digest, last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        validators = HttpResponse()
+        validators["ETag"] = etag
+        timestamp = None
+        if last_modified is not None:
+            timestamp = timegm(last_modified.utctimetuple())
+            validators["Last-Modified"] = http_date(timestamp)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp, response=validators)
+        if response is not validators:
+            return response
+
+        response = handler(request, *args, **kwargs)
+        for header in ("ETag", "Last-Modified"):
+            if header in validators:
+                response[header] = validators[header]
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class SparseFieldsMixin(object):
+    """
+    Supports `?fields=a,b` on list and retrieve to limit both the serialized
+    fields and the columns selected, and `?expand=<relation>` to nest any of
+    the serializer's `expandable_fields`, fetched with select_related.
+
+    The serializer must use DynamicFieldsMixin. List this mixin before
+    ConditionalGetMixin and CachedResponseMixin so that expanded relations
+    are taken into account by their validators and cache keys.
+    """
+    sparse_actions = ("list", "retrieve")
+
+    def get_field_selection(self):
+        """Returns the requested (fields, expand) for this request."""
+        if getattr(self, "action", None) not in self.sparse_actions:
+            return None, []
+        if not hasattr(self, "_field_selection"):
+            self._field_selection = self._parse_field_selection()
+        return self._field_selection
+
+    def _parse_field_selection(self):
+        serializer_class = self.get_serializer_class()
+        params, errors = self.request.GET, {}
+
+        fields = None
+        if params.get("fields"):
+            fields = [name for name in params["fields"].split(",") if name]
+            unknown = set(fields) - set(serializer_class.Meta.fields)
+            if unknown:
+                errors["fields"] = ["Unknown field(s): %s" % ", ".join(
+                    sorted(unknown))]
+
+        expand = [name for name in params.get("expand", "").split(",")
+                  if name]
+        unknown = set(expand) - set(serializer_class.expandable_fields)
+        if unknown:
+            errors["expand"] = ["Cannot expand: %s" % ", ".join(
+                sorted(unknown))]
+        if errors:
+            raise APIValidationError(errors)
+
+        if fields is not None:
+            expand = [name for name in expand if name in fields]
+        return fields, expand
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields, expand = self.get_field_selection()
+        if expand:
+            queryset = queryset.select_related(*expand)
+        if fields is not None:
+            queryset = queryset.only(*fields)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_field_selection()
+        if fields is not None:
+            kwargs.setdefault("fields", fields)
+        if expand:
+            kwargs.setdefault("expand", expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_validator_relations(self):
+        return tuple(super().get_validator_relations()) + tuple(
+            self.get_field_selection()[1])
+
+    def get_cache_dependencies(self):
+        model = self.get_queryset().model
+        return tuple(super().get_cache_dependencies()) + tuple(
+            model._meta.get_field(name).related_model
+            for name in self.get_field_selection()[1])
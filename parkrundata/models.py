@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 
 from django.db import models
+from django.utils import timezone
 
+from model_utils import FieldTracker
 from model_utils.models import TimeStampedModel
 
 
@@ -9,6 +11,11 @@ class Country(TimeStampedModel):
     name = models.CharField(max_length=128, unique=True)
     url = models.URLField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["modified", "id"]),
+        ]
+
 
 class Event(TimeStampedModel):
     country = models.ForeignKey(Country, on_delete=models.PROTECT)
@@ -20,8 +27,56 @@ class Event(TimeStampedModel):
     latitude = models.DecimalField(max_digits=8, decimal_places=6)
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
 
+    # Saved values of the fields CountryEventStats counts on, and of the
+    # slug, which cached lookups by country and slug are invalidated by
+    tracker = FieldTracker(fields=[
+        "country_id", "slug", "is_juniors", "is_restricted",
+        "is_discontinued"])
+
     class Meta:
         unique_together = (
             ("country", "name"),
             ("country", "slug"),
         )
+        indexes = [
+            models.Index(fields=["modified", "id"]),
+            models.Index(fields=[
+                "country", "is_discontinued", "is_juniors", "is_restricted"]),
+            models.Index(fields=[
+                "is_discontinued", "is_juniors", "is_restricted"]),
+            models.Index(fields=["slug"]),
+            # varchar_pattern_ops lets PostgreSQL use it for name prefixes
+            # (LIKE 'prefix%') whatever the collation; other backends ignore
+            # the operator class
+            models.Index(fields=["name"], name="parkrundata_event_name_idx",
+                         opclasses=["varchar_pattern_ops"]),
+            models.Index(fields=["latitude", "longitude"]),
+        ]
+
+
+class EventTombstone(models.Model):
+    """Records a deleted Event so incremental sync clients can drop it."""
+    event_id = models.IntegerField()
+    country_id = models.IntegerField()
+    slug = models.CharField(max_length=256)
+    deleted = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["deleted", "id"]),
+        ]
+
+
+class CountryEventStats(models.Model):
+    """
+    Event counts per Country, kept up to date as Events are saved, deleted
+    and bulk upserted. `rebuild_country_event_stats` recomputes them.
+    """
+    country = models.OneToOneField(Country, on_delete=models.CASCADE,
+                                   primary_key=True,
+                                   related_name="event_stats")
+    total = models.PositiveIntegerField(default=0)
+    juniors = models.PositiveIntegerField(default=0)
+    restricted = models.PositiveIntegerField(default=0)
+    discontinued = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
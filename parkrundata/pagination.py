@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+
+from django.db.models import QuerySet
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class _Keys(object):
+    """The `attr` of each of `rows`, for bisect."""
+
+    def __init__(self, rows, attr):
+        self.rows = rows
+        self.attr = attr
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return getattr(self.rows[index], self.attr)
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the primary key.
+
+    Each page is a ``WHERE id > <cursor> ORDER BY id LIMIT n`` query, so
+    fetching a page costs the same however deep into the list it is.
+    """
+    ordering = "id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def paginate_sequence(self, rows, request, view=None):
+        """
+        paginate_queryset() for a sequence of rows already in memory, in
+        ascending order of the (single) ordering field.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, rows, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        order = self.ordering[0]
+        order_attr = order.lstrip("-")
+        ascending = order.startswith("-") == reverse
+        start, stop = 0, len(rows)
+        if str(current_position) != "None" and rows:
+            keys = _Keys(rows, order_attr)
+            try:
+                position = type(keys[0])(current_position)
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            if ascending:
+                start = bisect.bisect_right(keys, position)
+            else:
+                stop = bisect.bisect_left(keys, position)
+
+        indexes = range(start, stop)
+        if not ascending:
+            indexes = indexes[::-1]
+        results = [rows[index]
+                   for index in indexes[offset:offset + self.page_size + 1]]
+
+        # The rest is as in CursorPagination.paginate_queryset()
+        self.page = results[:self.page_size]
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = str(getattr(results[-1], order_attr))
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not isinstance(queryset, QuerySet):
+            return self.paginate_sequence(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import json
+
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .wire import WireFormatError, decode_coordinates, decode_events, msgpack
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON into a list, one item per line.
+    """
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        items = []
+        decoded_stream = codecs.getreader(encoding)(stream)
+        for number, line in enumerate(decoded_stream, 1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(
+                    "NDJSON parse error on line %d - %s" % (number, exc))
+        return items
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parses MessagePack, turning int micro-degree coordinates back into
+    Decimals. Needs the optional `msgpack` package.
+    """
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            data = msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError("MessagePack parse error - %s" % exc)
+        return decode_coordinates(data)
+
+
+class BinaryEventParser(BaseParser):
+    """
+    Parses events in the fixed binary schema of `wire.encode_events`.
+    """
+    media_type = "application/vnd.parkrundata.event"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return decode_events(stream.read())
+        except WireFormatError as exc:
+            raise ParseError("Binary event parse error - %s" % exc)
+
+
+# MessagePack is only accepted when the optional msgpack package is installed
+MSGPACK_PARSERS = [MessagePackParser] if msgpack is not None else []
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .wire import encode_coordinates, encode_events, msgpack
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders a list as newline-delimited JSON, one item per line.
+    """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render_line(self, item):
+        return json.dumps(item, cls=DjangoJSONEncoder,
+                          separators=(",", ":")) + "\n"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if not isinstance(data, list):
+            data = [data]
+        return "".join(self.render_line(item) for item in data).encode(
+            self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renders a list of dicts as CSV with a header row taken from the keys of
+    the first item.
+    """
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render_rows(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row)
+        return buffer.getvalue()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not data:
+            return b""
+        if not isinstance(data, list):
+            data = [data]
+        header = list(data[0])
+        rows = [header] + [[item.get(key) for key in header] for item in data]
+        return self.render_rows(rows).encode(self.charset)
+
+
+class GeoJSONRenderer(JSONRenderer):
+    """
+    Renders events as GeoJSON: a list (paginated or not) becomes a
+    FeatureCollection of Point features and a single event a Feature.
+
+    Each event's `latitude` and `longitude` become the geometry and its
+    `id` the feature id; the other fields are kept as properties. Data that
+    is already GeoJSON, and error responses, are rendered unchanged.
+    """
+    media_type = "application/geo+json"
+    format = "geojson"
+
+    def feature(self, item):
+        properties = dict(item)
+        latitude = properties.pop("latitude", None)
+        longitude = properties.pop("longitude", None)
+        geometry = None
+        if latitude is not None and longitude is not None:
+            geometry = {"type": "Point",
+                        "coordinates": [float(longitude), float(latitude)]}
+        feature = {"type": "Feature", "geometry": geometry,
+                   "properties": properties}
+        if "id" in properties:
+            feature["id"] = properties.pop("id")
+        return feature
+
+    def to_geojson(self, data):
+        if isinstance(data, list):
+            return {"type": "FeatureCollection",
+                    "features": [self.feature(item) for item in data]}
+        if "results" in data:
+            collection = self.to_geojson(data["results"])
+            for key, value in data.items():
+                if key != "results":
+                    collection[key] = value
+            return collection
+        return self.feature(data)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get("response")
+        error = response is not None and response.exception
+        is_geojson = isinstance(data, dict) and "type" in data
+        if data is not None and not error and not is_geojson:
+            data = self.to_geojson(data)
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders MessagePack, with coordinates as int micro-degrees. Needs the
+    optional `msgpack` package.
+    """
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(encode_coordinates(data), use_bin_type=True,
+                             default=DjangoJSONEncoder().default)
+
+
+class BinaryEventRenderer(BaseRenderer):
+    """
+    Renders events in the fixed binary schema of `wire.encode_events`.
+    Error responses are rendered as JSON, and any other data that isn't
+    events raises WireFormatError.
+    """
+    media_type = "application/vnd.parkrundata.event"
+    format = "bin"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        response = (renderer_context or {}).get("response")
+        if response is not None and response.exception:
+            response["Content-Type"] = JSONRenderer.media_type
+            return JSONRenderer().render(data)
+        return encode_events(data)
+
+
+# MessagePack is only offered when the optional msgpack package is installed
+MSGPACK_RENDERERS = [MessagePackRenderer] if msgpack is not None else []
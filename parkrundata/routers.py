@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+import contextvars
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from .cache import KEY_PREFIX, get_cache
+from .conf import get_setting
+
+
+APP_LABEL = "parkrundata"
+PIN_COOKIE = "parkrundata_primary"
+WRITTEN_KEY = "%s:replicas:written" % KEY_PREFIX
+
+_routing = contextvars.ContextVar("parkrundata_routing", default=None)
+_replicas = (None, None)
+_replicas_lock = threading.Lock()
+
+
+class RoutingState(object):
+    """Where the queries of one request go."""
+
+    def __init__(self, replica=None):
+        # None sends reads to the primary
+        self.replica = replica
+        self.wrote = False
+
+
+def next_replica():
+    """Returns the replicas in REPLICA_DATABASES in turn, or None."""
+    global _replicas
+    aliases = tuple(get_setting("REPLICA_DATABASES"))
+    if not aliases:
+        return None
+    with _replicas_lock:
+        if _replicas[0] != aliases:
+            _replicas = (aliases, itertools.cycle(aliases))
+        return next(_replicas[1])
+
+
+def mark_written():
+    """
+    Sends reads from every client to the primary for REPLICA_STICKY_SECONDS,
+    so responses cached in the meantime aren't built from a replica that
+    hasn't caught up with the write yet.
+    """
+    get_cache().set(WRITTEN_KEY, True, get_setting("REPLICA_STICKY_SECONDS"))
+
+
+def is_pinned(request):
+    """Whether `request` must read from the primary to see recent writes."""
+    try:
+        written = float(request.COOKIES.get(PIN_COOKIE, ""))
+    except ValueError:
+        written = None
+    sticky = get_setting("REPLICA_STICKY_SECONDS")
+    if written is not None and time.time() - written < sticky:
+        return True
+    return get_cache().get(WRITTEN_KEY) is not None
+
+
+@contextmanager
+def request_routing(request):
+    """
+    Routes the parkrundata queries made inside the block for `request`:
+    reads for safe methods go to one of the replicas unless the client
+    wrote recently, and everything else goes to the primary.
+    """
+    # Imported here, to keep DRF out of django.setup() via the signals
+    from rest_framework.permissions import SAFE_METHODS
+
+    replica = None
+    if request.method in SAFE_METHODS and get_setting("REPLICA_DATABASES"):
+        if not is_pinned(request):
+            replica = next_replica()
+    token = _routing.set(RoutingState(replica))
+    try:
+        yield _routing.get()
+    finally:
+        _routing.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Sends all parkrundata queries inside the block to the primary."""
+    token = _routing.set(RoutingState())
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+
+
+class ReplicaRouter(object):
+    """
+    Sends reads of parkrundata models made by ReplicaReadMixin views for
+    safe methods to PARKRUNDATA_REPLICA_DATABASES, and all other queries,
+    including reads outside those views, to
+    PARKRUNDATA_PRIMARY_DATABASE.
+
+    Once a request writes, its later reads stay on the primary, and the
+    client and (through the cache) everyone else keep reading from the
+    primary for PARKRUNDATA_REPLICA_STICKY_SECONDS, which should cover the
+    replication lag.
+
+    Every thread keeps its own connection to each alias it uses, so with
+    replicas a worker holds up to one connection per alias. Set
+    CONN_MAX_AGE on the primary and replicas to reuse them across requests
+    rather than connecting on every one, and keep workers times aliases
+    within what each server accepts, or put a pooler such as PgBouncer in
+    front of them. The checks
+    in parkrundata.checks warn about settings that work against this.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        state = _routing.get()
+        if state is not None and state.replica and not state.wrote:
+            return state.replica
+        return get_setting("PRIMARY_DATABASE")
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        primary = get_setting("PRIMARY_DATABASE")
+        state = _routing.get()
+        if state is None or not state.wrote:
+            if state is not None:
+                state.wrote = True
+            if get_setting("REPLICA_DATABASES"):
+                mark_written()
+                # The lag only starts once the write is committed
+                transaction.on_commit(mark_written, using=primary)
+        return primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {get_setting("PRIMARY_DATABASE")}
+        databases.update(get_setting("REPLICA_DATABASES"))
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaReadMixin(object):
+    """
+    Routes the queries of each request through ReplicaRouter, and tells
+    clients that wrote to keep reading from the primary for a while.
+    """
+
+    def pin_response(self, response, state):
+        if state.wrote and get_setting("REPLICA_DATABASES"):
+            response.set_cookie(
+                PIN_COOKIE, "%.3f" % time.time(),
+                max_age=get_setting("REPLICA_STICKY_SECONDS"),
+                httponly=True, samesite="Lax")
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        with request_routing(request) as state:
+            return self.pin_response(
+                super().dispatch(request, *args, **kwargs), state)
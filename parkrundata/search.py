@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import datetime
+import heapq
+import os
+import pickle
+import tempfile
+import threading
+import unicodedata
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import KEY_PREFIX, get_counter, incr_counter
+from .conf import get_setting
+from .models import Country, Event, EventTombstone
+from .routers import use_primary
+
+
+# Bumped whenever the layout of the saved index changes
+FORMAT = 2
+# Fraction of the query's trigrams a result must share
+MIN_SCORE = 0.3
+VERSION_KEY = "%s:search:version" % KEY_PREFIX
+# How far before the last catch up the next one looks, so that rows saved
+# in transactions which were still open then are seen
+CATCH_UP_MARGIN = datetime.timedelta(minutes=10)
+# The attributes holding the index, as saved
+STATE = ("_postings", "_documents", "_events", "_countries",
+         "_country_events")
+
+
+def words(text):
+    """
+    Splits `text` into lower case words of letters and digits, without
+    accents, so "Fulham Palace" and "fulhampalace" share most trigrams.
+    """
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(
+        char if char.isalnum() else " " for char in text
+        if not unicodedata.combining(char))
+    return text.split()
+
+
+def trigrams(text):
+    """
+    Returns the set of three character substrings of each word in `text`,
+    padded as PostgreSQL's pg_trgm does, with two spaces at the start and
+    one at the end, so short words and word starts count too.
+    """
+    found = set()
+    for word in words(text):
+        padded = "  %s " % word
+        found.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return found
+
+
+class TrigramIndex(object):
+    """
+    An inverted index from the trigrams of each Event's name, slug and
+    country's name to the Events they appear in.
+
+    A search counts, for each Event sharing a trigram with the query, how
+    many it shares, walking only the postings of the query's trigrams
+    rather than comparing the query with every Event, although a common
+    trigram can be shared by most of them. Results are ranked by the
+    fraction of the query's trigrams they contain, which tolerates typos
+    and partial names, and then by the fraction of their own, which puts
+    closer matches first.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __contains__(self, pk):
+        return pk in self._documents
+
+    def clear(self):
+        self._postings = {}
+        self._documents = {}
+        self._events = {}
+        self._countries = {}
+        self._country_events = {}
+
+    def _index(self, pk):
+        name, slug, country_id = self._events[pk]
+        country = self._countries.get(country_id, "")
+        document = frozenset().union(
+            trigrams(name), trigrams(slug), trigrams(country))
+        self._unindex(pk)
+        self._documents[pk] = document
+        for trigram in document:
+            self._postings.setdefault(trigram, set()).add(pk)
+
+    def _unindex(self, pk):
+        for trigram in self._documents.pop(pk, ()):
+            posting = self._postings[trigram]
+            posting.discard(pk)
+            if not posting:
+                del self._postings[trigram]
+
+    def add_event(self, pk, name, slug, country_id):
+        previous = self._events.get(pk)
+        if previous == (name, slug, country_id):
+            return
+        if previous is not None:
+            self._country_events[previous[2]].discard(pk)
+        self._events[pk] = (name, slug, country_id)
+        self._country_events.setdefault(country_id, set()).add(pk)
+        self._index(pk)
+
+    def remove_event(self, pk):
+        previous = self._events.pop(pk, None)
+        if previous is not None:
+            self._country_events[previous[2]].discard(pk)
+        self._unindex(pk)
+
+    def set_country(self, pk, name):
+        """Sets the name of Country `pk`, indexing its Events again."""
+        if self._countries.get(pk) == name:
+            return
+        self._countries[pk] = name
+        for event in self._country_events.get(pk, ()):
+            self._index(event)
+
+    def remove_country(self, pk):
+        self._countries.pop(pk, None)
+
+    def search(self, query, limit=None):
+        """
+        Returns (score, pk) pairs for the best `limit` (or all) Events
+        matching `query`, best first, where score is between MIN_SCORE and
+        1.
+        """
+        wanted = trigrams(query)
+        if not wanted:
+            return []
+        shared = collections.Counter()
+        for trigram in wanted:
+            shared.update(self._postings.get(trigram, ()))
+
+        # Most trigrams in common first, then fewest trigrams of their own
+        minimum = MIN_SCORE * len(wanted)
+        ranked = [(-count, len(self._documents[pk]), pk)
+                  for pk, count in shared.items() if count >= minimum]
+        if limit is None:
+            ranked.sort()
+        else:
+            ranked = heapq.nsmallest(limit, ranked)
+        return [(-count / len(wanted), pk) for count, _, pk in ranked]
+
+
+class EventSearchIndex(TrigramIndex):
+    """
+    Process-local TrigramIndex of every Event.
+
+    The index is loaded on first use, from the file build_search_index
+    saved at SEARCH_INDEX_PATH if there is one, or else from the database.
+    It is then kept up to date from the Event and Country signals once
+    their transaction commits, each of which bumps a version counter in the
+    shared cache. When the counter shows that another process has changed
+    the catalogue, the index catches up with the Events and Countries saved
+    or deleted since it was last up to date, rather than loading them all
+    again. Without a cache to keep the counter in, every search catches up.
+
+    `lock` guards the index itself and is only held while it is read or
+    changed in memory, not during queries. One thread at a time loads or
+    catches up, while the others search the index as it was, unless there
+    is none yet.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.loaded = False
+        self.version = None
+        # When the index was last up to date with the database
+        self.synced = None
+        self.lock = threading.RLock()
+        self.loading = threading.Lock()
+
+    def replace(self, index, synced):
+        """Swaps in the contents of TrigramIndex `index` in one step."""
+        with self.lock:
+            for name in STATE:
+                setattr(self, name, getattr(index, name))
+            self.synced = synced
+            self.loaded = True
+
+    def build(self):
+        """Loads every Event and Country from the database."""
+        index = TrigramIndex()
+        synced = timezone.now()
+        with use_primary():
+            countries = Country.objects.values_list("pk", "name")
+            events = Event.objects.values_list(
+                "pk", "name", "slug", "country_id")
+            for pk, name in countries.iterator():
+                index.set_country(pk, name)
+            for pk, name, slug, country_id in events.iterator():
+                index.add_event(pk, name, slug, country_id)
+        self.replace(index, synced)
+
+    def catch_up(self):
+        """
+        Applies the Events and Countries saved, and the Events deleted,
+        since the index was last up to date, as found from their `modified`
+        times and the EventTombstones. Writes that skip the signals, like
+        QuerySet.update(), aren't seen.
+        """
+        synced = timezone.now()
+        since = self.synced - CATCH_UP_MARGIN
+        with use_primary():
+            deleted = set(EventTombstone.objects.filter(
+                deleted__gte=since).values_list("event_id", flat=True))
+            if deleted:
+                # Unless the id has been used again since
+                deleted -= set(Event.objects.filter(
+                    pk__in=deleted).values_list("pk", flat=True))
+            countries = list(Country.objects.filter(
+                modified__gte=since).values_list("pk", "name"))
+            changed = Event.objects.filter(modified__gte=since)
+            events = list(changed.values_list(
+                "pk", "name", "slug", "country_id"))
+        with self.lock:
+            for pk in deleted:
+                self.remove_event(pk)
+            for pk, name in countries:
+                self.set_country(pk, name)
+            for pk, name, slug, country_id in events:
+                self.add_event(pk, name, slug, country_id)
+            self.synced = synced
+
+    def save(self, path):
+        """
+        Writes the index to `path`, replacing any file there in one step so
+        other processes never read half of it.
+        """
+        with self.lock:
+            data = {name: getattr(self, name) for name in STATE}
+            data.update(format=FORMAT, synced=self.synced)
+            data = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as output:
+                output.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def read(self, path):
+        """
+        Loads the index saved at `path`, as it was when it was saved,
+        returning False, and leaving the index as it was, if there is none.
+        """
+        try:
+            with open(path, "rb") as saved:
+                data = pickle.load(saved)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False
+        if not isinstance(data, dict) or data.get("format") != FORMAT:
+            return False
+        index = TrigramIndex()
+        for name in STATE:
+            setattr(index, name, data[name])
+        self.replace(index, data["synced"])
+        return True
+
+    def load(self):
+        """
+        Reads the index saved at SEARCH_INDEX_PATH and catches it up, or
+        builds it from the database if there is none. It isn't saved here:
+        build_search_index does that, eg while deploying.
+        """
+        path = get_setting("SEARCH_INDEX_PATH")
+        if path is not None and self.read(path):
+            self.catch_up()
+        else:
+            self.build()
+
+    def ensure_loaded(self):
+        version = get_counter(VERSION_KEY)
+        if self.loaded and version is not None and version == self.version:
+            return
+        # Searches go on with the index as it is while it catches up
+        if not self.loading.acquire(blocking=not self.loaded):
+            return
+        try:
+            # Read first, so a change committed meanwhile is caught up too
+            version = get_counter(VERSION_KEY)
+            if not self.loaded:
+                self.load()
+            elif version is None or version != self.version:
+                self.catch_up()
+            self.version = version
+        finally:
+            self.loading.release()
+
+    def invalidate(self):
+        with self.lock:
+            self.clear()
+            self.loaded = False
+            self.version = None
+            self.synced = None
+
+    def apply(self, events=(), removed=(), countries=(),
+              removed_countries=()):
+        """
+        Indexes the `events` (pk, name, slug, country_id) and `countries`
+        (pk, name), and drops the `removed` Events and `removed_countries`,
+        once their transaction has committed, then tells the other
+        processes to catch up.
+        """
+        with self.lock:
+            if self.loaded:
+                for pk, name in countries:
+                    self.set_country(pk, name)
+                for pk, name, slug, country_id in events:
+                    self.add_event(pk, name, slug, country_id)
+                for pk in removed:
+                    self.remove_event(pk)
+                for pk in removed_countries:
+                    self.remove_country(pk)
+        version = incr_counter(VERSION_KEY)
+        with self.lock:
+            # This copy is still current unless another process changed
+            # the catalogue in between
+            counted = None not in (version, self.version)
+            if counted and version == self.version + 1:
+                self.version = version
+
+    def update_events(self, events):
+        rows = [(event.pk, event.name, event.slug, event.country_id)
+                for event in events]
+        transaction.on_commit(lambda: self.apply(events=rows))
+
+    def update_event(self, event):
+        self.update_events([event])
+
+    def delete_event(self, event):
+        pk = event.pk
+        transaction.on_commit(lambda: self.apply(removed=[pk]))
+
+    def update_country(self, country):
+        row = (country.pk, country.name)
+        transaction.on_commit(lambda: self.apply(countries=[row]))
+
+    def delete_country(self, country):
+        pk = country.pk
+        transaction.on_commit(lambda: self.apply(removed_countries=[pk]))
+
+    def search(self, query, limit=None):
+        self.ensure_loaded()
+        with self.lock:
+            return super().search(query, limit)
+
+
+search_index = EventSearchIndex()
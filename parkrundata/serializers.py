@@ -1,16 +1,43 @@
 # -*- coding: utf-8 -*-
 
+from django.db.models import Q
+
 from rest_framework import serializers
-from .models import Country, Event
+
+from .conf import get_setting
+from .models import Country, CountryEventStats, Event, EventTombstone
+from .spatial import bounding_box, haversine
+
+
+class DynamicFieldsMixin(object):
+    """
+    Takes an optional `fields` list to limit which fields are serialized,
+    and an `expand` list of names from `expandable_fields` to nest in full
+    rather than as primary keys.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        expand = kwargs.pop("expand", ())
+        super().__init__(*args, **kwargs)
+
+        for name in expand:
+            self.fields[name] = self.expandable_fields[name](read_only=True)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 
-class CountrySerializer(serializers.ModelSerializer):
+class CountrySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Country
         fields = ["id", "name", "url"]
 
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {"country": CountrySerializer}
+
     latitude = serializers.DecimalField(max_digits=8, decimal_places=6,
                                         min_value=-90, max_value=90)
     longitude = serializers.DecimalField(max_digits=9, decimal_places=6,
@@ -23,3 +50,231 @@ class EventSerializer(serializers.ModelSerializer):
             "is_juniors", "is_restricted", "is_discontinued",
             "latitude", "longitude"
         ]
+
+    # Fields that a duplicate event would have the same values for
+    duplicate_fields = ("latitude", "longitude", "is_juniors")
+
+    def find_duplicates(self, attrs):
+        """
+        Returns the other Events of the same kind within DUPLICATE_RADIUS_KM
+        of the one being saved, nearest first.
+
+        The database is asked for the events in the bounding box of the
+        radius, using the (latitude, longitude) index, rather than trusting
+        the process-local spatial.event_index, which may not have seen
+        changes made by other processes yet.
+        """
+        radius_km = get_setting("DUPLICATE_RADIUS_KM")
+        if radius_km is None:
+            return []
+        values = {
+            name: attrs[name] if name in attrs else
+            getattr(self.instance, name, Event._meta.get_field(name).default)
+            for name in self.duplicate_fields}
+        if self.instance is not None and all(
+                values[name] == getattr(self.instance, name)
+                for name in self.duplicate_fields):
+            return []
+
+        lat, lon = float(values["latitude"]), float(values["longitude"])
+        min_lat, min_lon, max_lat, max_lon = bounding_box(lat, lon, radius_km)
+        queryset = Event.objects.filter(
+            is_juniors=values["is_juniors"],
+            latitude__range=(min_lat, max_lat))
+        if min_lon < -180:
+            west = Q(longitude__gte=min_lon + 360)
+            queryset = queryset.filter(west | Q(longitude__lte=max_lon))
+        elif max_lon > 180:
+            east = Q(longitude__lte=max_lon - 360)
+            queryset = queryset.filter(Q(longitude__gte=min_lon) | east)
+        else:
+            queryset = queryset.filter(longitude__range=(min_lon, max_lon))
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+
+        found = sorted(
+            (haversine(lat, lon, float(event.latitude),
+                       float(event.longitude)), event.pk, event)
+            for event in queryset)
+        return [event for distance, _, event in found
+                if distance <= radius_km]
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        duplicates = self.find_duplicates(attrs)
+        if duplicates:
+            raise serializers.ValidationError(
+                "Within %s km of %s, which looks like the same event." % (
+                    get_setting("DUPLICATE_RADIUS_KM"),
+                    ", ".join("%s (id %d)" % (event.name, event.pk)
+                              for event in duplicates)),
+                code="duplicate")
+        return attrs
+
+
+class BulkEventSerializer(EventSerializer):
+    """
+    EventSerializer without the per-item database lookups for the country,
+    the unique_together checks and the check for nearby duplicates;
+    bulk.upsert_events does the first two in batch.
+    """
+    country = serializers.IntegerField()
+
+    class Meta(EventSerializer.Meta):
+        validators = []
+
+    def find_duplicates(self, attrs):
+        return []
+
+
+class EventFilterSerializer(serializers.Serializer):
+    country = serializers.IntegerField(required=False)
+    is_juniors = serializers.BooleanField(required=False)
+    is_restricted = serializers.BooleanField(required=False)
+    is_discontinued = serializers.BooleanField(required=False)
+    slug = serializers.CharField(required=False)
+    name_prefix = serializers.CharField(required=False)
+    bbox = serializers.CharField(required=False)
+
+    def validate_bbox(self, value):
+        """
+        Parses "min_lon,min_lat,max_lon,max_lat". min_lon may be greater
+        than max_lon for a box crossing the antimeridian.
+        """
+        try:
+            bbox = [float(part) for part in value.split(",")]
+        except ValueError:
+            bbox = []
+        if len(bbox) != 4:
+            raise serializers.ValidationError(
+                "Expected min_lon,min_lat,max_lon,max_lat.")
+        min_lon, min_lat, max_lon, max_lat = bbox
+        if not all(-180 <= lon <= 180 for lon in (min_lon, max_lon)):
+            raise serializers.ValidationError(
+                "Longitudes must be between -180 and 180.")
+        if not -90 <= min_lat <= max_lat <= 90:
+            raise serializers.ValidationError(
+                "Latitudes must be between -90 and 90, smallest first.")
+        return tuple(bbox)
+
+
+class NearestEventsQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    k = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    radius_km = serializers.FloatField(min_value=0, required=False)
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=256)
+    k = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class CountryEventStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CountryEventStats
+        fields = ["country", "total", "juniors", "restricted",
+                  "discontinued"]
+
+
+class EventTombstoneSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="event_id")
+    country = serializers.IntegerField(source="country_id")
+
+    class Meta:
+        model = EventTombstone
+        fields = ["id", "country", "slug", "deleted"]
+
+
+class ChangesQuerySerializer(serializers.Serializer):
+    since = serializers.CharField(required=False, allow_blank=True)
+    page_size = serializers.IntegerField(min_value=1, max_value=1000,
+                                         default=100)
+
+
+class BatchQuerySerializer(serializers.Serializer):
+    """
+    Parses the comma separated `ids` of the objects to retrieve in one
+    batch. Subclasses may add other keys; exactly one must be given.
+    """
+    max_keys = 1000
+    ids = serializers.CharField(required=False)
+
+    def split(self, value):
+        keys = [key.strip() for key in value.split(",") if key.strip()]
+        if not keys:
+            raise serializers.ValidationError("Expected at least one key.")
+        if len(keys) > self.max_keys:
+            raise serializers.ValidationError(
+                "Expected at most %d keys." % self.max_keys)
+        return keys
+
+    def validate_ids(self, value):
+        try:
+            return [(int(key),) for key in self.split(value)]
+        except ValueError:
+            raise serializers.ValidationError(
+                "Expected a comma separated list of ids.")
+
+    def validate(self, data):
+        if len(data) != 1:
+            raise serializers.ValidationError(
+                "Expected exactly one of: %s." % ", ".join(self.fields))
+        return data
+
+
+class EventBatchQuerySerializer(BatchQuerySerializer):
+    slugs = serializers.CharField(required=False)
+
+    def validate_slugs(self, value):
+        """Parses "country:slug" keys, where country is the Country's id."""
+        keys = []
+        for key in self.split(value):
+            country, _, slug = key.partition(":")
+            if not country.isdigit() or not slug:
+                raise serializers.ValidationError(
+                    "Expected a comma separated list of country:slug.")
+            keys.append((int(country), slug))
+        return keys
+
+
+class DistanceMatrixQuerySerializer(serializers.Serializer):
+    max_events = 5000
+    ids = serializers.CharField(required=False)
+    to = serializers.CharField(required=False)
+
+    def validate_ids(self, value):
+        try:
+            ids = [int(pk) for pk in value.split(",") if pk.strip()]
+        except ValueError:
+            raise serializers.ValidationError(
+                "Expected a comma separated list of ids.")
+        if not 0 < len(ids) <= self.max_events:
+            raise serializers.ValidationError(
+                "Expected between 1 and %d ids." % self.max_events)
+        return ids
+
+    validate_to = validate_ids
+
+
+class RouteQuerySerializer(serializers.Serializer):
+    max_points = 1000
+    route = serializers.CharField()
+    within_km = serializers.FloatField(min_value=0, max_value=1000,
+                                       default=5)
+
+    def validate_route(self, value):
+        """Parses "lat,lon;lat,lon;..." into (latitudes, longitudes)."""
+        try:
+            points = [[float(part) for part in point.split(",")]
+                      for point in value.split(";") if point.strip()]
+        except ValueError:
+            points = []
+        if not all(len(point) == 2 and -90 <= point[0] <= 90 and
+                   -180 <= point[1] <= 180 for point in points):
+            points = []
+        if not 2 <= len(points) <= self.max_points:
+            raise serializers.ValidationError(
+                "Expected between 2 and %d lat,lon points separated by "
+                "semicolons." % self.max_points)
+        return [point[0] for point in points], [point[1] for point in points]
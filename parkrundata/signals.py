@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import cache, snapshot, stats
+from .models import Country, CountryEventStats, Event, EventTombstone
+from .search import search_index
+from .spatial import event_index
+
+
+# Sent with the affected `instances` after bulk writes, which bypass the
+# post_save signal. `created` is the subset of them that are new.
+events_bulk_changed = Signal()
+
+
+@receiver(post_save, sender=Event)
+def update_event_index(sender, instance, **kwargs):
+    event_index.update_event(instance)
+
+
+@receiver(events_bulk_changed, sender=Event)
+def bulk_update_event_index(sender, instances, **kwargs):
+    event_index.update_events(instances)
+
+
+@receiver(post_delete, sender=Event)
+def remove_from_event_index(sender, instance, **kwargs):
+    event_index.remove_event(instance)
+
+
+@receiver(post_save, sender=Event)
+def update_search_index(sender, instance, **kwargs):
+    search_index.update_event(instance)
+
+
+@receiver(events_bulk_changed, sender=Event)
+def bulk_update_search_index(sender, instances, **kwargs):
+    search_index.update_events(instances)
+
+
+@receiver(post_delete, sender=Event)
+def remove_from_search_index(sender, instance, **kwargs):
+    search_index.delete_event(instance)
+
+
+@receiver(post_save, sender=Country)
+def update_search_index_country(sender, instance, **kwargs):
+    search_index.update_country(instance)
+
+
+@receiver(post_delete, sender=Country)
+def remove_from_search_index_country(sender, instance, **kwargs):
+    search_index.delete_country(instance)
+
+
+@receiver(post_delete, sender=Event)
+def record_event_tombstone(sender, instance, **kwargs):
+    EventTombstone.objects.create(
+        event_id=instance.pk,
+        country_id=instance.country_id,
+        slug=instance.slug,
+    )
+
+
+def event_lookup_ids(event):
+    """
+    The cache ids `event` is looked up by country and slug under, now and
+    as it was loaded or last saved.
+    """
+    ids = {cache.lookup_id(country=event.country_id, slug=event.slug)}
+    if event.tracker.saved_data:
+        ids.add(cache.lookup_id(country=event.tracker.previous("country_id"),
+                                slug=event.tracker.previous("slug")))
+    return sorted(ids)
+
+
+@receiver(post_save, sender=Country)
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Country)
+@receiver(post_delete, sender=Event)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    # Invalidate again on commit, in case a concurrent request re-cached the
+    # old data before this transaction became visible.
+    pks = [instance.pk]
+    if sender is Event:
+        pks += event_lookup_ids(instance)
+    cache.invalidate(sender, pks)
+    transaction.on_commit(lambda: cache.invalidate(sender, pks))
+
+
+@receiver(events_bulk_changed, sender=Event)
+def bulk_invalidate_cached_responses(sender, instances, **kwargs):
+    pks = [instance.pk for instance in instances]
+    for instance in instances:
+        pks += event_lookup_ids(instance)
+    cache.invalidate(sender, pks)
+    transaction.on_commit(lambda: cache.invalidate(sender, pks))
+
+
+@receiver(post_save, sender=Country)
+def create_country_event_stats(sender, instance, created, **kwargs):
+    if created:
+        CountryEventStats.objects.get_or_create(country=instance)
+
+
+@receiver(post_save, sender=Event)
+def update_country_event_stats(sender, instance, created, **kwargs):
+    delta = stats.StatsDelta()
+    delta.add_saved(instance, created)
+    delta.apply()
+
+
+@receiver(events_bulk_changed, sender=Event)
+def bulk_update_country_event_stats(sender, instances, created=(),
+                                    **kwargs):
+    created = {id(instance) for instance in created}
+    delta = stats.StatsDelta()
+    for instance in instances:
+        delta.add_saved(instance, id(instance) in created)
+    delta.apply()
+
+
+@receiver(post_delete, sender=Event)
+def remove_from_country_event_stats(sender, instance, **kwargs):
+    delta = stats.StatsDelta()
+    delta.add(stats.previous_values(instance), -1)
+    delta.apply()
+
+
+@receiver(post_save, sender=Country)
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Country)
+@receiver(post_delete, sender=Event)
+@receiver(events_bulk_changed, sender=Event)
+def bump_snapshot_version(sender, **kwargs):
+    # Again on commit, so a snapshot built from before the commit is
+    # replaced too
+    snapshot.bump_version()
+    transaction.on_commit(snapshot.bump_version)
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+
+import array
+import collections
+import decimal
+import threading
+from collections.abc import Sequence
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import Max
+
+from .cache import KEY_PREFIX, get_counter, incr_counter
+from .conf import get_setting
+from .models import Country, Event, EventTombstone
+from .routers import use_primary
+
+
+VERSION_KEY = "%s:snapshot:version" % KEY_PREFIX
+
+
+def get_version():
+    """Returns the catalogue version, or None if the cache can't hold it."""
+    return get_counter(VERSION_KEY)
+
+
+def bump_version():
+    """Marks every snapshot as out of date, in all processes."""
+    incr_counter(VERSION_KEY)
+
+
+class Column(object):
+    """
+    One field's values in primary key order, packed into an array where
+    the type allows it. `data` holds the packed values and `decode` turns
+    them back into what the database would return.
+    """
+
+    def __init__(self, field, values):
+        self.decode = None
+        if None in values:
+            self.data = tuple(values)
+        elif isinstance(field, models.BooleanField):
+            self.data = array.array("b", values)
+            self.decode = bool
+        elif isinstance(field, models.DecimalField):
+            places = field.decimal_places
+            self.data = array.array("q", [
+                int(value.scaleb(places)) for value in values])
+            self.decode = lambda value: decimal.Decimal(value).scaleb(
+                -places)
+        elif isinstance(field.target_field if field.is_relation else field,
+                        (models.AutoField, models.IntegerField)):
+            self.data = array.array("q", values)
+        else:
+            self.data = tuple(values)
+
+    def encode(self, value):
+        """Returns `value` in the form it is held in `data`."""
+        if self.decode is bool:
+            return int(value)
+        return value
+
+    def get(self, position):
+        value = self.data[position]
+        if self.decode is None or value is None:
+            return value
+        return self.decode(value)
+
+
+class Table(object):
+    """
+    An immutable column store of all of a model's rows, ordered by primary
+    key, with dict indexes from the primary key and each of `indexed`
+    fields to row positions.
+    """
+
+    def __init__(self, model, rows, indexed=()):
+        self.model = model
+        fields = model._meta.concrete_fields
+        values = list(zip(*rows)) or [()] * len(fields)
+        self.columns = {field.attname: Column(field, list(column))
+                        for field, column in zip(fields, values)}
+        # Tables of related models, by relation name, for getter()
+        self.related = {}
+        self.pks = self.columns[model._meta.pk.attname].data
+        self.index = {pk: position for position, pk in enumerate(self.pks)}
+        self.indexes = {}
+        for attname in indexed:
+            index = self.indexes[attname] = {}
+            for position, value in enumerate(self.columns[attname].data):
+                index.setdefault(value, []).append(position)
+        self.last_deleted = None
+        self._row_classes = {}
+        self._maxima = {}
+
+    @classmethod
+    def load(cls, model, **kwargs):
+        attnames = [field.attname for field in model._meta.concrete_fields]
+        rows = model.objects.order_by("pk").values_list(*attnames)
+        return cls(model, list(rows.iterator()), **kwargs)
+
+    def __len__(self):
+        return len(self.pks)
+
+    def getter(self, lookup):
+        """
+        Returns a function from row position to the value of `lookup`,
+        which may follow a relation in `related`, like values_list().
+        """
+        name, _, rest = lookup.partition("__")
+        field = self.model._meta.get_field(name)
+        column = self.columns[field.attname]
+        if not rest:
+            return column.get
+
+        related = self.related[field.name]
+        index, get = related.index, related.getter(rest)
+        data = column.data
+
+        def get_related(position):
+            pk = data[position]
+            return None if pk is None else get(index[pk])
+        return get_related
+
+    def where(self, positions, attname, value):
+        """Returns the `positions` whose `attname` equals `value`."""
+        column = self.columns[attname]
+        value = column.encode(value)
+        if positions is None and attname in self.indexes:
+            return list(self.indexes[attname].get(value, ()))
+        data = column.data
+        return [position for position in self.all(positions)
+                if data[position] == value]
+
+    def filter(self, positions, attname, predicate):
+        """Returns the `positions` whose packed `attname` passes."""
+        data = self.columns[attname].data
+        return [position for position in self.all(positions)
+                if predicate(data[position])]
+
+    def all(self, positions):
+        """`positions`, or every position if it is None."""
+        return range(len(self)) if positions is None else positions
+
+    def maximum(self, lookup, positions):
+        """The largest `lookup` at `positions`, or None if there are none."""
+        every = isinstance(positions, range) and len(positions) == len(self)
+        if every and lookup in self._maxima:
+            return self._maxima[lookup]
+        value = max(map(self.getter(lookup), positions), default=None)
+        if every:
+            self._maxima[lookup] = value
+        return value
+
+    def rows(self, lookups, positions):
+        """Returns SnapshotRows of `lookups` at `positions`."""
+        lookups = tuple(lookups)
+        if lookups not in self._row_classes:
+            self._row_classes[lookups] = collections.namedtuple(
+                "Row", lookups, rename=True)
+        return SnapshotRows(
+            self._row_classes[lookups],
+            [self.getter(lookup) for lookup in lookups], positions)
+
+
+class SnapshotRows(Sequence):
+    """
+    Rows at a list of table positions, built lazily like the named
+    values_list() rows FastRepresentation takes.
+    """
+
+    def __init__(self, row_class, getters, positions):
+        self.row_class = row_class
+        self.getters = getters
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.build(position)
+                    for position in self.positions[index]]
+        return self.build(self.positions[index])
+
+    def __iter__(self):
+        return map(self.build, self.positions)
+
+    def build(self, position):
+        return self.row_class._make(
+            [get(position) for get in self.getters])
+
+
+class Snapshot(object):
+    """An immutable in-memory copy of the catalogue at `version`."""
+
+    def __init__(self, version, tables):
+        self.version = version
+        self.tables = tables
+
+    @classmethod
+    def build(cls, version):
+        # Events first: Countries can't be deleted while Events use them,
+        # so every Event's Country is still there when they are read.
+        with use_primary():
+            events = Table.load(Event, indexed=("country_id", "slug"))
+            events.last_deleted = EventTombstone.objects.aggregate(
+                last=Max("deleted"))["last"]
+            countries = Table.load(Country)
+        events.related["country"] = countries
+        return cls(version, {Country: countries, Event: events})
+
+    def table(self, model):
+        return self.tables.get(model)
+
+
+class SnapshotStore(object):
+    """
+    Holds this process's Snapshot, replacing it with a new one whenever
+    the version in the cache changes.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Returns an up to date Snapshot, or None if there can't be one."""
+        version = get_version()
+        if version is None:
+            return None
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.version != version:
+            with self.lock:
+                snapshot = self.snapshot
+                if snapshot is None or snapshot.version != version:
+                    # Readers keep whichever snapshot they already have
+                    snapshot = self.snapshot = Snapshot.build(version)
+        return snapshot
+
+
+store = SnapshotStore()
+
+
+class SnapshotReadMixin(object):
+    """
+    Serves list and retrieve, and their ETag and Last-Modified, from the
+    process-local Snapshot without any queries when PARKRUNDATA_SNAPSHOT
+    is on. Views whose queryset is filtered, or with a filter backend that
+    has no filter_snapshot(), use the database as before.
+
+    List it before ConditionalGetMixin and FastReadMixin, whose hooks it
+    overrides.
+    """
+    snapshot_actions = ("list", "retrieve")
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Fetched here, once per request
+        self.snapshot = None
+        action = getattr(self, "action", None)
+        if action in self.snapshot_actions and get_setting("SNAPSHOT"):
+            self.snapshot = store.get()
+
+    def get_snapshot_table(self):
+        """Returns the Table to serve this request from, or None."""
+        if getattr(self, "snapshot", None) is None:
+            return None
+        queryset = self.get_queryset()
+        if queryset.query.has_filters() or not all(
+                hasattr(backend, "filter_snapshot")
+                for backend in self.filter_backends):
+            return None
+        return self.snapshot.table(queryset.model)
+
+    def filter_snapshot(self, table, positions=None):
+        """filter_queryset() for a list of Table positions."""
+        for backend in self.filter_backends:
+            positions = backend().filter_snapshot(
+                self.request, table, positions, self)
+        return table.all(positions)
+
+    def get_snapshot_object_positions(self, table):
+        if self.lookup_field not in ("pk", table.model._meta.pk.name):
+            return None
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            pk = table.model._meta.pk.to_python(self.kwargs[lookup_url_kwarg])
+        except ValidationError:
+            return []
+        if pk not in table.index:
+            return []
+        return list(self.filter_snapshot(table, [table.index[pk]]))
+
+    def get_validators(self):
+        table = self.get_snapshot_table()
+        if self.action == "retrieve" and table is not None:
+            positions = self.get_snapshot_object_positions(table)
+            if positions is None:
+                table = None
+        if table is None:
+            return super().get_validators()
+
+        timestamps = ["modified"] + [
+            relation + "__modified"
+            for relation in self.get_validator_relations()]
+        if self.action == "retrieve":
+            if not positions:
+                return None, None
+            row = [table.getter(timestamp)(positions[0])
+                   for timestamp in timestamps]
+            return self.make_validators(
+                [timestamp.isoformat() for timestamp in row],
+                max(filter(None, row)))
+
+        positions = self.filter_snapshot(table)
+        values = [table.maximum(timestamp, positions)
+                  for timestamp in timestamps]
+        last_modified = max(filter(None, values), default=None)
+        if self.tombstone_queryset is None:
+            last_modified = None
+        elif last_modified is not None and table.last_deleted is not None:
+            last_modified = max(last_modified, table.last_deleted)
+        return self.make_validators(
+            [len(positions)] + [value and value.isoformat()
+                                for value in values],
+            last_modified)
+
+    def get_fast_rows(self, representation):
+        table = self.get_snapshot_table()
+        if table is None:
+            return super().get_fast_rows(representation)
+        return table.rows(representation.columns, self.filter_snapshot(table))
+
+    def get_fast_object_rows(self, representation):
+        table = self.get_snapshot_table()
+        positions = None
+        if table is not None:
+            positions = self.get_snapshot_object_positions(table)
+        if positions is None:
+            return super().get_fast_object_rows(representation)
+        return table.rows(representation.columns, positions)
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import math
+import threading
+
+from django.db import transaction
+
+from .cache import KEY_PREFIX, get_counter, incr_counter
+from .models import Event
+from .routers import use_primary
+
+
+EARTH_RADIUS_KM = 6371.0088
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+VERSION_KEY = "%s:spatial:version" % KEY_PREFIX
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points given in degrees."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2
+    a += math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Returns (min_lat, min_lon, max_lat, max_lon) around every point within
+    radius_km of a point, see
+    http://janmatuschek.de/LatitudeLongitudeBoundingCoordinates
+
+    The longitudes may be outside -180 to 180 when the box crosses the
+    antimeridian, and span them all when it reaches a pole.
+    """
+    angle = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - angle, lat + angle
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0
+    delta = math.degrees(math.asin(
+        math.sin(math.radians(angle)) / math.cos(math.radians(lat))))
+    return min_lat, lon - delta, max_lat, lon + delta
+
+
+class GridIndex(object):
+    """
+    Buckets points into fixed-size latitude/longitude cells.
+
+    Inserts and removals are O(1), and radius queries only look at the
+    cells overlapping the bounding box of the search cap.
+    """
+
+    def __init__(self, cell_size=1.0):
+        if (180 / cell_size) % 1:
+            raise ValueError("cell_size must divide 180 degrees exactly")
+        self.cell_size = cell_size
+        self.rows = int(round(180 / cell_size))
+        self.columns = int(round(360 / cell_size))
+        self._cells = {}
+        self._points = {}
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def _cell(self, lat, lon):
+        row = min(int(math.floor((lat + 90) / self.cell_size)), self.rows - 1)
+        column = int(math.floor((lon + 180) / self.cell_size)) % self.columns
+        return row, column
+
+    def add(self, key, lat, lon):
+        lat, lon = float(lat), float(lon)
+        self.remove(key)
+        cell = self._cell(lat, lon)
+        self._points[key] = (lat, lon, cell)
+        self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        point = self._points.pop(key, None)
+        if point is None:
+            return
+        cell = point[2]
+        bucket = self._cells[cell]
+        bucket.discard(key)
+        if not bucket:
+            del self._cells[cell]
+
+    def clear(self):
+        self._cells.clear()
+        self._points.clear()
+
+    def _candidate_cells(self, lat, lon, radius_km):
+        min_lat, min_lon, max_lat, max_lon = bounding_box(
+            lat, lon, radius_km)
+        min_row = self._cell(min_lat, 0)[0]
+        max_row = self._cell(max_lat, 0)[0]
+        first = int(math.floor((min_lon + 180) / self.cell_size))
+        last = int(math.floor((max_lon + 180) / self.cell_size))
+        if last - first + 1 >= self.columns:
+            columns = range(self.columns)
+        else:
+            columns = [c % self.columns for c in range(first, last + 1)]
+
+        if (max_row - min_row + 1) * len(columns) > len(self._cells):
+            # Cheaper to walk the occupied cells than the whole box
+            rows = range(min_row, max_row + 1)
+            columns = set(columns)
+            return [cell for cell in self._cells
+                    if cell[0] in rows and cell[1] in columns]
+        return [(row, column)
+                for row in range(min_row, max_row + 1)
+                for column in columns]
+
+    def within(self, lat, lon, radius_km):
+        """Return (distance_km, key) pairs within radius_km, nearest first."""
+        lat, lon = float(lat), float(lon)
+        found = []
+        for cell in self._candidate_cells(lat, lon, radius_km):
+            for key in self._cells.get(cell, ()):
+                point = self._points[key]
+                distance = haversine(lat, lon, point[0], point[1])
+                if distance <= radius_km:
+                    found.append((distance, key))
+        found.sort()
+        return found
+
+    def nearest(self, lat, lon, k, radius_km=None):
+        """Return up to k (distance_km, key) pairs, nearest first."""
+        limit = HALF_CIRCUMFERENCE_KM
+        if radius_km is not None:
+            limit = min(radius_km, limit)
+        search = min(self.cell_size * 111.2, limit)
+        while True:
+            found = self.within(lat, lon, search)
+            if len(found) >= k or search >= limit:
+                return heapq.nsmallest(k, found)
+            search = min(search * 4, limit)
+
+
+class EventIndex(GridIndex):
+    """
+    Process-local GridIndex of Event coordinates keyed on primary key.
+
+    The index is loaded from the database on first use. Committed saves
+    and deletes in this process update it in place, and bump a version
+    counter in the shared cache. Before each lookup the counter is
+    compared with the one the index was loaded at, and the index is loaded
+    again if another process has changed the events since. Without a cache
+    to keep the counter in, every lookup loads it again.
+    """
+
+    def __init__(self, cell_size=1.0):
+        super().__init__(cell_size)
+        self.loaded = False
+        self.version = None
+        self.lock = threading.RLock()
+
+    def load(self):
+        with self.lock:
+            # Read first, so a change committed during the load reloads it
+            version = get_counter(VERSION_KEY)
+            self.clear()
+            with use_primary():
+                rows = Event.objects.values_list(
+                    "id", "latitude", "longitude")
+                for pk, lat, lon in rows.iterator():
+                    self.add(pk, lat, lon)
+            self.version = version
+            self.loaded = True
+
+    def ensure_loaded(self):
+        version = get_counter(VERSION_KEY)
+        if not self.loaded or version is None or version != self.version:
+            self.load()
+
+    def invalidate(self):
+        with self.lock:
+            self.clear()
+            self.loaded = False
+            self.version = None
+
+    def apply(self, added=(), removed=()):
+        """
+        Moves the `added` (pk, lat, lon) points into the index and takes the
+        `removed` pks out, once their transaction has committed, then tells
+        the other processes to reload.
+        """
+        with self.lock:
+            if self.loaded:
+                for pk, lat, lon in added:
+                    self.add(pk, lat, lon)
+                for pk in removed:
+                    self.remove(pk)
+            version = incr_counter(VERSION_KEY)
+            # This copy is still current unless another process changed
+            # the events in between
+            counted = self.loaded and None not in (version, self.version)
+            if counted and version == self.version + 1:
+                self.version = version
+            else:
+                self.loaded = False
+
+    def update_events(self, events):
+        added = [(event.pk, event.latitude, event.longitude)
+                 for event in events]
+        transaction.on_commit(lambda: self.apply(added=added))
+
+    def update_event(self, event):
+        self.update_events([event])
+
+    def remove_event(self, event):
+        pk = event.pk
+        transaction.on_commit(lambda: self.apply(removed=[pk]))
+
+    def nearest(self, lat, lon, k, radius_km=None):
+        with self.lock:
+            self.ensure_loaded()
+            return super().nearest(lat, lon, k, radius_km)
+
+    def within(self, lat, lon, radius_km):
+        with self.lock:
+            self.ensure_loaded()
+            return super().within(lat, lon, radius_km)
+
+
+event_index = EventIndex()
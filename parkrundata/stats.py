@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Country, CountryEventStats, Event
+
+
+# CountryEventStats counter for each Event flag
+FLAG_COUNTERS = {
+    "is_juniors": "juniors",
+    "is_restricted": "restricted",
+    "is_discontinued": "discontinued",
+}
+COUNTERS = ["total"] + list(FLAG_COUNTERS.values())
+
+
+class StatsDelta(object):
+    """Net changes to CountryEventStats counters, by country id."""
+
+    def __init__(self):
+        self.changes = defaultdict(Counter)
+
+    def add(self, values, sign=1):
+        """
+        Counts an Event with the given country_id and flag `values` in
+        (sign=1) or out (sign=-1).
+        """
+        counters = self.changes[values["country_id"]]
+        counters["total"] += sign
+        for flag, counter in FLAG_COUNTERS.items():
+            if values[flag]:
+                counters[counter] += sign
+
+    def add_saved(self, event, created):
+        """Counts the change made by saving `event`."""
+        if not created:
+            self.add(previous_values(event), -1)
+        self.add(current_values(event))
+
+    def apply(self):
+        """Writes the changes with one UPDATE per country."""
+        changes = {country_id: counters
+                   for country_id, counters in self.changes.items()
+                   if any(counters.values())}
+        if not changes:
+            return
+        with transaction.atomic(savepoint=False):
+            missing = set(changes) - set(
+                CountryEventStats.objects.filter(country_id__in=changes)
+                .values_list("country_id", flat=True))
+            if missing:
+                CountryEventStats.objects.bulk_create(
+                    [CountryEventStats(country_id=country_id)
+                     for country_id in missing], ignore_conflicts=True)
+            now = timezone.now()
+            for country_id, counters in changes.items():
+                updates = {counter: F(counter) + change
+                           for counter, change in counters.items() if change}
+                CountryEventStats.objects.filter(
+                    country_id=country_id).update(modified=now, **updates)
+        self.changes.clear()
+
+
+def current_values(event):
+    return {field: getattr(event, field)
+            for field in ["country_id"] + list(FLAG_COUNTERS)}
+
+
+def previous_values(event):
+    """The flag values `event` was loaded or last saved with."""
+    if not event.tracker.saved_data:
+        return current_values(event)
+    return {field: event.tracker.previous(field)
+            for field in ["country_id"] + list(FLAG_COUNTERS)}
+
+
+def rebuild():
+    """
+    Recomputes every Country's CountryEventStats with a single GROUP BY
+    over Event. Returns the number of countries.
+    """
+    aggregates = {"total": Count("id")}
+    for flag, counter in FLAG_COUNTERS.items():
+        aggregates[counter] = Count("id", filter=Q(**{flag: True}))
+    counts = {row.pop("country_id"): row for row in
+              Event.objects.order_by().values("country_id")
+              .annotate(**aggregates)}
+
+    stats = [CountryEventStats(country_id=country_id,
+                               **counts.get(country_id, {}))
+             for country_id in Country.objects.values_list("id", flat=True)]
+    with transaction.atomic():
+        CountryEventStats.objects.all().delete()
+        CountryEventStats.objects.bulk_create(stats)
+    return len(stats)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+import math
+
+
+MAX_ZOOM = 22
+# Web Mercator stops short of the poles
+MAX_LATITUDE = math.degrees(math.atan(math.sinh(math.pi)))
+
+
+def tile_latitude(y, n):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2.0 * y / n))))
+
+
+def tile_bounds(z, x, y):
+    """
+    Returns (min_lon, min_lat, max_lon, max_lat) of slippy map tile z/x/y,
+    or raises ValueError if there is no such tile. Edge tiles are extended
+    to the poles so no point is left out of every tile.
+    """
+    n = 2 ** z
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < n and 0 <= y < n):
+        raise ValueError("No tile %d/%d/%d" % (z, x, y))
+    min_lon = x * 360.0 / n - 180
+    max_lon = (x + 1) * 360.0 / n - 180
+    max_lat = 90.0 if y == 0 else tile_latitude(y, n)
+    min_lat = -90.0 if y == n - 1 else tile_latitude(y + 1, n)
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def tile_position(z, lat, lon):
+    """Returns the fractional (x, y) tile coordinates of a point at zoom z."""
+    n = 2 ** z
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    phi = math.radians(lat)
+    x = (lon + 180) / 360.0 * n
+    y = (1 - math.log(math.tan(phi) + 1 / math.cos(phi)) / math.pi) / 2 * n
+    return x, y
+
+
+def cluster(rows, z, x, y, grid=8):
+    """
+    Groups (id, latitude, longitude, name, slug) rows that fall in the same
+    cell of a `grid` x `grid` division of tile z/x/y, and returns a GeoJSON
+    FeatureCollection with one Point per cell at the mean position of its
+    events. A cell holding a single event keeps that event's id, name and
+    slug.
+    """
+    cells = {}
+    for row in rows:
+        lat, lon = float(row[1]), float(row[2])
+        px, py = tile_position(z, lat, lon)
+        cell = (min(max(int((px - x) * grid), 0), grid - 1),
+                min(max(int((py - y) * grid), 0), grid - 1))
+        found = cells.get(cell)
+        if found is None:
+            cells[cell] = [1, lat, lon, row]
+        else:
+            found[0] += 1
+            found[1] += lat
+            found[2] += lon
+
+    features = []
+    for cell in sorted(cells):
+        count, lat, lon, row = cells[cell]
+        feature = {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [
+                round(lon / count, 6), round(lat / count, 6)]},
+            "properties": {"count": count},
+        }
+        if count == 1:
+            feature["id"] = row[0]
+            feature["properties"].update(name=row[3], slug=row[4])
+        features.append(feature)
+    return {"type": "FeatureCollection", "features": features}
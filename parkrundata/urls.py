@@ -1,15 +1,16 @@
 # -*- coding: utf-8 -*-
 
-from rest_framework.routers import SimpleRouter
-
-from . import views
+from .lazy import LazyRouter
 
 
 app_name = 'parkrundata'
 
-router = SimpleRouter()
+router = LazyRouter()
 
-router.register("countries", views.CountryViewSet)
-router.register("events", views.EventViewSet)
+# Before "countries", so resolving other country URLs doesn't import it
+router.register(r"countries/(?P<country>\d+)/events",
+                "parkrundata.views.CountryEventViewSet", "country-event")
+router.register("countries", "parkrundata.views.CountryViewSet", "country")
+router.register("events", "parkrundata.views.EventViewSet", "event")
 
 urlpatterns = router.urls
@@ -1,19 +0,0 @@
-# -*- coding: utf-8 -*-
-
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
-
-from .models import Country, Event
-from .serializers import CountrySerializer, EventSerializer
-
-
-class CountryViewSet(viewsets.ModelViewSet):
-    queryset = Country.objects.all()
-    serializer_class = CountrySerializer
-    permission_classes = [IsAuthenticatedOrReadOnly]
-
-
-class EventViewSet(viewsets.ModelViewSet):
-    queryset = Event.objects.all()
-    serializer_class = EventSerializer
-    permission_classes = [IsAuthenticatedOrReadOnly]
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+The parkrundata views. Each viewset lives in its own module, which is only
+imported when the viewset is first used, so that loading the URLconf or
+serving one endpoint doesn't import the code of all the others.
+"""
+
+import importlib
+
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+from ..conf import get_setting
+from ..metrics import registry
+
+
+LAZY_ATTRIBUTES = {
+    "CountryViewSet": ".countries",
+    "EventViewSet": ".events",
+    "CountryEventViewSet": ".events",
+    "MSGPACK_RENDERERS": "..renderers",
+    "MSGPACK_PARSERS": "..parsers",
+}
+
+
+def __getattr__(name):
+    if name not in LAZY_ATTRIBUTES:
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+    module = importlib.import_module(LAZY_ATTRIBUTES[name], __name__)
+    return getattr(module, name)
+
+
+def metrics(request):
+    """Prometheus scrape endpoint for the MetricsMiddleware registry."""
+    if request.META.get("REMOTE_ADDR") not in get_setting(
+            "METRICS_ALLOWED_IPS"):
+        raise PermissionDenied
+    return HttpResponse(registry.render(),
+                        content_type="text/plain; version=0.0.4")
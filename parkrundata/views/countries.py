@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from ..batch import BatchRetrieveMixin
+from ..cache import CachedResponseMixin
+from ..fastpath import FastReadMixin
+from ..mixins import ConditionalGetMixin, SparseFieldsMixin
+from ..models import Country, CountryEventStats
+from ..pagination import IdCursorPagination
+from ..parsers import MSGPACK_PARSERS
+from ..renderers import MSGPACK_RENDERERS
+from ..routers import ReplicaReadMixin
+from ..serializers import CountryEventStatsSerializer, CountrySerializer
+from ..snapshot import SnapshotReadMixin
+
+
+class CountryViewSet(ReplicaReadMixin, SnapshotReadMixin, SparseFieldsMixin,
+                     ConditionalGetMixin, CachedResponseMixin, FastReadMixin,
+                     BatchRetrieveMixin, viewsets.ModelViewSet):
+    queryset = Country.objects.all()
+    serializer_class = CountrySerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = IdCursorPagination
+    renderer_classes = (
+        api_settings.DEFAULT_RENDERER_CLASSES + MSGPACK_RENDERERS)
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES + MSGPACK_PARSERS
+    cache_dependencies = (Country,)
+    sparse_actions = ("list", "retrieve", "batch")
+
+    @action(detail=False)
+    def stats(self, request):
+        """Event counts per country, read from CountryEventStats."""
+        queryset = CountryEventStats.objects.order_by("country_id")
+        return Response(
+            CountryEventStatsSerializer(queryset, many=True).data)
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+from django.http import Http404, StreamingHttpResponse
+
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from ..batch import BatchRetrieveMixin
+from ..cache import CachedResponseMixin, lookup_id
+from ..fastpath import FastReadMixin
+from ..filters import EventFilterBackend
+from ..mixins import ConditionalGetMixin, SparseFieldsMixin
+from ..models import Event, EventTombstone
+from ..pagination import IdCursorPagination
+from ..parsers import MSGPACK_PARSERS, BinaryEventParser, NDJSONParser
+from ..renderers import (
+    MSGPACK_RENDERERS, BinaryEventRenderer, CSVRenderer, GeoJSONRenderer,
+    NDJSONRenderer)
+from ..routers import ReplicaReadMixin
+from ..search import search_index
+from ..serializers import (
+    ChangesQuerySerializer, DistanceMatrixQuerySerializer,
+    EventBatchQuerySerializer, EventSerializer, EventTombstoneSerializer,
+    NearestEventsQuerySerializer, RouteQuerySerializer,
+    SearchQuerySerializer)
+from ..snapshot import SnapshotReadMixin
+from ..spatial import event_index
+
+
+class EventViewSet(ReplicaReadMixin, SnapshotReadMixin, SparseFieldsMixin,
+                   ConditionalGetMixin, CachedResponseMixin, FastReadMixin,
+                   BatchRetrieveMixin, viewsets.ModelViewSet):
+    queryset = Event.objects.all()
+    serializer_class = EventSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = IdCursorPagination
+    filter_backends = [EventFilterBackend]
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [
+        GeoJSONRenderer, BinaryEventRenderer] + MSGPACK_RENDERERS
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES + [
+        BinaryEventParser] + MSGPACK_PARSERS
+    # GeoJSON and the binary schema only make sense for responses that are
+    # Events, or a page of them, so the other actions don't offer them
+    event_renderer_classes = (GeoJSONRenderer, BinaryEventRenderer)
+    event_actions = ("list", "retrieve", "create", "update", "partial_update",
+                     "tile")
+    tile_grid = 8
+    tombstone_queryset = EventTombstone.objects.all()
+    cache_dependencies = (Event,)
+    sparse_actions = ("list", "retrieve", "batch")
+    batch_query_serializer = EventBatchQuerySerializer
+    batch_lookups = {"ids": ("id",), "slugs": ("country", "slug")}
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action in self.event_actions:
+            return renderers
+        return [renderer for renderer in renderers
+                if not isinstance(renderer, self.event_renderer_classes)]
+
+    @action(detail=False)
+    def nearest(self, request):
+        params = NearestEventsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # Ask the index for a few times as many events as wanted, and for
+        # more if the filters exclude too many of them
+        limit, seen, data = query["k"] * 4, 0, []
+        while len(data) < query["k"]:
+            found = event_index.nearest(query["lat"], query["lon"], limit,
+                                        query.get("radius_km"))
+            nearby = found[seen:]
+            events = queryset.in_bulk([pk for _, pk in nearby])
+            for distance, pk in nearby:
+                if pk in events and len(data) < query["k"]:
+                    item = self.get_serializer(events[pk]).data
+                    item["distance_km"] = round(distance, 3)
+                    data.append(item)
+            if len(found) < limit:
+                break
+            limit, seen = limit * 4, len(found)
+        return Response(data)
+
+    @action(detail=False, url_path="distances", url_name="distances",
+            renderer_classes=[JSONRenderer])
+    def distance_matrix(self, request):
+        from .. import distances
+
+        params = DistanceMatrixQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+
+        coordinates = distances.store.get()
+        ids = query.get("ids")
+        if ids is None:
+            limit = params.max_events
+            ids = list(self.filter_queryset(self.get_queryset()).order_by(
+                "pk").values_list("pk", flat=True)[:limit + 1])
+            if len(ids) > limit:
+                raise ValidationError({"ids": [
+                    "Pass ids, or filters matching at most %d events." %
+                    limit]})
+        to = query.get("to", ids)
+        origins = coordinates.vectors[coordinates.positions(ids, "ids")]
+        destinations = coordinates.vectors[coordinates.positions(to, "to")]
+        return StreamingHttpResponse(
+            distances.iter_matrix_json(ids, to, origins, destinations),
+            content_type="application/json")
+
+    @action(detail=False, url_path="near-route", url_name="near-route")
+    def near_route(self, request):
+        from .. import distances
+
+        params = RouteQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+
+        latitudes, longitudes = query["route"]
+        found = distances.store.get().near_route(
+            latitudes, longitudes, query["within_km"])
+        events = self.filter_queryset(self.get_queryset()).in_bulk(
+            [pk for _, pk in found])
+
+        data = []
+        for distance, pk in found:
+            if pk in events:
+                item = self.get_serializer(events[pk]).data
+                item["distance_km"] = round(distance, 3)
+                data.append(item)
+        return Response(data)
+
+    @action(detail=False)
+    def search(self, request):
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # Ask the index for a few times as many matches as wanted, and for
+        # more if the filters exclude too many of them
+        limit, seen, data = query["k"] * 4, 0, []
+        while len(data) < query["k"]:
+            found = search_index.search(query["q"], limit)
+            matches = found[seen:]
+            events = queryset.in_bulk([pk for _, pk in matches])
+            for score, pk in matches:
+                if pk in events and len(data) < query["k"]:
+                    item = self.get_serializer(events[pk]).data
+                    item["score"] = round(score, 3)
+                    data.append(item)
+            if len(found) < limit:
+                break
+            limit, seen = limit * 4, len(found)
+        return Response(data)
+
+    @action(detail=False)
+    def changes(self, request):
+        # Imported per action, so only the requests that use them load them
+        from ..changes import get_changes
+
+        params = ChangesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+
+        changed, deleted, token, more = get_changes(
+            self.get_queryset(), query.get("since"), query["page_size"])
+        return Response({
+            "changed": self.get_serializer(changed, many=True).data,
+            "deleted": EventTombstoneSerializer(deleted, many=True).data,
+            "token": token,
+            "more": more,
+        })
+
+    @action(detail=False, methods=["post"], parser_classes=[
+        JSONParser, NDJSONParser, BinaryEventParser] + MSGPACK_PARSERS)
+    def bulk(self, request):
+        from ..bulk import upsert_events
+
+        results = upsert_events(request.data)
+        created = any(result["status"] == "created" for result in results)
+        return Response(results, status=status.HTTP_201_CREATED
+                        if created else status.HTTP_200_OK)
+
+    def stream_export(self, content, renderer, filename):
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            content(queryset), content_type="%s; charset=%s" % (
+                renderer.media_type, renderer.charset))
+        response["Content-Disposition"] = (
+            'attachment; filename="%s"' % filename)
+        return response
+
+    @action(detail=False, url_path=r"export\.ndjson",
+            url_name="export-ndjson", renderer_classes=[NDJSONRenderer])
+    def export_ndjson(self, request):
+        from ..export import iter_ndjson
+
+        return self.stream_export(iter_ndjson, NDJSONRenderer, "events.ndjson")
+
+    @action(detail=False, url_path=r"export\.csv", url_name="export-csv",
+            renderer_classes=[CSVRenderer])
+    def export_csv(self, request):
+        from ..export import iter_csv
+
+        return self.stream_export(iter_csv, CSVRenderer, "events.csv")
+
+    def render_tile(self, request, z, x, y):
+        from ..tiles import cluster, tile_bounds
+
+        try:
+            bounds = tile_bounds(int(z), int(x), int(y))
+        except ValueError:
+            raise Http404
+        queryset = EventFilterBackend().filter_tile(
+            self.filter_queryset(self.get_queryset()), *bounds)
+        rows = queryset.values_list(
+            "id", "latitude", "longitude", "name", "slug").iterator()
+        return Response(cluster(rows, int(z), int(x), int(y),
+                                self.tile_grid))
+
+    @action(detail=False,
+            url_path=r"tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)",
+            url_name="tile", renderer_classes=[GeoJSONRenderer])
+    def tile(self, request, z, x, y):
+        return self.cached_response(self.render_tile, request, z, x, y)
+
+
+class CountryEventViewSet(ReplicaReadMixin, SparseFieldsMixin,
+                          ConditionalGetMixin, CachedResponseMixin,
+                          FastReadMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    The Events of one Country, listed at /countries/<country>/events/ and
+    looked up by slug at /countries/<country>/events/<slug>/ with a single
+    query on the (country, slug) covering index.
+    """
+    queryset = Event.objects.all()
+    serializer_class = EventSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = IdCursorPagination
+    filter_backends = [EventFilterBackend]
+    renderer_classes = EventViewSet.renderer_classes
+    lookup_field = "slug"
+    tombstone_queryset = EventTombstone.objects.all()
+    cache_dependencies = (Event,)
+
+    def get_queryset(self):
+        return super().get_queryset().filter(
+            country_id=self.kwargs["country"])
+
+    def get_cache_object_id(self):
+        # Cached per slug, and invalidated by the signals when the Event
+        # with that slug changes
+        return lookup_id(country=int(self.kwargs["country"]),
+                         slug=self.kwargs["slug"])
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+import decimal
+import struct
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+# Coordinates travel as int32 micro-degrees, the model's 6 decimal places
+COORDINATE_FIELDS = ("latitude", "longitude")
+MICRODEGREE = decimal.Decimal("0.000001")
+
+FLAG_FIELDS = ("is_juniors", "is_restricted", "is_discontinued")
+
+MAGIC = b"PRKE"
+VERSION = 1
+HEADER = struct.Struct("!4sBBBI")
+LENGTH = struct.Struct("!H")
+
+# Payload kinds
+SINGLE, LIST, PAGE = 0, 1, 2
+
+# Fields of the fixed schema in record order, with their struct codes. The
+# header carries a bit mask of the ones present in every record.
+SCHEMA = (
+    ("id", "I"),
+    ("country", "I"),
+    ("latitude", "i"),
+    ("longitude", "i"),
+    ("flags", "B"),
+    ("name", None),
+    ("slug", None),
+)
+# A dict with none of these isn't an event
+EVENT_FIELDS = frozenset(
+    [name for name, _ in SCHEMA if name != "flags"] + list(FLAG_FIELDS))
+
+
+def to_microdegrees(value):
+    if isinstance(value, str):
+        # Fast path for the serializers' fixed-point strings
+        whole, _, fraction = value.partition(".")
+        if len(fraction) <= 6:
+            try:
+                return int(whole + fraction.ljust(6, "0"))
+            except ValueError:
+                pass
+    return int(decimal.Decimal(str(value)).quantize(MICRODEGREE)
+               .scaleb(6))
+
+
+def from_microdegrees(value):
+    return decimal.Decimal(value).scaleb(-6)
+
+
+def encode_coordinates(data):
+    """Replaces coordinates in (lists of) dicts with micro-degree ints."""
+    if isinstance(data, list):
+        return [encode_coordinates(item) for item in data]
+    if isinstance(data, dict):
+        return {key: to_microdegrees(value)
+                if key in COORDINATE_FIELDS and value is not None
+                else encode_coordinates(value)
+                for key, value in data.items()}
+    return data
+
+
+def decode_coordinates(data):
+    """Turns micro-degree ints in (lists of) dicts back into Decimals."""
+    if isinstance(data, list):
+        return [decode_coordinates(item) for item in data]
+    if isinstance(data, dict):
+        return {key: from_microdegrees(value)
+                if key in COORDINATE_FIELDS and isinstance(value, int)
+                else decode_coordinates(value)
+                for key, value in data.items()}
+    return data
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def encode_flags(item):
+    """Packs the boolean flags as values in bits 0-2, presence in 4-6."""
+    flags = 0
+    for bit, name in enumerate(FLAG_FIELDS):
+        if name in item:
+            flags |= 1 << (bit + 4)
+            if item[name]:
+                flags |= 1 << bit
+    return flags
+
+
+def decode_flags(flags, item):
+    for bit, name in enumerate(FLAG_FIELDS):
+        if flags & (1 << (bit + 4)):
+            item[name] = bool(flags & (1 << bit))
+
+
+def _string(value):
+    encoded = (value or "").encode("utf-8")
+    if len(encoded) > 0xFFFF:
+        raise WireFormatError("String too long for the binary format")
+    return LENGTH.pack(len(encoded)) + encoded
+
+
+def _field_value(item, name):
+    if name == "flags":
+        return encode_flags(item)
+    value = item[name]
+    if name == "country" and isinstance(value, dict):
+        value = value["id"]  # ?expand=country
+    if name in COORDINATE_FIELDS:
+        return to_microdegrees(value)
+    return value
+
+
+def encode_events(data):
+    """
+    Encodes an event, a list of events or a page of events in the fixed
+    binary schema. Fields outside SCHEMA are dropped, but anything that
+    isn't an event raises WireFormatError rather than becoming an empty
+    record.
+    """
+    kind, items, links = SINGLE, [data], b""
+    if isinstance(data, list):
+        kind, items = LIST, data
+    elif isinstance(data, dict) and "results" in data:
+        kind, items = PAGE, data["results"]
+        links = _string(data.get("next")) + _string(data.get("previous"))
+    for item in items:
+        if not isinstance(item, dict) or EVENT_FIELDS.isdisjoint(item):
+            raise WireFormatError("Only events can be encoded")
+
+    mask = 0
+    if items:
+        first = items[0]
+        for bit, (name, _) in enumerate(SCHEMA):
+            if name in first or (name == "flags" and encode_flags(first)):
+                mask |= 1 << bit
+    fields = [(name, code) for bit, (name, code) in enumerate(SCHEMA)
+              if mask & (1 << bit)]
+    numbers = struct.Struct("!" + "".join(
+        code for _, code in fields if code is not None))
+    strings = [name for name, code in fields if code is None]
+
+    chunks = [HEADER.pack(MAGIC, VERSION, kind, mask, len(items)), links]
+    for item in items:
+        try:
+            chunks.append(numbers.pack(*[
+                _field_value(item, name)
+                for name, code in fields if code is not None]))
+        except (KeyError, struct.error) as exc:
+            raise WireFormatError("Cannot encode event: %s" % exc)
+        chunks.extend(_string(item.get(name)) for name in strings)
+    return b"".join(chunks)
+
+
+def decode_events(content):
+    """Decodes the output of encode_events()."""
+    view = memoryview(content)
+    try:
+        magic, version, kind, mask, count = HEADER.unpack_from(view)
+    except struct.error:
+        raise WireFormatError("Truncated header")
+    if magic != MAGIC or version != VERSION:
+        raise WireFormatError("Not a version %d event payload" % VERSION)
+    offset = HEADER.size
+
+    def read_string():
+        nonlocal offset
+        length, = LENGTH.unpack_from(view, offset)
+        offset += LENGTH.size
+        value = bytes(view[offset:offset + length])
+        if len(value) != length:
+            raise struct.error("string runs past the end of the payload")
+        offset += length
+        return value.decode("utf-8")
+
+    fields = [(name, code) for bit, (name, code) in enumerate(SCHEMA)
+              if mask & (1 << bit)]
+    numbers = struct.Struct("!" + "".join(
+        code for _, code in fields if code is not None))
+    number_names = [name for name, code in fields if code is not None]
+    strings = [name for name, code in fields if code is None]
+
+    items = []
+    try:
+        links = (read_string(), read_string()) if kind == PAGE else None
+        for _ in range(count):
+            item = {}
+            for name, value in zip(number_names,
+                                   numbers.unpack_from(view, offset)):
+                if name == "flags":
+                    decode_flags(value, item)
+                elif name in COORDINATE_FIELDS:
+                    item[name] = from_microdegrees(value)
+                else:
+                    item[name] = value
+            offset += numbers.size
+            for name in strings:
+                item[name] = read_string()
+            items.append(item)
+    except (struct.error, UnicodeDecodeError) as exc:
+        raise WireFormatError("Malformed event payload: %s" % exc)
+    if offset != len(view):
+        raise WireFormatError("Trailing bytes after %d events" % count)
+
+    if kind == SINGLE:
+        if count != 1:
+            raise WireFormatError("Expected a single event")
+        return items[0]
+    if kind == PAGE:
+        return {"next": links[0] or None, "previous": links[1] or None,
+                "results": items}
+    return items
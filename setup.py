@@ -57,24 +57,28 @@ setup(
     ],
     include_package_data=True,
     install_requires=[
+        "Django>=3.2",
         "django-model-utils>=2.0",
         "djangorestframework>=3.8.2"
     ],
+    extras_require={
+        "ijson": ["ijson>=2.5"],
+        "msgpack": ["msgpack>=0.5.2"],
+        "numpy": ["numpy"],
+    },
+    python_requires=">=3.7",
     license="BSD",
     zip_safe=False,
     keywords='parkrundata',
     classifiers=[
         'Development Status :: 4 - Beta',
-        'Framework :: Django :: 1.11',
-        'Framework :: Django :: 2.0',
+        'Framework :: Django :: 3.2',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: BSD License',
         'Natural Language :: English',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
     ],
 )
@@ -13,9 +13,21 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": ":memory:",
-    }
+    },
+    # Stand-ins for read replicas, only used by tests that configure
+    # PARKRUNDATA_REPLICA_DATABASES
+    "replica1": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
+    "replica2": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
 }
 
+DATABASE_ROUTERS = ["parkrundata.routers.ReplicaRouter"]
+
 ROOT_URLCONF = "tests.urls"
 
 INSTALLED_APPS = [
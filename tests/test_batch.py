@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_batch
+------------
+
+Tests for `parkrundata` batch module and the events and countries batch
+endpoints.
+"""
+
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from parkrundata import models
+from parkrundata.batch import in_chunks
+
+
+class TestInChunks(TestCase):
+
+    def setUp(self):
+        self.countries = models.Country.objects.bulk_create([
+            models.Country(name="Country %d" % i, url="www.parkrun%d.org" % i)
+            for i in range(5)])
+
+    def test_chunks_under_parameter_limit(self):
+        ids = list(models.Country.objects.values_list("id", flat=True))
+        queryset = models.Country.objects.filter(name__startswith="Country")
+        with mock.patch.object(connection.features, "max_query_params", 3):
+            # One parameter is taken by the name filter
+            with self.assertNumQueries(3):
+                found = list(in_chunks(queryset, "id", ids + ids))
+
+        self.assertEqual(sorted(country.id for country in found), ids)
+
+    def test_one_query_without_limit(self):
+        ids = list(models.Country.objects.values_list("id", flat=True))
+        with mock.patch.object(connection.features, "max_query_params",
+                               None):
+            with self.assertNumQueries(1):
+                found = list(in_chunks(models.Country.objects.all(), "id",
+                                       ids))
+
+        self.assertEqual(len(found), 5)
+
+    def tearDown(self):
+        pass
+
+
+class TestBatchViews(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.france = models.Country.objects.create(
+            name="France", url="www.parkrun.fr")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy", is_juniors=True,
+            latitude="51.409694", longitude="-0.334032")
+        self.lesdougnes = models.Event.objects.create(
+            country=self.france, name="Les Dougnes", slug="lesdougnes",
+            latitude="45.066553", longitude="-0.429266")
+        self.client = APIClient()
+
+    def test_events_by_id_in_request_order(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                "/events/batch/?ids=%d,99,%d" % (self.lesdougnes.id,
+                                                 self.bushy.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [
+            self.client.get("/events/%d/" % self.lesdougnes.id).json(),
+            {"id": 99, "detail": "Not found."},
+            self.client.get("/events/%d/" % self.bushy.id).json(),
+        ])
+
+    def test_events_by_slug(self):
+        response = self.client.get(
+            "/events/batch/?slugs=%d:bushy,%d:bushy,%d:lesdougnes" % (
+                self.uk.id, self.france.id, self.france.id))
+
+        self.assertEqual([item.get("id") for item in response.json()],
+                         [self.bushy.id, None, self.lesdougnes.id])
+        self.assertEqual(response.json()[1], {
+            "country": self.france.id, "slug": "bushy",
+            "detail": "Not found."})
+
+    def test_sparse_fields_and_filters(self):
+        response = self.client.get(
+            "/events/batch/?ids=%d,%d&fields=slug&is_juniors=true" % (
+                self.bushy.id, self.lesdougnes.id))
+
+        self.assertEqual(response.json(), [
+            {"slug": "bushy"},
+            {"id": self.lesdougnes.id, "detail": "Not found."}])
+
+    def test_countries_by_id(self):
+        response = self.client.get(
+            "/countries/batch/?ids=%d,%d" % (self.france.id, self.uk.id))
+
+        self.assertEqual([item["name"] for item in response.json()],
+                         ["France", "UK"])
+
+    def test_invalid_keys(self):
+        for path in ["/events/batch/",
+                     "/events/batch/?ids=1,a",
+                     "/events/batch/?ids=1&slugs=1:bushy",
+                     "/events/batch/?slugs=bushy",
+                     "/events/batch/?ids=" + ",".join(["1"] * 1001),
+                     "/countries/batch/?slugs=1:bushy"]:
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+
+    def tearDown(self):
+        pass
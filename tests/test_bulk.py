@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_bulk
+------------
+
+Tests for `parkrundata` bulk module and the events bulk endpoint.
+"""
+
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from parkrundata import models
+from parkrundata.bulk import upsert_events
+from parkrundata.spatial import event_index
+
+
+User = get_user_model()
+
+
+class TestUpsertEvents(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.france = models.Country.objects.create(
+            name="France", url="www.parkrun.fr")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+
+    def event(self, **kwargs):
+        data = {
+            "country": self.uk.id,
+            "name": "Richmond",
+            "slug": "richmond",
+            "latitude": "51.442",
+            "longitude": "-0.276",
+        }
+        data.update(kwargs)
+        return data
+
+    def test_creates_updates_and_skips(self):
+        results = upsert_events([
+            self.event(),
+            self.event(name="Bushy Park", slug="bushy",
+                       latitude="51.409694", longitude="-0.334032"),
+            self.event(name="Les Dougnes", slug="lesdougnes",
+                       country=self.france.id,
+                       latitude="45.066553", longitude="-0.429266"),
+        ])
+        richmond = models.Event.objects.get(slug="richmond")
+        lesdougnes = models.Event.objects.get(slug="lesdougnes")
+        self.assertEqual(results, [
+            {"status": "created", "id": richmond.id},
+            {"status": "updated", "id": self.bushy.id},
+            {"status": "created", "id": lesdougnes.id},
+        ])
+        self.bushy.refresh_from_db()
+        self.assertEqual(self.bushy.name, "Bushy Park")
+        self.assertGreater(self.bushy.modified, self.bushy.created)
+        self.assertEqual(richmond.latitude, Decimal("51.442"))
+
+        results = upsert_events([self.event()])
+        self.assertEqual(results, [{"status": "unchanged",
+                                    "id": richmond.id}])
+
+    def test_uses_a_constant_number_of_queries(self):
+        items = [self.event(name="Event %d" % i, slug="event%d" % i)
+                 for i in range(50)]
+        with self.assertNumQueries(8):
+            upsert_events(items)
+        for item in items:
+            item["is_juniors"] = True
+        with self.assertNumQueries(7):
+            upsert_events(items)
+        self.assertEqual(
+            models.Event.objects.filter(is_juniors=True).count(), 50)
+
+    def test_invalid_items_write_nothing(self):
+        with self.assertRaises(ValidationError) as cm:
+            upsert_events([
+                self.event(),
+                self.event(slug="other", latitude="91"),
+                self.event(slug="nowhere", country=99),
+            ])
+        errors = cm.exception.detail
+        self.assertEqual(errors[0], {})
+        self.assertIn("latitude", errors[1])
+        self.assertIn("country", errors[2])
+        self.assertFalse(models.Event.objects.filter(slug="richmond"))
+
+    def test_rejects_duplicate_slugs_in_request(self):
+        with self.assertRaises(ValidationError) as cm:
+            upsert_events([self.event(), self.event(name="Richmond 2")])
+        self.assertIn("slug", cm.exception.detail[1])
+
+    def test_rejects_name_clashes(self):
+        with self.assertRaises(ValidationError) as cm:
+            upsert_events([self.event(name="Bushy")])
+        self.assertIn("name", cm.exception.detail[0])
+
+    def test_allows_names_freed_up_in_the_same_request(self):
+        upsert_events([
+            self.event(name="Bushy", slug="bushynew"),
+            self.event(name="Bushy Park", slug="bushy",
+                       latitude="51.409694", longitude="-0.334032"),
+        ])
+        self.assertEqual(
+            models.Event.objects.get(slug="bushynew").name, "Bushy")
+
+    def test_same_name_in_different_countries(self):
+        results = upsert_events([self.event(name="Bushy", slug="bushy",
+                                            country=self.france.id)])
+        self.assertEqual(results[0]["status"], "created")
+
+    def test_requires_a_list(self):
+        with self.assertRaises(ValidationError):
+            upsert_events(self.event())
+
+    def test_updates_spatial_index(self):
+        event_index.invalidate()
+        event_index.ensure_loaded()
+        with self.captureOnCommitCallbacks(execute=True):
+            results = upsert_events([self.event()])
+        self.assertIn(results[0]["id"], event_index)
+        event_index.invalidate()
+
+    def tearDown(self):
+        pass
+
+
+class TestBulkEndpoint(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.user = User.objects.create(username="test")
+        self.client = APIClient()
+        self.items = [
+            {"country": self.uk.id, "name": "Bushy", "slug": "bushy",
+             "latitude": "51.409694", "longitude": "-0.334032"},
+            {"country": self.uk.id, "name": "Richmond", "slug": "richmond",
+             "latitude": "51.442", "longitude": "-0.276"},
+        ]
+
+    def test_requires_authentication(self):
+        response = self.client.post("/events/bulk/", self.items,
+                                    format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_json_array(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post("/events/bulk/", self.items,
+                                    format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r["status"] for r in response.data],
+                         ["created", "created"])
+
+        response = self.client.post("/events/bulk/", self.items,
+                                    format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_ndjson(self):
+        self.client.force_authenticate(user=self.user)
+        body = "\n".join(json.dumps(item) for item in self.items) + "\n"
+        response = self.client.post("/events/bulk/", body,
+                                    content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(models.Event.objects.count(), 2)
+
+    def test_bad_ndjson(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post("/events/bulk/", '{"a": 1}\n{oops',
+                                    content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("line 2", response.data["detail"])
+
+    def test_invalid_items(self):
+        self.client.force_authenticate(user=self.user)
+        self.items[1]["longitude"] = "181"
+        response = self.client.post("/events/bulk/", self.items,
+                                    format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("longitude", response.data[1])
+
+    def tearDown(self):
+        pass
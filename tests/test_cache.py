@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_cache
+------------
+
+Tests for `parkrundata` cache module.
+"""
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from rest_framework.test import APIClient
+
+from parkrundata import cache, models
+
+
+class TestCachedResponseMixin(TestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+        cache.stats.reset()
+
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+        self.richmond = models.Event.objects.create(
+            country=self.uk, name="Richmond", slug="richmond",
+            latitude="51.442", longitude="-0.276")
+        self.client = APIClient()
+
+    def test_second_request_is_a_hit(self):
+        first = self.client.get("/events/", format="json")
+        second = self.client.get("/events/", format="json")
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second["Content-Type"], "application/json")
+        self.assertEqual(cache.stats.as_dict(), {"hits": 1, "misses": 1})
+
+    def test_hit_skips_serialization_queries(self):
+        self.client.get("/events/", format="json")
+        # Only the conditional GET aggregates remain
+        with self.assertNumQueries(2):
+            self.client.get("/events/", format="json")
+
+    def test_key_includes_query_parameters(self):
+        self.client.get("/events/", format="json")
+        response = self.client.get("/events/?page_size=1", format="json")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    @override_settings(ALLOWED_HOSTS=["a.example.com", "b.example.com"])
+    def test_key_includes_host(self):
+        # The cursor links in the body are absolute URLs on the host asked
+        self.client.get("/events/?page_size=1", HTTP_HOST="a.example.com")
+        response = self.client.get("/events/?page_size=1",
+                                   HTTP_HOST="b.example.com")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertTrue(response.json()["next"].startswith(
+            "http://b.example.com/events/"))
+
+    def test_save_invalidates_list(self):
+        self.client.get("/events/", format="json")
+        self.bushy.name = "Bushy Park"
+        self.bushy.save()
+        response = self.client.get("/events/", format="json")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["results"][0]["name"], "Bushy Park")
+
+    def test_delete_invalidates_list(self):
+        self.client.get("/events/", format="json")
+        self.richmond.delete()
+        response = self.client.get("/events/", format="json")
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_detail_only_invalidated_by_its_own_object(self):
+        url = "/events/%d/" % self.bushy.id
+        self.client.get(url, format="json")
+        self.richmond.name = "Old Deer Park"
+        self.richmond.save()
+        self.assertEqual(self.client.get(url, format="json")["X-Cache"],
+                         "HIT")
+
+        self.bushy.name = "Bushy Park"
+        self.bushy.save()
+        response = self.client.get(url, format="json")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["name"], "Bushy Park")
+
+    def test_slug_lookup_cached_per_slug(self):
+        path = "/countries/%d/events/bushy/" % self.uk.id
+        self.client.get(path, format="json")
+        # Only the conditional GET lookup remains
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(path, format="json")["X-Cache"],
+                             "HIT")
+
+        self.richmond.save()
+        self.assertEqual(self.client.get(path, format="json")["X-Cache"],
+                         "HIT")
+        self.bushy.name = "Bushy Park"
+        self.bushy.save()
+        self.assertEqual(self.client.get(path, format="json")["X-Cache"],
+                         "MISS")
+
+    def test_slug_change_invalidates_old_slug(self):
+        path = "/countries/%d/events/bushy/" % self.uk.id
+        self.client.get(path, format="json")
+        self.bushy.slug = "bushypark"
+        self.bushy.save()
+
+        self.assertEqual(self.client.get(path, format="json").status_code,
+                         404)
+
+    def test_country_changes_do_not_invalidate_events(self):
+        self.client.get("/events/", format="json")
+        self.uk.name = "United Kingdom"
+        self.uk.save()
+        self.assertEqual(
+            self.client.get("/events/", format="json")["X-Cache"], "HIT")
+        self.assertEqual(
+            self.client.get("/countries/", format="json")["X-Cache"], "MISS")
+
+    def test_errors_are_not_cached(self):
+        for _ in range(2):
+            response = self.client.get("/events/0/", format="json")
+            self.assertEqual(response.status_code, 404)
+        self.assertEqual(cache.stats.as_dict(), {"hits": 0, "misses": 2})
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "api": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "api"},
+        },
+        PARKRUNDATA_CACHE="api",
+    )
+    def test_uses_configured_cache(self):
+        caches["api"].clear()
+        self.client.get("/countries/", format="json")
+        self.assertEqual(
+            self.client.get("/countries/", format="json")["X-Cache"], "HIT")
+        self.assertTrue(any(key.startswith(":1:parkrundata:response:")
+                            for key in caches["api"]._cache))
+
+    def tearDown(self):
+        caches["default"].clear()
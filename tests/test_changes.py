@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_changes
+------------
+
+Tests for `parkrundata` changes module and the events changes feed.
+"""
+
+import datetime
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from parkrundata import changes, models
+from parkrundata.changes import decode_token, encode_token
+
+
+class TestChangeTokens(TestCase):
+
+    def test_empty_token(self):
+        self.assertEqual(decode_token(""),
+                         {"changed": None, "deleted": None})
+
+    def test_round_trip(self):
+        token = encode_token({
+            "changed": ("2018-07-18T11:05:00+00:00", 3), "deleted": None})
+        watermarks = decode_token(token)
+        self.assertEqual(watermarks["changed"][0].isoformat(),
+                         "2018-07-18T11:05:00+00:00")
+        self.assertEqual(watermarks["changed"][1], 3)
+        self.assertIsNone(watermarks["deleted"])
+
+    def test_invalid_tokens(self):
+        for token in ["garbage", encode_token({"changed": ["x", 1]}),
+                      encode_token({"changed": 5}), encode_token([])]:
+            with self.assertRaises(ValidationError):
+                decode_token(token)
+
+    def tearDown(self):
+        pass
+
+
+class TestEventChangesFeed(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+        self.richmond = models.Event.objects.create(
+            country=self.uk, name="Richmond", slug="richmond",
+            latitude="51.442", longitude="-0.276")
+        # Old enough that tokens aren't held back on their account
+        self.hour_ago = timezone.now() - datetime.timedelta(hours=1)
+        models.Event.objects.update(modified=self.hour_ago)
+        self.client = APIClient()
+
+    def get_changes(self, **params):
+        response = self.client.get("/events/changes/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_initial_sync_returns_everything(self):
+        data = self.get_changes()
+        self.assertEqual([e["slug"] for e in data["changed"]],
+                         ["bushy", "richmond"])
+        self.assertEqual(data["deleted"], [])
+        self.assertFalse(data["more"])
+
+    def test_no_changes_since_token(self):
+        token = self.get_changes()["token"]
+        data = self.get_changes(since=token)
+        self.assertEqual(data["changed"], [])
+        self.assertEqual(data["deleted"], [])
+        self.assertEqual(data["token"], token)
+
+    def test_returns_only_modified_rows(self):
+        token = self.get_changes()["token"]
+        self.bushy.is_discontinued = True
+        self.bushy.save()
+
+        data = self.get_changes(since=token)
+        self.assertEqual([e["slug"] for e in data["changed"]], ["bushy"])
+        self.assertTrue(data["changed"][0]["is_discontinued"])
+
+    def test_returns_tombstones_for_deleted_events(self):
+        token = self.get_changes()["token"]
+        richmond_id = self.richmond.id
+        self.richmond.delete()
+
+        data = self.get_changes(since=token)
+        self.assertEqual(data["changed"], [])
+        self.assertEqual(len(data["deleted"]), 1)
+        self.assertEqual(data["deleted"][0]["id"], richmond_id)
+        self.assertEqual(data["deleted"][0]["country"], self.uk.id)
+        self.assertEqual(data["deleted"][0]["slug"], "richmond")
+
+        # Sent again until it's older than the margin
+        token = data["token"]
+        self.assertEqual(len(self.get_changes(since=token)["deleted"]), 1)
+        later = timezone.now() + changes.LATE_COMMIT_MARGIN * 2
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            token = self.get_changes(since=token)["token"]
+        self.assertEqual(self.get_changes(since=token)["deleted"], [])
+
+    def test_returns_rows_committed_after_a_poll(self):
+        self.bushy.save()
+        token = self.get_changes()["token"]
+        # Saved before that poll, but committed after it
+        models.Event.objects.filter(pk=self.richmond.pk).update(
+            name="Richmond Park",
+            modified=timezone.now() - datetime.timedelta(minutes=1))
+
+        data = self.get_changes(since=token)
+        self.assertIn("Richmond Park",
+                      [e["name"] for e in data["changed"]])
+
+    def test_pages_through_changes(self):
+        data = self.get_changes(page_size=1)
+        self.assertEqual([e["slug"] for e in data["changed"]], ["bushy"])
+        self.assertTrue(data["more"])
+
+        data = self.get_changes(page_size=1, since=data["token"])
+        self.assertEqual([e["slug"] for e in data["changed"]], ["richmond"])
+        self.assertFalse(data["more"])
+
+    def test_invalid_token_gets_400(self):
+        response = self.client.get("/events/changes/", {"since": "garbage"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def tearDown(self):
+        pass
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_commands
+------------
+
+Tests for `parkrundata` management commands.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from parkrundata import importer, models, search
+
+
+def feature(eventname, shortname, countrycode, lon, lat, seriesid=1):
+    return {
+        "id": 1,
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        "properties": {
+            "eventname": eventname,
+            "EventLongName": shortname + " parkrun",
+            "EventShortName": shortname,
+            "countrycode": countrycode,
+            "seriesid": seriesid,
+        },
+    }
+
+
+class TestImportParkrunEvents(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.uk = models.Country.objects.create(
+            name="UK", url="http://www.parkrun.org.uk")
+        self.france = models.Country.objects.create(
+            name="France", url="http://www.parkrun.fr")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.410992", longitude="-0.335791")
+        self.oldevent = models.Event.objects.create(
+            country=self.uk, name="Old Event", slug="oldevent",
+            latitude="50", longitude="0")
+        self.returning = models.Event.objects.create(
+            country=self.uk, name="Returning", slug="returning",
+            latitude="52", longitude="0", is_discontinued=True)
+        self.lesdougnes = models.Event.objects.create(
+            country=self.france, name="Les Dougnes", slug="lesdougnes",
+            latitude="45.066553", longitude="-0.429266")
+
+        self.feed = {
+            "countries": {
+                "97": {"url": "www.parkrun.org.uk", "bounds": []},
+                "32": {"url": "www.parkrun.com.de", "bounds": []},
+            },
+            "events": {
+                "type": "FeatureCollection",
+                "features": [
+                    feature("bushy", "Bushy Park", 97,
+                            -0.335791, 51.410992),
+                    feature("bushy-juniors", "Bushy juniors", 97,
+                            -0.3357914, 51.4109916, seriesid=2),
+                    feature("returning", "Returning", 97, 0, 52),
+                ],
+            },
+        }
+
+    def write(self, data):
+        path = os.path.join(self.directory, "events.json")
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return path
+
+    def call(self, *args):
+        out = StringIO()
+        call_command("import_parkrun_events", *args, stdout=out)
+        return out.getvalue()
+
+    def test_import(self):
+        output = self.call(self.write(self.feed))
+        self.assertIn("created 1, updated 2, discontinued 1, left 0 "
+                      "unchanged", output)
+        self.assertIn("3 events in", output)
+
+        self.bushy.refresh_from_db()
+        self.assertEqual(self.bushy.name, "Bushy Park")
+        juniors = models.Event.objects.get(slug="bushy-juniors")
+        self.assertTrue(juniors.is_juniors)
+        self.assertEqual(juniors.latitude, Decimal("51.410992"))
+        self.assertEqual(juniors.longitude, Decimal("-0.335791"))
+        self.oldevent.refresh_from_db()
+        self.assertTrue(self.oldevent.is_discontinued)
+        self.returning.refresh_from_db()
+        self.assertFalse(self.returning.is_discontinued)
+
+        # Countries missing from the feed are left alone
+        self.lesdougnes.refresh_from_db()
+        self.assertFalse(self.lesdougnes.is_discontinued)
+
+    def test_reimport_changes_nothing(self):
+        path = self.write(self.feed)
+        self.call(path)
+        # The countries, the events in them, the ones to discontinue and
+        # the import's savepoint
+        with self.assertNumQueries(6):
+            output = self.call(path)
+        self.assertIn("created 0, updated 0, discontinued 0, left 3 "
+                      "unchanged", output)
+
+    def test_keeps_flags_the_feed_does_not_carry(self):
+        self.bushy.is_restricted = True
+        self.bushy.save()
+        self.call(self.write(self.feed))
+
+        self.bushy.refresh_from_db()
+        self.assertTrue(self.bushy.is_restricted)
+        self.assertEqual(self.bushy.name, "Bushy Park")
+
+    def test_dry_run(self):
+        output = self.call(self.write(self.feed), "--dry-run")
+        self.assertIn("Dry run: would have created 1", output)
+        self.assertFalse(models.Event.objects.filter(slug="bushy-juniors"))
+        self.oldevent.refresh_from_db()
+        self.assertFalse(self.oldevent.is_discontinued)
+
+    def test_plain_feature_collection(self):
+        data = {
+            "type": "FeatureCollection",
+            "features": [{
+                "type": "Feature",
+                "geometry": {"type": "Point",
+                             "coordinates": [8.453786, 49.448549]},
+                "properties": {"country": "France", "name": "Neckarau",
+                               "slug": "neckarau", "is_restricted": True},
+            }],
+        }
+        output = self.call(self.write(data))
+        self.assertIn("created 1, updated 0, discontinued 1", output)
+        self.assertTrue(
+            models.Event.objects.get(slug="neckarau").is_restricted)
+
+    def test_unknown_country(self):
+        self.feed["events"]["features"].append(
+            feature("neckarau", "Neckarau", 32, 8.45, 49.44))
+        with self.assertRaisesMessage(CommandError, "countrycode '32'"):
+            self.call(self.write(self.feed))
+
+    def test_invalid_event(self):
+        self.feed["events"]["features"].append(
+            feature("north", "North", 97, 0, 95))
+        with self.assertRaisesMessage(CommandError, "event 3"):
+            self.call(self.write(self.feed))
+
+    def test_in_batches(self):
+        self.feed["events"]["features"].append(
+            feature("north", "North", 97, 0, 95))
+        with mock.patch.object(importer, "BATCH_SIZE", 2):
+            # Errors are numbered from the start of the feed
+            with self.assertRaisesMessage(CommandError, "event 3"):
+                self.call(self.write(self.feed))
+            # and nothing from the earlier batches is kept
+            self.assertFalse(
+                models.Event.objects.filter(slug="bushy-juniors"))
+
+            del self.feed["events"]["features"][-1]
+            output = self.call(self.write(self.feed))
+        self.assertIn("created 1, updated 2, discontinued 1", output)
+
+    def test_without_ijson(self):
+        with mock.patch.object(importer, "ijson", None):
+            output = self.call(self.write(self.feed))
+        self.assertIn("created 1, updated 2, discontinued 1", output)
+
+    @unittest.skipIf(importer.ijson is None, "ijson is not installed")
+    def test_countries_after_events(self):
+        feed = '{"events": %s, "countries": %s}' % (
+            json.dumps(self.feed["events"]),
+            json.dumps(self.feed["countries"]))
+        countries, features = importer.read_feed(
+            BytesIO(feed.encode("utf-8")))
+
+        slugs = []
+        for item in features:
+            # Features wait until the countries have been read
+            self.assertIn("97", countries)
+            slugs.append(item["properties"]["eventname"])
+        self.assertEqual(slugs, ["bushy", "bushy-juniors", "returning"])
+
+    @unittest.skipIf(importer.ijson is None, "ijson is not installed")
+    def test_streams_features(self):
+        # Bigger than ijson's read buffer
+        self.feed["events"]["features"] += [
+            feature("event%d" % i, "Event %d" % i, 97, 0, 0)
+            for i in range(2000)]
+        feed = BytesIO(json.dumps(self.feed).encode("utf-8"))
+        countries, features = importer.read_feed(feed)
+
+        self.assertEqual(countries, {})
+        self.assertEqual(next(features)["properties"]["eventname"], "bushy")
+        self.assertEqual(set(countries), {"97", "32"})
+        self.assertLess(feed.tell(), len(feed.getvalue()))
+
+    def test_missing_file(self):
+        with self.assertRaises(CommandError):
+            self.call(os.path.join(self.directory, "missing.json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+class TestRebuildCountryEventStats(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+        # Simulate a write that bypassed the signals
+        models.Event.objects.update(is_discontinued=True)
+
+    def test_rebuild(self):
+        out = StringIO()
+        call_command("rebuild_country_event_stats", stdout=out)
+
+        self.assertIn("Rebuilt event stats for 1 countries", out.getvalue())
+        self.assertEqual(
+            models.CountryEventStats.objects.get(country=self.uk)
+            .discontinued, 1)
+
+    def tearDown(self):
+        pass
+
+
+class TestBuildSearchIndex(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "search.pickle")
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+
+    def test_build(self):
+        out = StringIO()
+        call_command("build_search_index", "--path", self.path, stdout=out)
+
+        self.assertIn("Saved the search index of 1 events", out.getvalue())
+        index = search.EventSearchIndex()
+        self.assertTrue(index.read(self.path))
+        self.assertEqual(len(index), 1)
+
+    def test_requires_path(self):
+        with self.assertRaises(CommandError):
+            call_command("build_search_index", stdout=StringIO())
+
+    def tearDown(self):
+        search.search_index.invalidate()
+        shutil.rmtree(self.directory)
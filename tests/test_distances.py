@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_distances
+------------
+
+Tests for `parkrundata` distances module and the events distances and
+near-route endpoints.
+"""
+
+import json
+import unittest
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from parkrundata import distances, models
+from parkrundata.spatial import haversine
+
+
+POINTS = [(51.409694, -0.334032), (45.066553, -0.429266),
+          (-33.8, 151.2), (89.9, 10.0), (0.0, 179.999), (0.0, -179.999)]
+
+
+@unittest.skipIf(distances.numpy is None, "numpy is not installed")
+class TestDistanceMatrix(unittest.TestCase):
+
+    def test_matches_haversine(self):
+        vectors = distances.unit_vectors(*zip(*POINTS))
+        matrix = distances.distance_matrix(vectors, vectors)
+
+        for i, (lat1, lon1) in enumerate(POINTS):
+            for j, (lat2, lon2) in enumerate(POINTS):
+                self.assertAlmostEqual(matrix[i, j],
+                                       haversine(lat1, lon1, lat2, lon2),
+                                       places=3)
+
+    def test_rows_are_computed_in_blocks(self):
+        vectors = distances.unit_vectors(*zip(*POINTS))
+        expected = distances.distance_matrix(vectors, vectors[:2])
+        with mock.patch.object(distances, "BLOCK_CELLS", 4):
+            rows = list(distances.iter_distance_rows(vectors, vectors[:2]))
+
+        self.assertEqual(len(rows), len(POINTS))
+        for row, distances_km in zip(rows, expected):
+            self.assertEqual(row, [round(km * 1000) for km in distances_km])
+
+    def test_route_distances(self):
+        # Along the equator from 0 to 10 degrees east, then north
+        route = distances.unit_vectors([0, 0, 5], [0, 10, 10])
+        points = [(1, 5), (0, -1), (-1, 11), (3, 11), (0, 5)]
+        found = distances.route_distances(
+            distances.unit_vectors(*zip(*points)), route)
+
+        expected = [haversine(1, 5, 0, 5), haversine(0, -1, 0, 0),
+                    haversine(-1, 11, 0, 10), haversine(3, 11, 3, 10), 0]
+        for radians, km in zip(found, expected):
+            self.assertAlmostEqual(radians * distances.EARTH_RADIUS_KM, km,
+                                   delta=0.5)
+
+    def test_repeated_route_points(self):
+        route = distances.unit_vectors([0, 0, 0], [0, 0, 10])
+        found = distances.route_distances(
+            distances.unit_vectors([1], [0]), route)
+        self.assertAlmostEqual(found[0] * distances.EARTH_RADIUS_KM,
+                               haversine(1, 0, 0, 0), places=3)
+
+
+@unittest.skipIf(distances.numpy is None, "numpy is not installed")
+class TestDistanceViews(TestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.france = models.Country.objects.create(
+            name="France", url="www.parkrun.fr")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+        self.richmond = models.Event.objects.create(
+            country=self.uk, name="Richmond", slug="richmond",
+            is_juniors=True, latitude="51.442", longitude="-0.276")
+        self.lesdougnes = models.Event.objects.create(
+            country=self.france, name="Les Dougnes", slug="lesdougnes",
+            latitude="45.066553", longitude="-0.429266")
+        self.client = APIClient()
+
+    def get_matrix(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_matrix_in_request_order(self):
+        matrix = self.get_matrix("/events/distances/?ids=%d,%d&to=%d" % (
+            self.lesdougnes.id, self.bushy.id, self.richmond.id))
+
+        self.assertEqual(matrix["ids"], [self.lesdougnes.id, self.bushy.id])
+        self.assertEqual(matrix["to"], [self.richmond.id])
+        self.assertEqual(matrix["distances_m"], [
+            [round(haversine(45.066553, -0.429266, 51.442, -0.276) * 1000)],
+            [round(haversine(51.409694, -0.334032, 51.442, -0.276) * 1000)],
+        ])
+
+    def test_matrix_of_filtered_events(self):
+        matrix = self.get_matrix("/events/distances/?country=%d" %
+                                 self.uk.id)
+
+        self.assertEqual(matrix["ids"], [self.bushy.id, self.richmond.id])
+        self.assertEqual(matrix["to"], matrix["ids"])
+        self.assertEqual(matrix["distances_m"][0][0], 0)
+
+    def test_unknown_ids(self):
+        response = self.client.get("/events/distances/?ids=1,99")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"ids": ["Unknown event(s): 99."]})
+
+        response = self.client.get("/events/distances/?ids=1,a")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_coordinates_refresh_on_change(self):
+        path = "/events/distances/?ids=%d&to=%d" % (
+            self.bushy.id, self.richmond.id)
+        before = self.get_matrix(path)["distances_m"][0][0]
+        self.richmond.latitude = "51.409694"
+        self.richmond.longitude = "-0.334032"
+        self.richmond.save()
+
+        self.assertNotEqual(before, 0)
+        self.assertEqual(self.get_matrix(path)["distances_m"][0][0], 0)
+
+    def test_near_route(self):
+        # Along the Thames past Bushy and Richmond
+        response = self.client.get(
+            "/events/near-route/?route=51.40,-0.40;51.45,-0.25&within_km=3")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        found = response.json()
+        self.assertEqual([event["slug"] for event in found],
+                         ["richmond", "bushy"])
+        self.assertLessEqual(found[0]["distance_km"], found[1]["distance_km"])
+        self.assertLess(found[1]["distance_km"], 3)
+
+    def test_near_route_with_filters(self):
+        response = self.client.get(
+            "/events/near-route/?route=51.40,-0.40;51.45,-0.25&within_km=3"
+            "&is_juniors=true")
+        self.assertEqual([event["slug"] for event in response.json()],
+                         ["richmond"])
+
+    def test_near_route_requires_route(self):
+        for route in ["", "51.4,-0.4", "51.4,-0.4;91,0", "a,b;c,d"]:
+            with self.subTest(route=route):
+                response = self.client.get(
+                    "/events/near-route/?route=" + route)
+                self.assertEqual(response.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+
+    def test_without_numpy(self):
+        with mock.patch.object(distances, "numpy", None):
+            response = self.client.get("/events/distances/?ids=1")
+        self.assertEqual(response.status_code,
+                         status.HTTP_501_NOT_IMPLEMENTED)
+
+    def tearDown(self):
+        pass
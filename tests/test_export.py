@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_export
+------------
+
+Tests for `parkrundata` export module and the events export endpoints.
+"""
+
+import csv
+import io
+import json
+
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from parkrundata import export, models
+
+
+class TestEventExport(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.france = models.Country.objects.create(
+            name="France", url="www.parkrun.fr")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy", is_juniors=True,
+            latitude="51.409694", longitude="-0.334032")
+        self.lesdougnes = models.Event.objects.create(
+            country=self.france, name="Les Dougnes", slug="lesdougnes",
+            latitude="45.066553", longitude="-0.429266")
+        self.client = APIClient()
+
+    def test_ndjson(self):
+        response = self.client.get("/events/export.ndjson/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"],
+                         "application/x-ndjson; charset=utf-8")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {"id": self.bushy.id, "country": self.uk.id,
+             "country_name": "UK", "country_url": "www.parkrun.org.uk",
+             "name": "Bushy", "slug": "bushy", "is_juniors": True,
+             "is_restricted": False, "is_discontinued": False,
+             "latitude": "51.409694", "longitude": "-0.334032"},
+            {"id": self.lesdougnes.id, "country": self.france.id,
+             "country_name": "France", "country_url": "www.parkrun.fr",
+             "name": "Les Dougnes", "slug": "lesdougnes",
+             "is_juniors": False, "is_restricted": False,
+             "is_discontinued": False,
+             "latitude": "45.066553", "longitude": "-0.429266"},
+        ])
+
+    def test_csv(self):
+        response = self.client.get("/events/export.csv/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("events.csv", response["Content-Disposition"])
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["country_name"], "UK")
+        self.assertEqual(rows[0]["is_juniors"], "True")
+        self.assertEqual(rows[1]["longitude"], "-0.429266")
+
+    def test_csv_is_written_in_batches(self):
+        chunks = list(export.iter_csv(models.Event.objects.all()))
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(chunks[0].startswith("id,country,country_name"))
+
+    def test_single_joined_query(self):
+        response = self.client.get("/events/export.ndjson/")
+        with self.assertNumQueries(1):
+            list(response.streaming_content)
+
+    def tearDown(self):
+        pass
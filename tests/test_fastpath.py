@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_fastpath
+------------
+
+Tests for `parkrundata` fastpath module.
+"""
+
+from django.test import TestCase, override_settings
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from parkrundata import models
+from parkrundata.fastpath import FastRepresentation, Unsupported
+from parkrundata.serializers import CountrySerializer, EventSerializer
+
+
+class TestFastRepresentation(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.france = models.Country.objects.create(
+            name="Fränce", url="www.parkrun.fr")
+        coordinates = [("51.409694", "-0.334032"), ("0", "0"),
+                       ("-0.000001", "179.999999"), ("-90", "-180"),
+                       ("45.1", "-0.42")]
+        for i, (latitude, longitude) in enumerate(coordinates):
+            models.Event.objects.create(
+                country=self.uk if i % 2 else self.france,
+                name="Event \"%d\"" % i, slug="event%d" % i,
+                is_juniors=bool(i % 2), is_discontinued=bool(i % 3),
+                latitude=latitude, longitude=longitude)
+        self.queryset = models.Event.objects.order_by("id")
+
+    def assertIdentical(self, serializer_class, queryset, **kwargs):
+        expected = JSONRenderer().render(
+            serializer_class(queryset, many=True, **kwargs).data)
+        representation = FastRepresentation(serializer_class(**kwargs))
+        actual = JSONRenderer().render(
+            representation.to_list(representation.rows(queryset)))
+        self.assertEqual(actual, expected)
+
+    def test_events_identical_to_serializer(self):
+        self.assertIdentical(EventSerializer, self.queryset)
+
+    def test_countries_identical_to_serializer(self):
+        self.assertIdentical(CountrySerializer,
+                             models.Country.objects.order_by("id"))
+
+    def test_sparse_fields_identical_to_serializer(self):
+        self.assertIdentical(EventSerializer, self.queryset,
+                             fields=["latitude", "name"])
+
+    def test_expanded_country_identical_to_serializer(self):
+        self.assertIdentical(EventSerializer, self.queryset,
+                             expand=["country"])
+
+    @override_settings(REST_FRAMEWORK={"COERCE_DECIMAL_TO_STRING": False})
+    def test_decimals_as_numbers_identical_to_serializer(self):
+        self.assertIdentical(EventSerializer, self.queryset)
+
+    def test_always_selects_primary_key(self):
+        representation = FastRepresentation(EventSerializer(fields=["name"]))
+        self.assertEqual(representation.columns, ["name", "id"])
+
+    def test_unsupported_fields(self):
+        class MethodSerializer(serializers.ModelSerializer):
+            shout = serializers.SerializerMethodField()
+
+            class Meta:
+                model = models.Country
+                fields = ["id", "shout"]
+
+            def get_shout(self, obj):
+                return obj.name.upper()
+
+        with self.assertRaises(Unsupported):
+            FastRepresentation(MethodSerializer())
+
+    def test_endpoint_matches_serializer(self):
+        response = APIClient().get("/events/", {"expand": "country"},
+                                   format="json")
+        expected = EventSerializer(self.queryset, many=True,
+                                   expand=["country"]).data
+        self.assertIn(JSONRenderer().render(expected)[1:-1],
+                      response.content)
+
+    def test_list_uses_one_query_for_rows(self):
+        client = APIClient()
+        # Conditional GET aggregate, tombstone aggregate and the page
+        with self.assertNumQueries(3):
+            client.get("/events/", {"expand": "country"}, format="json")
+
+    def tearDown(self):
+        pass
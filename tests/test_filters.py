@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_filters
+------------
+
+Tests for `parkrundata` filters module.
+"""
+
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from parkrundata import models
+
+
+class TestEventFilterBackend(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.france = models.Country.objects.create(
+            name="France", url="www.parkrun.fr")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+        self.bushy_juniors = models.Event.objects.create(
+            country=self.uk, name="Bushy juniors", slug="bushy-juniors",
+            is_juniors=True, latitude="51.409694", longitude="-0.334032")
+        self.restricted = models.Event.objects.create(
+            country=self.uk, name="Restricted juniors",
+            slug="restricted-juniors", is_juniors=True, is_restricted=True,
+            latitude="51", longitude="0")
+        self.lesdougnes = models.Event.objects.create(
+            country=self.france, name="Les Dougnes", slug="lesdougnes",
+            is_discontinued=True, latitude="45.066553", longitude="-0.429266")
+        self.client = APIClient()
+
+    def slugs(self, **params):
+        response = self.client.get("/events/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [event["slug"] for event in response.data["results"]]
+
+    def test_no_filters(self):
+        self.assertEqual(len(self.slugs()), 4)
+
+    def test_country(self):
+        self.assertEqual(self.slugs(country=self.france.id), ["lesdougnes"])
+
+    def test_flags(self):
+        self.assertEqual(self.slugs(is_juniors="true"),
+                         ["bushy-juniors", "restricted-juniors"])
+        self.assertEqual(self.slugs(is_juniors="true", is_restricted="false"),
+                         ["bushy-juniors"])
+        self.assertEqual(self.slugs(is_discontinued="1"), ["lesdougnes"])
+        self.assertEqual(
+            self.slugs(country=self.uk.id, is_discontinued="false",
+                       is_juniors="false"),
+            ["bushy"])
+
+    def test_slug(self):
+        self.assertEqual(self.slugs(slug="bushy"), ["bushy"])
+
+    def test_name_prefix(self):
+        self.assertEqual(self.slugs(name_prefix="Bushy"),
+                         ["bushy", "bushy-juniors"])
+        self.assertEqual(self.slugs(name_prefix="Bushy j"),
+                         ["bushy-juniors"])
+
+    def test_name_prefix_is_case_sensitive(self):
+        self.assertEqual(self.slugs(name_prefix="bushy"), [])
+        self.assertEqual(self.slugs(name_prefix="Bushy J"), [])
+
+    def test_name_prefix_matches_wildcards_literally(self):
+        models.Event.objects.create(
+            country=self.uk, name="Bushy* [test]?", slug="bushy-test",
+            latitude="51", longitude="0")
+        for prefix in ["Bushy*", "Bushy* [", "Bushy* [test]?"]:
+            self.assertEqual(self.slugs(name_prefix=prefix), ["bushy-test"])
+        for prefix in ["Bush?", "Bushy [", "Bushy%", "Bushy_"]:
+            self.assertEqual(self.slugs(name_prefix=prefix), [])
+
+    def test_name_prefix_uses_index(self):
+        from django.db import connection
+
+        if connection.vendor != "sqlite":
+            self.skipTest("checks the SQLite query plan")
+        plan = models.Event.objects.filter(
+            name__case_sensitive_startswith="Bushy").explain()
+        self.assertIn("USING INDEX parkrundata_event_name_idx", plan)
+
+    def test_invalid_values_get_400(self):
+        for params in [{"country": "uk"}, {"is_juniors": "maybe"}]:
+            response = self.client.get("/events/", params)
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+    def test_bbox(self):
+        self.assertEqual(self.slugs(bbox="-1,51.2,0,51.5"),
+                         ["bushy", "bushy-juniors"])
+        self.assertEqual(self.slugs(bbox="-1,40,1,52"),
+                         ["bushy", "bushy-juniors", "restricted-juniors",
+                          "lesdougnes"])
+
+    def test_bbox_crossing_antimeridian(self):
+        self.assertEqual(self.slugs(bbox="179,-90,-0.4,90"), ["lesdougnes"])
+
+    def test_invalid_bbox_gets_400(self):
+        for bbox in ["1,2,3", "a,b,c,d", "-1,52,1,51", "-181,0,1,1"]:
+            response = self.client.get("/events/", {"bbox": bbox})
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+            self.assertIn("bbox", response.data)
+
+    def test_bbox_uses_an_index(self):
+        plan = models.Event.objects.filter(
+            latitude__range=(51, 52), longitude__range=(-1, 0)).explain()
+        self.assertIn("USING INDEX parkrundata_latitud", plan)
+
+    def test_applies_to_exports(self):
+        response = self.client.get("/events/export.csv/",
+                                   {"country": self.france.id})
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(len(content.splitlines()), 2)
+
+    def test_country_and_flags_use_an_index(self):
+        plan = models.Event.objects.filter(
+            country=self.uk, is_discontinued=False, is_juniors=True,
+            is_restricted=False).explain()
+        self.assertIn("USING INDEX", plan)
+
+    def tearDown(self):
+        pass
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_metrics
+------------
+
+Tests for `parkrundata` metrics module.
+"""
+
+from django.test import TestCase, override_settings
+from django.urls import Resolver404, resolve
+
+from rest_framework.test import APIClient
+
+from parkrundata import metrics, models
+
+
+@override_settings(
+    MIDDLEWARE=["parkrundata.metrics.MetricsMiddleware"],
+    CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
+class TestMetricsMiddleware(TestCase):
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+        self.client = APIClient()
+
+    def server_timing(self, response):
+        timing = {}
+        for entry in response["Server-Timing"].split(", "):
+            name, *params = entry.split(";")
+            timing[name] = dict(param.split("=", 1) for param in params)
+        return timing
+
+    def test_server_timing_header(self):
+        response = self.client.get("/events/", format="json")
+
+        timing = self.server_timing(response)
+        self.assertCountEqual(timing.keys(),
+                              ["db", "serialize", "render", "total"])
+        self.assertEqual(timing["db"]["desc"], '"3 queries"')
+        self.assertGreater(float(timing["total"]["dur"]), 0)
+        self.assertGreater(float(timing["render"]["dur"]), 0)
+
+    @override_settings(PARKRUNDATA_SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        response = self.client.get("/events/", format="json")
+
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    def test_registry_records_request(self):
+        response = self.client.get("/events/", format="json")
+
+        labels = ("parkrundata:event-list", "GET")
+        self.assertEqual(
+            metrics.registry.requests[labels + ("200",)], 1)
+        self.assertEqual(metrics.registry.queries[labels].sum, 3)
+        self.assertEqual(metrics.registry.totals[labels]["response_bytes"],
+                         len(response.content))
+
+    def test_metrics_endpoint(self):
+        self.client.get("/countries/", format="json")
+        self.client.get("/countries/", format="json")
+
+        response = self.client.get("/metrics/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn('parkrundata_requests_total{view="parkrundata:'
+                      'country-list",method="GET",status="200"} 2', body)
+        self.assertIn('parkrundata_request_queries_bucket{view="parkrundata:'
+                      'country-list",method="GET",le="+Inf"} 2', body)
+
+    def test_metrics_endpoint_is_local_only(self):
+        response = self.client.get("/metrics/", REMOTE_ADDR="192.0.2.1")
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_metrics_endpoint_is_opt_in(self):
+        with self.assertRaises(Resolver404):
+            resolve("/metrics/", urlconf="parkrundata.urls")
+
+    def test_streaming_response(self):
+        response = self.client.get("/events/export.ndjson/")
+        b"".join(response.streaming_content)
+
+        self.assertIn("Server-Timing", response)
+        totals = metrics.registry.totals[
+            ("parkrundata:event-export-ndjson", "GET")]
+        self.assertEqual(totals["response_bytes"], 0)
+
+    def tearDown(self):
+        pass
+
+
+class TestMetricsRegistry(TestCase):
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = metrics.MetricsRegistry()
+        for queries in (0, 2, 200):
+            request = metrics.RequestMetrics()
+            request.view = "view"
+            request.queries = queries
+            registry.record(request, "GET", 200, 0.001)
+
+        body = registry.render()
+
+        self.assertIn('parkrundata_request_queries_bucket{view="view",'
+                      'method="GET",le="0"} 1', body)
+        self.assertIn('parkrundata_request_queries_bucket{view="view",'
+                      'method="GET",le="2"} 2', body)
+        self.assertIn('parkrundata_request_queries_bucket{view="view",'
+                      'method="GET",le="100"} 2', body)
+        self.assertIn('parkrundata_request_queries_count{view="view",'
+                      'method="GET"} 3', body)
+
+    def test_label_values_are_escaped(self):
+        registry = metrics.MetricsRegistry()
+        request = metrics.RequestMetrics()
+        request.view = 'a"b'
+        registry.record(request, "GET", 200, 0.001)
+
+        self.assertIn('view="a\\"b"', registry.render())
+
+    def tearDown(self):
+        pass
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_mixins
+------------
+
+Tests for `parkrundata` mixins module.
+"""
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from parkrundata import models
+
+
+class TestConditionalGetMixin(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.france = models.Country.objects.create(
+            name="France", url="www.parkrun.fr")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+        self.client = APIClient()
+
+    def test_list_has_validators(self):
+        response = self.client.get("/events/")
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+    def test_country_list_is_validated_by_etag_only(self):
+        response = self.client.get("/countries/")
+        self.assertIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+
+    def test_unchanged_list_gets_304_from_a_single_query(self):
+        etag = self.client.get("/countries/")["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get("/countries/",
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_modified_list_gets_200(self):
+        etag = self.client.get("/events/")["ETag"]
+        self.bushy.name = "Bushy Park"
+        self.bushy.save()
+        response = self.client.get("/events/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_deletion_changes_list_validators(self):
+        etag = self.client.get("/countries/")["ETag"]
+        self.france.delete()
+        response = self.client.get("/countries/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_event_deletion_changes_last_modified(self):
+        richmond = models.Event.objects.create(
+            country=self.uk, name="Richmond", slug="richmond",
+            latitude="51.442", longitude="-0.276")
+        last_modified = self.client.get("/events/")["Last-Modified"]
+        richmond.delete()
+        tombstone = models.EventTombstone.objects.get()
+        tombstone.deleted = tombstone.deleted.replace(year=2100)
+        tombstone.save()
+
+        response = self.client.get("/events/",
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_etag_depends_on_query(self):
+        first = self.client.get("/events/")["ETag"]
+        second = self.client.get("/events/", {"page_size": 1})["ETag"]
+        self.assertNotEqual(first, second)
+
+    def test_retrieve_if_none_match(self):
+        response = self.client.get("/events/%d/" % self.bushy.id)
+        etag = response["ETag"]
+        response = self.client.get("/events/%d/" % self.bushy.id,
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_if_modified_since(self):
+        response = self.client.get("/countries/%d/" % self.uk.id,
+                                   HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get("/countries/%d/" % self.uk.id,
+                                   HTTP_IF_MODIFIED_SINCE=http_date(0))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["name"], "UK")
+
+    def test_retrieve_missing_object_gets_404(self):
+        for url in ["/events/0/", "/events/notanumber/"]:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH="*")
+            self.assertEqual(response.status_code,
+                             status.HTTP_404_NOT_FOUND)
+
+    def tearDown(self):
+        pass
+
+
+class TestSparseFieldsMixin(TestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.france = models.Country.objects.create(
+            name="France", url="www.parkrun.fr")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+        self.lesdougnes = models.Event.objects.create(
+            country=self.france, name="Les Dougnes", slug="lesdougnes",
+            latitude="45.066553", longitude="-0.429266")
+        self.client = APIClient()
+
+    def test_fields_limits_output(self):
+        response = self.client.get(
+            "/events/", {"fields": "id,name,latitude,longitude"})
+        self.assertEqual(response.data["results"][0], {
+            "id": self.bushy.id, "name": "Bushy",
+            "latitude": "51.409694", "longitude": "-0.334032"})
+
+    def test_fields_limits_columns_selected(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/events/", {"fields": "id,latitude"})
+        select = queries.captured_queries[-1]["sql"]
+        self.assertIn('"latitude"', select)
+        self.assertNotIn('"slug"', select)
+
+    def test_fields_on_retrieve(self):
+        response = self.client.get("/countries/%d/" % self.uk.id,
+                                   {"fields": "name"})
+        self.assertEqual(response.data, {"name": "UK"})
+
+    def test_expand_country(self):
+        response = self.client.get("/events/%d/" % self.bushy.id,
+                                   {"expand": "country"})
+        self.assertEqual(response.data["country"], {
+            "id": self.uk.id, "name": "UK", "url": "www.parkrun.org.uk"})
+
+    def test_expand_country_uses_a_join(self):
+        for i in range(10):
+            models.Event.objects.create(
+                country=self.uk, name="Event %d" % i, slug="event%d" % i,
+                latitude="51", longitude="0")
+        # Conditional GET aggregate, tombstone aggregate and the page
+        with self.assertNumQueries(3):
+            response = self.client.get("/events/", {"expand": "country"})
+        self.assertEqual(len(response.data["results"]), 12)
+        self.assertEqual(response.data["results"][1]["country"]["name"],
+                         "France")
+
+    def test_expand_ignored_when_field_not_selected(self):
+        response = self.client.get(
+            "/events/", {"fields": "id,name", "expand": "country"})
+        self.assertNotIn("country", response.data["results"][0])
+
+    def test_unknown_fields_get_400(self):
+        for params in [{"fields": "id,colour"}, {"expand": "slug"}]:
+            response = self.client.get("/events/", params)
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+    def test_expanded_country_changes_validators_and_cache(self):
+        plain = self.client.get("/events/")
+        expanded = self.client.get("/events/", {"expand": "country"})
+        self.uk.name = "United Kingdom"
+        self.uk.save()
+
+        response = self.client.get("/events/",
+                                   HTTP_IF_NONE_MATCH=plain["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get("/events/", {"expand": "country"},
+                                   HTTP_IF_NONE_MATCH=expanded["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            response.data["results"][0]["country"]["name"], "United Kingdom")
+
+    def tearDown(self):
+        caches["default"].clear()
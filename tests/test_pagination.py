@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_pagination
+------------
+
+Tests for `parkrundata` pagination module.
+"""
+
+from unittest import mock
+
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from parkrundata import models
+from parkrundata.pagination import IdCursorPagination
+
+
+class TestIdCursorPagination(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        for i in range(25):
+            models.Event.objects.create(
+                country=self.uk, name="Event %d" % i, slug="event%d" % i,
+                latitude="51.0", longitude="0.0")
+        self.client = APIClient()
+
+    def test_first_page(self):
+        response = self.client.get("/events/", {"page_size": 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e["name"] for e in response.data["results"]],
+                         ["Event %d" % i for i in range(10)])
+        self.assertIsNone(response.data["previous"])
+        self.assertIsNotNone(response.data["next"])
+
+    def test_walks_all_pages_in_id_order(self):
+        url, ids = "/events/?page_size=10", []
+        while url:
+            response = self.client.get(url)
+            ids.extend(e["id"] for e in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(
+            ids, list(models.Event.objects.values_list("id", flat=True)))
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(IdCursorPagination, "max_page_size", 5):
+            response = self.client.get("/events/", {"page_size": 1000})
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_default_page_size(self):
+        response = self.client.get("/countries/")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNone(response.data["next"])
+
+    def test_invalid_cursor_gets_404(self):
+        response = self.client.get("/events/", {"cursor": "notacursor"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def tearDown(self):
+        pass
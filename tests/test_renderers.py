@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_renderers
+------------
+
+Tests for `parkrundata` renderers module.
+"""
+
+import json
+from decimal import Decimal
+
+from django.test import TestCase
+
+from parkrundata.renderers import (
+    CSVRenderer, GeoJSONRenderer, NDJSONRenderer)
+
+
+class TestNDJSONRenderer(TestCase):
+
+    def test_renders_one_line_per_item(self):
+        content = NDJSONRenderer().render(
+            [{"id": 1, "latitude": Decimal("1.500000")}, {"id": 2}])
+        self.assertEqual(content,
+                         b'{"id":1,"latitude":"1.500000"}\n{"id":2}\n')
+
+    def test_renders_single_object(self):
+        content = NDJSONRenderer().render({"detail": "Not found."})
+        self.assertEqual(content, b'{"detail":"Not found."}\n')
+
+
+class TestCSVRenderer(TestCase):
+
+    def test_renders_header_and_rows(self):
+        content = CSVRenderer().render(
+            [{"id": 1, "name": "Bushy"}, {"id": 2, "name": "Les, Dougnes"}])
+        self.assertEqual(content,
+                         b'id,name\r\n1,Bushy\r\n2,"Les, Dougnes"\r\n')
+
+    def test_renders_nothing_for_empty_list(self):
+        self.assertEqual(CSVRenderer().render([]), b"")
+
+
+class TestGeoJSONRenderer(TestCase):
+
+    def render(self, data, **kwargs):
+        return json.loads(GeoJSONRenderer().render(data, **kwargs).decode())
+
+    def test_renders_list_as_feature_collection(self):
+        content = self.render([{"id": 1, "name": "Bushy",
+                                "latitude": "51.409694",
+                                "longitude": "-0.334032"}])
+        self.assertEqual(content, {
+            "type": "FeatureCollection",
+            "features": [{
+                "type": "Feature", "id": 1,
+                "geometry": {"type": "Point",
+                             "coordinates": [-0.334032, 51.409694]},
+                "properties": {"name": "Bushy"},
+            }],
+        })
+
+    def test_keeps_pagination_links(self):
+        content = self.render({"next": "/events/?cursor=x", "previous": None,
+                               "results": [{"id": 1}]})
+        self.assertEqual(content["type"], "FeatureCollection")
+        self.assertEqual(content["next"], "/events/?cursor=x")
+        self.assertIsNone(content["features"][0]["geometry"])
+
+    def test_renders_single_object_as_feature(self):
+        content = self.render({"id": 1, "latitude": "1", "longitude": "2"})
+        self.assertEqual(content["type"], "Feature")
+        self.assertEqual(content["geometry"]["coordinates"], [2.0, 1.0])
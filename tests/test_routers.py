@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_routers
+------------
+
+Tests for `parkrundata` routers and checks modules, with in-memory SQLite
+databases standing in for the primary and its replicas.
+"""
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from parkrundata import checks, models, routers
+
+
+User = get_user_model()
+REPLICAS = ["replica1", "replica2"]
+
+
+def add_replica_countries():
+    # Each replica holds different rows, so responses show where they were
+    # read from. bulk_create doesn't send the signals that would write to
+    # the primary.
+    for alias in REPLICAS:
+        models.Country.objects.using(alias).bulk_create([
+            models.Country(name=alias, url="www.%s.org" % alias)])
+
+
+@override_settings(PARKRUNDATA_REPLICA_DATABASES=REPLICAS)
+class TestReplicaRouter(TestCase):
+    databases = {"default", "replica1", "replica2"}
+
+    def setUp(self):
+        caches["default"].clear()
+        routers._replicas = (None, None)
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(models.Event), "default")
+
+    def test_safe_requests_read_from_replicas_in_turn(self):
+        used = []
+        for _ in range(3):
+            with routers.request_routing(self.factory.get("/")):
+                used.append(self.router.db_for_read(models.Event))
+        self.assertEqual(used, ["replica1", "replica2", "replica1"])
+
+    def test_unsafe_requests_use_primary(self):
+        with routers.request_routing(self.factory.post("/")):
+            self.assertEqual(
+                self.router.db_for_read(models.Event), "default")
+
+    def test_reads_after_write_use_primary(self):
+        with routers.request_routing(self.factory.get("/")):
+            self.assertEqual(
+                self.router.db_for_read(models.Event), "replica1")
+            self.assertEqual(
+                self.router.db_for_write(models.Event), "default")
+            self.assertEqual(
+                self.router.db_for_read(models.Event), "default")
+
+    def test_recent_write_pins_every_client(self):
+        self.router.db_for_write(models.Event)
+        with routers.request_routing(self.factory.get("/")):
+            self.assertEqual(
+                self.router.db_for_read(models.Event), "default")
+
+    def test_pin_cookie(self):
+        request = self.factory.get("/")
+        request.COOKIES[routers.PIN_COOKIE] = str(time.time())
+        self.assertTrue(routers.is_pinned(request))
+
+        request.COOKIES[routers.PIN_COOKIE] = str(time.time() - 10)
+        self.assertFalse(routers.is_pinned(request))
+
+        request.COOKIES[routers.PIN_COOKIE] = "nonsense"
+        self.assertFalse(routers.is_pinned(request))
+
+    @override_settings(PARKRUNDATA_REPLICA_DATABASES=[])
+    def test_no_replicas(self):
+        with routers.request_routing(self.factory.get("/")):
+            self.assertEqual(
+                self.router.db_for_read(models.Event), "default")
+
+    def test_other_apps_are_left_alone(self):
+        with routers.request_routing(self.factory.get("/")):
+            self.assertIsNone(self.router.db_for_read(User))
+            self.assertIsNone(self.router.db_for_write(User))
+
+    def test_allow_relation(self):
+        country = models.Country(name="UK")
+        event = models.Event(name="Bushy")
+        country._state.db = "default"
+        event._state.db = "replica1"
+        self.assertTrue(self.router.allow_relation(country, event))
+        event._state.db = "other"
+        self.assertIsNone(self.router.allow_relation(country, event))
+
+    def tearDown(self):
+        pass
+
+
+@override_settings(PARKRUNDATA_REPLICA_DATABASES=REPLICAS)
+class TestReplicaViews(TestCase):
+    databases = {"default", "replica1", "replica2"}
+
+    def setUp(self):
+        caches["default"].clear()
+        routers._replicas = (None, None)
+        self.user = User.objects.create(username="test")
+        models.Country.objects.create(name="UK", url="www.parkrun.org.uk")
+        add_replica_countries()
+        # Forget the setup writes, which pin reads to the primary
+        caches["default"].clear()
+        self.client = APIClient()
+
+    def names(self, response):
+        return [country["name"] for country in response.json()["results"]]
+
+    def test_lists_are_read_from_replicas(self):
+        first = self.client.get("/countries/", format="json")
+        caches["default"].clear()
+        second = self.client.get("/countries/", format="json")
+
+        self.assertEqual(self.names(first), ["replica1"])
+        self.assertEqual(self.names(second), ["replica2"])
+
+    def test_details_are_read_from_replicas(self):
+        response = self.client.get("/countries/1/", format="json")
+
+        self.assertEqual(response.json()["name"], "replica1")
+
+    def test_writer_reads_own_writes(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post("/countries/", {
+            "name": "France", "url": "http://www.parkrun.fr"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        # Only the client's cookie pins it from here on
+        caches["default"].clear()
+
+        response = self.client.get("/countries/", format="json")
+        self.assertEqual(self.names(response), ["UK", "France"])
+
+        caches["default"].clear()
+        response = APIClient().get("/countries/", format="json")
+        self.assertEqual(self.names(response), ["replica1"])
+
+    def test_other_clients_read_from_primary_after_write(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.post("/countries/", {
+            "name": "France", "url": "http://www.parkrun.fr"})
+
+        response = APIClient().get("/countries/", format="json")
+        self.assertEqual(self.names(response), ["UK", "France"])
+
+    def test_failed_write_does_not_pin(self):
+        response = self.client.post("/countries/", {})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def tearDown(self):
+        pass
+
+
+class TestReplicaChecks(TestCase):
+
+    def ids(self):
+        return [message.id for message in checks.check_replica_settings()]
+
+    def test_no_replicas(self):
+        self.assertEqual(self.ids(), [])
+
+    @override_settings(PARKRUNDATA_REPLICA_DATABASES=["missing"])
+    def test_unknown_alias(self):
+        self.assertEqual(self.ids(), ["parkrundata.E001"])
+
+    @override_settings(PARKRUNDATA_REPLICA_DATABASES=["default"])
+    def test_primary_as_replica(self):
+        self.assertEqual(self.ids(), ["parkrundata.E002"])
+
+    @override_settings(PARKRUNDATA_REPLICA_DATABASES=REPLICAS,
+                       DATABASE_ROUTERS=[])
+    def test_router_missing(self):
+        self.assertIn("parkrundata.W001", self.ids())
+
+    @override_settings(PARKRUNDATA_REPLICA_DATABASES=REPLICAS)
+    def test_connections_not_reused(self):
+        self.assertEqual(self.ids(), ["parkrundata.W002"] * 3)
+
+    def tearDown(self):
+        pass
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_search
+------------
+
+Tests for `parkrundata` search module and the events search endpoint.
+"""
+
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from parkrundata import models, search
+from parkrundata.search import TrigramIndex, search_index, trigrams
+
+
+class TestTrigrams(TestCase):
+
+    def test_pads_each_word(self):
+        self.assertEqual(trigrams("Ab"), {"  a", " ab", "ab "})
+        self.assertEqual(trigrams("a b"), {"  a", " a ", "  b", " b "})
+
+    def test_ignores_case_accents_and_punctuation(self):
+        self.assertEqual(trigrams("Gödöllő, Erzsébet-park"),
+                         trigrams("godollo erzsebet park"))
+
+    def test_empty(self):
+        self.assertEqual(trigrams(" -- "), set())
+
+    def tearDown(self):
+        pass
+
+
+class TestTrigramIndex(TestCase):
+
+    def setUp(self):
+        self.index = TrigramIndex()
+        self.index.set_country(1, "UK")
+        self.index.set_country(2, "France")
+        self.index.add_event(1, "Bushy", "bushy", 1)
+        self.index.add_event(2, "Bushy Park juniors", "bushy-juniors", 1)
+        self.index.add_event(3, "Fulham Palace", "fulhampalace", 1)
+        self.index.add_event(4, "Les Dougnes", "lesdougnes", 2)
+
+    def ids(self, query):
+        return [pk for _, pk in self.index.search(query)]
+
+    def test_exact_match_first(self):
+        self.assertEqual(self.ids("bushy"), [1, 2])
+        self.assertEqual(self.index.search("bushy")[0][0], 1)
+
+    def test_limit(self):
+        self.assertEqual(self.index.search("bushy", 1),
+                         self.index.search("bushy")[:1])
+
+    def test_misspelling(self):
+        self.assertEqual(self.ids("bushi"), [1, 2])
+        self.assertEqual(self.ids("fulham pallace")[0], 3)
+
+    def test_partial_name(self):
+        self.assertEqual(self.ids("fulham"), [3])
+        self.assertEqual(self.ids("dougne"), [4])
+
+    def test_country_name(self):
+        self.assertEqual(self.ids("dougnes france"), [4])
+
+    def test_no_match(self):
+        self.assertEqual(self.ids("zzzzzz"), [])
+        self.assertEqual(self.ids(""), [])
+
+    def test_scores_are_fractions_of_the_query(self):
+        for score, _ in self.index.search("bushy park"):
+            self.assertGreaterEqual(score, search.MIN_SCORE)
+            self.assertLessEqual(score, 1)
+
+    def test_rename_event(self):
+        self.index.add_event(1, "Hampton", "hampton", 1)
+        self.assertEqual(self.ids("bushy"), [2])
+        self.assertEqual(self.ids("hampton"), [1])
+
+    def test_rename_country(self):
+        self.index.set_country(2, "Gaul")
+        self.assertEqual(self.ids("gaul"), [4])
+        self.assertEqual(self.ids("france"), [])
+
+    def test_remove_event(self):
+        self.index.remove_event(1)
+        self.assertEqual(self.ids("bushy"), [2])
+        self.assertNotIn(1, self.index)
+        self.index.remove_event(1)
+
+    def test_removed_trigrams_are_dropped(self):
+        for pk in [1, 2, 3, 4]:
+            self.index.remove_event(pk)
+        self.assertEqual(self.index._postings, {})
+
+    def tearDown(self):
+        pass
+
+
+class TestEventSearchIndex(TestCase):
+
+    def setUp(self):
+        search_index.invalidate()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "search.pickle")
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+
+    def ids(self, query):
+        return [pk for _, pk in search_index.search(query)]
+
+    def test_loads_from_database_on_first_use(self):
+        self.assertFalse(search_index.loaded)
+        self.assertEqual(self.ids("bushy"), [self.bushy.id])
+        self.assertTrue(search_index.loaded)
+
+    def test_follows_saves_and_deletes(self):
+        search_index.ensure_loaded()
+        with self.captureOnCommitCallbacks(execute=True):
+            france = models.Country.objects.create(
+                name="France", url="www.parkrun.fr")
+            lesdougnes = models.Event.objects.create(
+                country=france, name="Les Dougnes", slug="lesdougnes",
+                latitude="45.066553", longitude="-0.429266")
+        self.assertEqual(self.ids("dougnes"), [lesdougnes.id])
+
+        france.name = "Frankreich"
+        with self.captureOnCommitCallbacks(execute=True):
+            france.save()
+        self.assertEqual(self.ids("frankreich"), [lesdougnes.id])
+
+        self.bushy.name = "Hampton"
+        self.bushy.slug = "hampton"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bushy.save()
+        self.assertEqual(self.ids("bushy"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lesdougnes.delete()
+            france.delete()
+        self.assertEqual(self.ids("dougnes"), [])
+
+    def test_ignores_rolled_back_saves(self):
+        search_index.ensure_loaded()
+        self.bushy.name = "Hampton"
+        self.bushy.slug = "hampton"
+        with self.captureOnCommitCallbacks(execute=False):
+            self.bushy.save()
+
+        self.assertEqual(self.ids("bushy"), [self.bushy.id])
+
+    def test_save_and_read(self):
+        search_index.ensure_loaded()
+        search_index.save(self.path)
+
+        index = search.EventSearchIndex()
+        self.assertTrue(index.read(self.path))
+        self.assertEqual([pk for _, pk in index.search("bushy")],
+                         [self.bushy.id])
+
+    def test_read_rejects_missing_file(self):
+        index = search.EventSearchIndex()
+        self.assertFalse(index.read(self.path))
+
+        with open(self.path, "wb") as saved:
+            saved.write(b"not an index")
+        self.assertFalse(index.read(self.path))
+        self.assertFalse(index.loaded)
+
+    def test_load_does_not_save(self):
+        with override_settings(PARKRUNDATA_SEARCH_INDEX_PATH=self.path):
+            search_index.load()
+
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_reads_saved_file_and_catches_up(self):
+        search_index.build()
+        search_index.save(self.path)
+        hampton = models.Event.objects.create(
+            country=self.uk, name="Hampton", slug="hampton",
+            latitude="51.41", longitude="-0.37")
+        self.bushy.delete()
+
+        index = search.EventSearchIndex()
+        with override_settings(PARKRUNDATA_SEARCH_INDEX_PATH=self.path):
+            index.ensure_loaded()
+        self.assertEqual([pk for _, pk in index.search("bushy")], [])
+        self.assertEqual([pk for _, pk in index.search("hampton")],
+                         [hampton.id])
+
+    def test_catches_up_with_other_processes(self):
+        # Another process's copy of the index
+        index = search.EventSearchIndex()
+        index.ensure_loaded()
+        self.bushy.name = "Hampton"
+        self.bushy.slug = "hampton"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bushy.save()
+
+        self.assertEqual([pk for _, pk in index.search("hampton")],
+                         [self.bushy.id])
+
+    def test_searches_old_index_while_catching_up(self):
+        search_index.ensure_loaded()
+        search.incr_counter(search.VERSION_KEY)
+        with search_index.loading:
+            with self.assertNumQueries(0):
+                self.assertEqual(self.ids("bushy"), [self.bushy.id])
+
+    def tearDown(self):
+        search_index.invalidate()
+        shutil.rmtree(self.directory)
+
+
+class TestSearchView(TestCase):
+
+    def setUp(self):
+        search_index.invalidate()
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+        self.juniors = models.Event.objects.create(
+            country=self.uk, name="Bushy juniors", slug="bushy-juniors",
+            is_juniors=True, latitude="51.41", longitude="-0.335")
+        self.fulham = models.Event.objects.create(
+            country=self.uk, name="Fulham Palace", slug="fulhampalace",
+            latitude="51.470", longitude="-0.218")
+        self.client = APIClient()
+
+    def test_search(self):
+        response = self.client.get("/events/search/", {"q": "Fulham palace"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event["slug"] for event in response.data],
+                         ["fulhampalace"])
+        self.assertEqual(response.data[0]["score"], 1)
+        self.assertEqual(response.data[0]["name"], "Fulham Palace")
+
+    def test_ranked(self):
+        response = self.client.get("/events/search/", {"q": "bushi"})
+
+        self.assertEqual([event["slug"] for event in response.data],
+                         ["bushy", "bushy-juniors"])
+
+    def test_k(self):
+        response = self.client.get("/events/search/", {"q": "bushy", "k": 1})
+
+        self.assertEqual([event["slug"] for event in response.data],
+                         ["bushy"])
+
+    def test_filters(self):
+        response = self.client.get(
+            "/events/search/", {"q": "bushy", "is_juniors": "true"})
+
+        self.assertEqual([event["slug"] for event in response.data],
+                         ["bushy-juniors"])
+
+    def test_filters_excluding_the_best_matches(self):
+        for i in range(5):
+            models.Event.objects.create(
+                country=self.uk, name="Bushy %d" % i, slug="bushy%d" % i,
+                latitude="0", longitude="%d" % i)
+        response = self.client.get(
+            "/events/search/", {"q": "bushy", "k": 1, "is_juniors": "true"})
+
+        self.assertEqual([event["slug"] for event in response.data],
+                         ["bushy-juniors"])
+
+    def test_requires_query(self):
+        for params in [{}, {"q": ""}, {"q": "bushy", "k": "0"}]:
+            response = self.client.get("/events/search/", params)
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+    def tearDown(self):
+        search_index.invalidate()
@@ -10,10 +10,12 @@ Tests for `parkrundata` serializers module.
 
 from decimal import Decimal
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from parkrundata.models import Country, Event
-from parkrundata.serializers import CountrySerializer, EventSerializer
+from parkrundata.serializers import (
+    BulkEventSerializer, CountrySerializer, EventSerializer)
+from parkrundata.spatial import event_index
 
 
 class TestCountrySerializer(TestCase):
@@ -181,6 +183,8 @@ class TestEventSerializer(TestCase):
         self.assertCountEqual(
                 serializer.errors.keys(), ["latitude", "longitude"])
 
+    # The points near each pole are duplicates of each other
+    @override_settings(PARKRUNDATA_DUPLICATE_RADIUS_KM=None)
     def test_acceptable_long_and_lats(self):
         values = [
             ("90", "180"),
@@ -226,5 +230,133 @@ class TestEventSerializer(TestCase):
         self.assertEqual(data["longitude"], "3.140000")
         self.assertEqual(data["latitude"], "-3.140000")
 
+    def test_fields_limits_serialized_fields(self):
+        serializer = EventSerializer(instance=self.event,
+                                     fields=["id", "latitude"])
+
+        self.assertEqual(serializer.data,
+                         {"id": 1, "latitude": self.event_data["latitude"]})
+
+    def test_expand_country(self):
+        serializer = EventSerializer(instance=self.event, expand=["country"])
+
+        self.assertEqual(serializer.data["country"],
+                         {"id": self.uk.id, "name": "UK",
+                          "url": "www.parkrun.org.uk"})
+
+    def test_fields_and_expand_with_many(self):
+        serializer = EventSerializer([self.event], many=True,
+                                     fields=["country"], expand=["country"])
+
+        self.assertEqual(serializer.data[0]["country"]["name"], "UK")
+        self.assertCountEqual(serializer.data[0].keys(), ["country"])
+
     def tearDown(self):
         pass
+
+
+class TestEventSerializerDuplicates(TestCase):
+
+    def setUp(self):
+        event_index.invalidate()
+        self.uk = Country.objects.create(name="UK", url="www.parkrun.org.uk")
+        self.bushy = Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+        self.data = {
+            "country": self.uk.id,
+            "name": "Bushy Park",
+            "slug": "bushypark",
+            # About 30m from Bushy
+            "latitude": "51.409900",
+            "longitude": "-0.334300",
+        }
+
+    def test_rejects_event_near_another(self):
+        serializer = EventSerializer(data=self.data)
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors["non_field_errors"], [
+            "Within 0.1 km of Bushy (id %d), which looks like the same "
+            "event." % self.bushy.id])
+        self.assertEqual(
+            serializer.errors["non_field_errors"][0].code, "duplicate")
+
+    def test_juniors_may_share_a_venue(self):
+        self.data["is_juniors"] = True
+        serializer = EventSerializer(data=self.data)
+
+        self.assertTrue(serializer.is_valid())
+
+    def test_accepts_event_further_away(self):
+        self.data["latitude"] = "51.412"
+        serializer = EventSerializer(data=self.data)
+
+        self.assertTrue(serializer.is_valid())
+
+    @override_settings(PARKRUNDATA_DUPLICATE_RADIUS_KM=None)
+    def test_check_can_be_turned_off(self):
+        serializer = EventSerializer(data=self.data)
+
+        self.assertTrue(serializer.is_valid())
+
+    @override_settings(PARKRUNDATA_DUPLICATE_RADIUS_KM=1)
+    def test_radius_is_configurable(self):
+        self.data["latitude"] = "51.412"
+        serializer = EventSerializer(data=self.data)
+
+        self.assertFalse(serializer.is_valid())
+
+    def test_event_is_not_a_duplicate_of_itself(self):
+        serializer = EventSerializer(
+            self.bushy, data={"latitude": "51.409700"}, partial=True)
+
+        self.assertTrue(serializer.is_valid())
+
+    def test_moving_event_next_to_another(self):
+        other = Event.objects.create(
+            country=self.uk, name="Richmond", slug="richmond",
+            latitude="51.442", longitude="-0.276")
+        serializer = EventSerializer(
+            other, data={"latitude": "51.409800", "longitude": "-0.334"},
+            partial=True)
+
+        self.assertFalse(serializer.is_valid())
+
+    def test_index_follows_deletes(self):
+        self.assertFalse(EventSerializer(data=self.data).is_valid())
+        self.bushy.delete()
+
+        self.assertTrue(EventSerializer(data=self.data).is_valid())
+
+    def test_sees_events_the_index_has_not(self):
+        event_index.ensure_loaded()
+        # bulk_create() skips the signals that update the index
+        Event.objects.bulk_create([Event(
+            country=self.uk, name="Kingston", slug="kingston",
+            is_juniors=True, latitude="51.409800", longitude="-0.334100")])
+        self.data["is_juniors"] = True
+
+        self.assertFalse(EventSerializer(data=self.data).is_valid())
+
+    def test_ignores_events_moved_away_behind_the_index(self):
+        event_index.ensure_loaded()
+        Event.objects.filter(pk=self.bushy.pk).update(latitude="52")
+
+        self.assertTrue(EventSerializer(data=self.data).is_valid())
+
+    def test_across_the_antimeridian(self):
+        Event.objects.create(
+            country=self.uk, name="Taveuni", slug="taveuni",
+            latitude="-16.8", longitude="179.999700")
+        self.data.update(latitude="-16.8", longitude="-179.999700")
+
+        self.assertFalse(EventSerializer(data=self.data).is_valid())
+
+    def test_bulk_serializer_skips_check(self):
+        serializer = BulkEventSerializer(data=self.data)
+
+        self.assertTrue(serializer.is_valid())
+
+    def tearDown(self):
+        event_index.invalidate()
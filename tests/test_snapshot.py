@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_snapshot
+------------
+
+Tests for `parkrundata` snapshot module, comparing responses served from
+the snapshot with those served from the database.
+"""
+
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from rest_framework.test import APIClient
+
+from parkrundata import models, snapshot
+from parkrundata.bulk import upsert_events
+
+
+def create_events():
+    uk = models.Country.objects.create(name="UK", url="www.parkrun.org.uk")
+    france = models.Country.objects.create(
+        name="France", url="www.parkrun.fr")
+    models.Event.objects.create(
+        country=uk, name="Bushy", slug="bushy", is_juniors=True,
+        latitude="51.409694", longitude="-0.334032")
+    models.Event.objects.create(
+        country=uk, name="Richmond", slug="richmond",
+        latitude="51.442", longitude="-0.276")
+    models.Event.objects.create(
+        country=france, name="Les Dougnes", slug="lesdougnes",
+        latitude="45.066553", longitude="-0.429266")
+    return uk, france
+
+
+class TestTable(TestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+        self.uk, self.france = create_events()
+        self.snapshot = snapshot.Snapshot.build(1)
+        self.events = self.snapshot.table(models.Event)
+
+    def test_columns_match_database(self):
+        rows = self.events.rows(
+            ["id", "slug", "is_juniors", "latitude", "country__name"],
+            [0, 2])
+
+        self.assertEqual(list(rows), list(models.Event.objects.filter(
+            slug__in=["bushy", "lesdougnes"]).order_by("id").values_list(
+            "id", "slug", "is_juniors", "latitude", "country__name")))
+
+    def test_packed_columns(self):
+        self.assertEqual(self.events.columns["latitude"].data.typecode, "q")
+        self.assertEqual(self.events.columns["latitude"].get(0),
+                         Decimal("51.409694"))
+        self.assertIs(self.events.columns["is_juniors"].get(0), True)
+        self.assertIsInstance(self.events.columns["name"].data, tuple)
+
+    def test_indexes(self):
+        self.assertEqual(self.events.where(None, "country_id", self.uk.id),
+                         [0, 1])
+        self.assertEqual(self.events.where(None, "slug", "lesdougnes"), [2])
+        self.assertEqual(self.events.where([0, 1], "is_juniors", True), [0])
+
+    def test_rows_are_lazy_sequences(self):
+        rows = self.events.rows(["id", "name"], [2, 0])
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0].name, "Les Dougnes")
+        self.assertEqual([row.id for row in rows[1:]], [1])
+
+    def tearDown(self):
+        pass
+
+
+class TestSnapshotStore(TestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+        self.uk, self.france = create_events()
+        self.store = snapshot.SnapshotStore()
+
+    def test_reused_until_version_changes(self):
+        first = self.store.get()
+        self.assertIs(self.store.get(), first)
+
+        snapshot.bump_version()
+        second = self.store.get()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.version, first.version + 1)
+
+    def test_signals_bump_version(self):
+        first = self.store.get()
+        models.Event.objects.filter(slug="bushy").get().save()
+        self.assertNotEqual(self.store.get().version, first.version)
+
+        second = self.store.get()
+        models.Country.objects.create(name="USA", url="www.parkrun.us")
+        self.assertEqual(len(self.store.get().table(models.Country)), 3)
+        self.assertNotEqual(self.store.get().version, second.version)
+
+    def test_bulk_upsert_bumps_version(self):
+        first = self.store.get()
+        upsert_events([
+            {"country": self.uk.id, "name": "Kingston", "slug": "kingston",
+             "latitude": "51.4", "longitude": "-0.3"}])
+        table = self.store.get().table(models.Event)
+        self.assertNotEqual(self.store.get().version, first.version)
+        self.assertEqual(len(table), 4)
+
+    def test_evicted_version_does_not_reuse_snapshot(self):
+        first = self.store.get()
+        caches["default"].clear()
+        self.assertIsNot(self.store.get(), first)
+
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
+    def test_no_snapshot_without_cache(self):
+        self.assertIsNone(self.store.get())
+
+    @override_settings(PARKRUNDATA_SNAPSHOT=True)
+    def test_not_built_when_app_loads(self):
+        # Management commands like migrate must not query on startup
+        with self.assertNumQueries(0):
+            apps.get_app_config("parkrundata").ready()
+
+    def tearDown(self):
+        pass
+
+
+# Responses aren't cached, so that they are built every time
+@override_settings(PARKRUNDATA_SNAPSHOT=True, PARKRUNDATA_CACHE_TIMEOUT=0)
+class TestSnapshotViews(TestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+        self.uk, self.france = create_events()
+        snapshot.store.get()
+        self.client = APIClient()
+
+    def assertSameResponse(self, path, **extra):
+        with self.assertNumQueries(0):
+            actual = self.client.get(path, **extra)
+        with override_settings(PARKRUNDATA_SNAPSHOT=False):
+            expected = self.client.get(path, **extra)
+
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        for header in ("Content-Type", "ETag", "Last-Modified"):
+            self.assertEqual(actual.get(header), expected.get(header))
+        return actual
+
+    def test_same_output(self):
+        paths = [
+            "/countries/",
+            "/countries/1/",
+            "/countries/3/",
+            "/events/",
+            "/events/?page_size=1",
+            "/events/?country=1",
+            "/events/?country=1&is_juniors=false",
+            "/events/?slug=lesdougnes",
+            "/events/?name_prefix=Ri",
+            "/events/?name_prefix=ri",
+            "/events/?name_prefix=R*",
+            "/events/?is_discontinued=true",
+            "/events/?bbox=-0.4,44,0,51.5",
+            "/events/?bbox=179,-90,-0.3,90",
+            "/events/?fields=id,name&expand=country",
+            "/events/?format=geojson",
+            "/events/1/",
+            "/events/1/?fields=slug&expand=country",
+            "/events/1/?country=2",
+            "/events/99/",
+            "/events/abc/",
+            "/events/?country=uk",
+            "/events/?fields=nonsense",
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertSameResponse(path)
+
+    def test_same_output_following_cursors(self):
+        first = self.client.get("/events/?page_size=2")
+        second = self.assertSameResponse(
+            first.json()["next"].replace("http://testserver", ""))
+        self.assertEqual(len(second.json()["results"]), 1)
+
+        previous = self.assertSameResponse(
+            second.json()["previous"].replace("http://testserver", ""))
+        self.assertEqual([event["slug"] for event in previous.json()[
+            "results"]], ["bushy", "richmond"])
+
+    def test_same_output_after_delete(self):
+        models.Event.objects.filter(slug="richmond").delete()
+        snapshot.store.get()
+        self.assertSameResponse("/events/")
+
+    def test_conditional_get(self):
+        first = self.client.get("/events/")
+        with self.assertNumQueries(0):
+            second = self.client.get("/events/",
+                                     HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+
+    def test_sees_writes(self):
+        self.client.get("/events/1/")
+        models.Event.objects.filter(pk=1).update(name="Bushy Park")
+        # update() skips the signals, so the snapshot doesn't know yet
+        self.assertEqual(self.client.get("/events/1/").json()["name"],
+                         "Bushy")
+
+        event = models.Event.objects.get(pk=1)
+        event.save()
+        self.assertEqual(self.client.get("/events/1/").json()["name"],
+                         "Bushy Park")
+
+    def test_other_actions_use_database(self):
+        with self.assertNumQueries(1):
+            self.client.get("/countries/stats/")
+
+    def tearDown(self):
+        pass
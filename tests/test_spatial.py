@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_spatial
+------------
+
+Tests for `parkrundata` spatial module.
+"""
+
+from django.db import DatabaseError, transaction
+from django.test import TestCase
+
+from parkrundata import models, spatial
+from parkrundata.spatial import GridIndex, event_index, haversine
+
+
+class TestHaversine(TestCase):
+
+    def test_zero_distance(self):
+        self.assertEqual(haversine(51.5, -0.1, 51.5, -0.1), 0)
+
+    def test_known_distance(self):
+        # London to Paris is roughly 344km
+        distance = haversine(51.5074, -0.1278, 48.8566, 2.3522)
+        self.assertAlmostEqual(distance, 343.5, delta=1)
+
+    def test_antimeridian(self):
+        distance = haversine(0, 179.5, 0, -179.5)
+        self.assertAlmostEqual(distance, 111.2, delta=0.5)
+
+
+class TestGridIndex(TestCase):
+
+    def setUp(self):
+        self.index = GridIndex()
+        self.index.add("bushy", "51.409694", "-0.334032")
+        self.index.add("lesdougnes", "45.066553", "-0.429266")
+        self.index.add("neckarau", "49.448549", "8.453786")
+        self.index.add("fiji", "-18.1", "179.9")
+        self.index.add("samoa", "-13.8", "-172.0")
+
+    def test_cell_size_must_divide_180(self):
+        with self.assertRaises(ValueError):
+            GridIndex(cell_size=7)
+
+    def test_nearest_orders_by_distance(self):
+        found = self.index.nearest(51.5, -0.1, 3)
+        self.assertEqual([key for _, key in found],
+                         ["bushy", "neckarau", "lesdougnes"])
+
+    def test_nearest_with_radius(self):
+        found = self.index.nearest(51.5, -0.1, 10, radius_km=100)
+        self.assertEqual([key for _, key in found], ["bushy"])
+
+    def test_nearest_crosses_antimeridian(self):
+        found = self.index.nearest(-18.1, -179.9, 1)
+        self.assertEqual(found[0][1], "fiji")
+        self.assertLess(found[0][0], 25)
+
+    def test_nearest_near_pole(self):
+        found = self.index.nearest(89.9, 0, 1)
+        self.assertEqual(found[0][1], "bushy")
+
+    def test_nearest_returns_everything_when_k_exceeds_size(self):
+        found = self.index.nearest(0, 0, 10)
+        self.assertEqual(len(found), 5)
+
+    def test_remove(self):
+        self.index.remove("bushy")
+        self.index.remove("notthere")
+        self.assertNotIn("bushy", self.index)
+        self.assertEqual(len(self.index), 4)
+        found = self.index.nearest(51.5, -0.1, 1)
+        self.assertEqual(found[0][1], "neckarau")
+
+    def test_add_existing_key_moves_point(self):
+        self.index.add("bushy", "0", "0")
+        found = self.index.nearest(51.5, -0.1, 1)
+        self.assertEqual(found[0][1], "neckarau")
+        self.assertEqual(len(self.index), 5)
+
+    def test_matches_brute_force(self):
+        index = GridIndex(cell_size=0.5)
+        points = {}
+        for i in range(400):
+            lat = ((i * 37) % 170) - 85 + (i % 7) / 10
+            lon = ((i * 91) % 359) - 179.5
+            points[i] = (lat, lon)
+            index.add(i, lat, lon)
+
+        for lat, lon in [(0, 0), (51.4, -0.3), (-33.9, 151.2), (70, 179)]:
+            expected = sorted(
+                (haversine(lat, lon, *point), key)
+                for key, point in points.items())[:5]
+            self.assertEqual(index.nearest(lat, lon, 5), expected)
+
+    def tearDown(self):
+        pass
+
+
+class TestEventIndex(TestCase):
+
+    def setUp(self):
+        event_index.invalidate()
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+
+    def test_loads_from_database_on_first_use(self):
+        self.assertFalse(event_index.loaded)
+        found = event_index.nearest(51.4, -0.3, 1)
+        self.assertTrue(event_index.loaded)
+        self.assertEqual(found[0][1], self.bushy.id)
+
+    def test_follows_saves_and_deletes(self):
+        event_index.ensure_loaded()
+        with self.captureOnCommitCallbacks(execute=True):
+            richmond = models.Event.objects.create(
+                country=self.uk, name="Richmond", slug="richmond",
+                latitude="51.442", longitude="-0.276")
+        self.assertIn(richmond.id, event_index)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bushy.latitude = "0"
+            self.bushy.save()
+        # Its own changes don't make it load again
+        with self.assertNumQueries(0):
+            found = event_index.nearest(51.4, -0.3, 1)
+        self.assertEqual(found[0][1], richmond.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            richmond.delete()
+        self.assertNotIn(richmond.id, event_index)
+
+    def test_ignores_rolled_back_saves(self):
+        event_index.ensure_loaded()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    models.Event.objects.create(
+                        country=self.uk, name="Richmond", slug="richmond",
+                        latitude="51.442", longitude="-0.276")
+                    raise DatabaseError()
+            except DatabaseError:
+                pass
+
+        self.assertEqual(len(event_index.nearest(51.4, -0.3, 5)), 1)
+
+    def test_reloads_after_changes_in_other_processes(self):
+        event_index.ensure_loaded()
+        # Another process moves Bushy and bumps the version
+        models.Event.objects.filter(pk=self.bushy.pk).update(latitude="0")
+        spatial.incr_counter(spatial.VERSION_KEY)
+
+        found = event_index.nearest(51.4, -0.3, 1)
+        self.assertGreater(found[0][0], 5000)
+
+    def test_reloads_when_another_process_changed_first(self):
+        event_index.ensure_loaded()
+        spatial.incr_counter(spatial.VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bushy.save()
+
+        self.assertFalse(event_index.loaded)
+
+    def tearDown(self):
+        event_index.invalidate()
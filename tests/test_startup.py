@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_startup
+------------
+
+Tests for `parkrundata` views package and lazy module, checking what is
+imported by django.setup() and by resolving URLs in a fresh interpreter.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from django.test import SimpleTestCase
+
+from parkrundata import lazy, views
+
+
+def imported_after(code):
+    """
+    Runs `code` after django.setup() in a new interpreter, and returns the
+    modules imported by then.
+    """
+    script = (
+        "import json, sys, django\n"
+        "django.setup()\n"
+        "%s\n"
+        "json.dump(sorted(sys.modules), sys.stdout)\n" % code)
+    process = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True,
+        check=True,
+        env=dict(os.environ, DJANGO_SETTINGS_MODULE="tests.settings"))
+    return set(json.loads(process.stdout))
+
+
+class TestStartupImports(SimpleTestCase):
+
+    def test_setup_does_not_import_views_or_drf(self):
+        modules = imported_after("")
+
+        self.assertNotIn("parkrundata.views", modules)
+        self.assertNotIn("rest_framework.viewsets", modules)
+        self.assertNotIn("rest_framework.response", modules)
+
+    def test_resolving_imports_only_the_viewset_used(self):
+        modules = imported_after(
+            "from django.urls import resolve\n"
+            "resolve('/countries/1/')")
+
+        self.assertIn("parkrundata.views.countries", modules)
+        self.assertNotIn("parkrundata.views.events", modules)
+
+    def test_metrics_does_not_import_drf(self):
+        modules = imported_after(
+            "from django.urls import resolve\n"
+            "resolve('/metrics/')")
+
+        self.assertNotIn("rest_framework.viewsets", modules)
+
+    def tearDown(self):
+        pass
+
+
+class TestLazy(SimpleTestCase):
+
+    def test_urlconf_is_built_once(self):
+        calls = []
+        urlconf = lazy.LazyURLConf(lambda: calls.append(1) or [])
+
+        self.assertEqual(urlconf.urlpatterns, [])
+        self.assertEqual(urlconf.urlpatterns, [])
+        self.assertEqual(calls, [1])
+
+    def test_views_attributes(self):
+        from parkrundata.views.events import EventViewSet
+
+        self.assertIs(views.EventViewSet, EventViewSet)
+        with self.assertRaises(AttributeError):
+            views.PlaceViewSet
+
+    def tearDown(self):
+        pass
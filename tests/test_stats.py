@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_stats
+------------
+
+Tests for `parkrundata` stats module and the countries stats endpoint.
+"""
+
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from parkrundata import models, stats
+from parkrundata.bulk import upsert_events
+
+
+class TestCountryEventStats(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.france = models.Country.objects.create(
+            name="France", url="www.parkrun.fr")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+        self.juniors = models.Event.objects.create(
+            country=self.uk, name="Bushy juniors", slug="bushy-juniors",
+            is_juniors=True, is_restricted=True,
+            latitude="51.409694", longitude="-0.334032")
+
+    def counts(self, country):
+        row = models.CountryEventStats.objects.get(country=country)
+        return [row.total, row.juniors, row.restricted, row.discontinued]
+
+    def assertMatchesRebuild(self):
+        incremental = {country.id: self.counts(country)
+                       for country in models.Country.objects.all()}
+        stats.rebuild()
+        self.assertEqual(incremental,
+                         {country.id: self.counts(country)
+                          for country in models.Country.objects.all()})
+
+    def test_new_country_starts_at_zero(self):
+        self.assertEqual(self.counts(self.france), [0, 0, 0, 0])
+
+    def test_created_events_are_counted(self):
+        self.assertEqual(self.counts(self.uk), [2, 1, 1, 0])
+        self.assertMatchesRebuild()
+
+    def test_changed_flags_are_counted(self):
+        self.bushy.is_discontinued = True
+        self.bushy.save()
+        self.juniors.is_restricted = False
+        self.juniors.save()
+
+        self.assertEqual(self.counts(self.uk), [2, 1, 0, 1])
+        self.assertMatchesRebuild()
+
+    def test_saving_without_changes_keeps_counts(self):
+        self.bushy.save()
+        self.bushy.save()
+
+        self.assertEqual(self.counts(self.uk), [2, 1, 1, 0])
+
+    def test_moving_country(self):
+        self.juniors.country = self.france
+        self.juniors.save()
+
+        self.assertEqual(self.counts(self.uk), [1, 0, 0, 0])
+        self.assertEqual(self.counts(self.france), [1, 1, 1, 0])
+        self.assertMatchesRebuild()
+
+    def test_deleted_events_are_uncounted(self):
+        self.juniors.delete()
+
+        self.assertEqual(self.counts(self.uk), [1, 0, 0, 0])
+        self.assertMatchesRebuild()
+
+    def test_deleting_queryset(self):
+        models.Event.objects.filter(country=self.uk).delete()
+
+        self.assertEqual(self.counts(self.uk), [0, 0, 0, 0])
+
+    def test_bulk_upsert(self):
+        upsert_events([
+            {"country": self.uk.id, "name": "Bushy", "slug": "bushy",
+             "is_discontinued": True, "latitude": "51.409694",
+             "longitude": "-0.334032"},
+            {"country": self.france.id, "name": "Les Dougnes",
+             "slug": "lesdougnes", "is_juniors": True,
+             "latitude": "45.066553", "longitude": "-0.429266"},
+        ])
+
+        self.assertEqual(self.counts(self.uk), [2, 1, 1, 1])
+        self.assertEqual(self.counts(self.france), [1, 1, 0, 0])
+        self.assertMatchesRebuild()
+
+    def test_rebuild_fixes_drift(self):
+        models.CountryEventStats.objects.filter(country=self.uk).update(
+            total=99)
+        models.CountryEventStats.objects.filter(country=self.france).delete()
+
+        self.assertEqual(stats.rebuild(), 2)
+
+        self.assertEqual(self.counts(self.uk), [2, 1, 1, 0])
+        self.assertEqual(self.counts(self.france), [0, 0, 0, 0])
+
+    def tearDown(self):
+        pass
+
+
+class TestCountryStatsEndpoint(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.france = models.Country.objects.create(
+            name="France", url="www.parkrun.fr")
+        models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy", is_juniors=True,
+            latitude="51.409694", longitude="-0.334032")
+        self.client = APIClient()
+
+    def test_stats(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/countries/stats/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {"country": self.uk.id, "total": 1, "juniors": 1,
+             "restricted": 0, "discontinued": 0},
+            {"country": self.france.id, "total": 0, "juniors": 0,
+             "restricted": 0, "discontinued": 0},
+        ])
+
+    def tearDown(self):
+        pass
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_tiles
+------------
+
+Tests for `parkrundata` tiles module.
+"""
+
+import json
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from parkrundata import models
+from parkrundata.tiles import MAX_LATITUDE, cluster, tile_bounds
+
+
+class TestTileBounds(TestCase):
+
+    def test_world_tile(self):
+        self.assertEqual(tile_bounds(0, 0, 0), (-180, -90, 180, 90))
+
+    def test_inner_tile(self):
+        min_lon, min_lat, max_lon, max_lat = tile_bounds(2, 1, 1)
+        self.assertEqual((min_lon, max_lon), (-90, 0))
+        self.assertAlmostEqual(min_lat, 0)
+        self.assertAlmostEqual(max_lat, 66.51326, places=5)
+
+    def test_max_latitude(self):
+        self.assertAlmostEqual(MAX_LATITUDE, 85.051129, places=6)
+
+    def test_invalid_tiles(self):
+        for z, x, y in [(1, 2, 0), (1, 0, 2), (23, 0, 0)]:
+            with self.assertRaises(ValueError):
+                tile_bounds(z, x, y)
+
+    def tearDown(self):
+        pass
+
+
+class TestCluster(TestCase):
+
+    def test_merges_points_in_the_same_cell(self):
+        rows = [(1, "51.4", "-0.3", "Bushy", "bushy"),
+                (2, "51.5", "-0.2", "Richmond", "richmond"),
+                (3, "-33.9", "151.2", "Sydney", "sydney")]
+
+        collection = cluster(rows, 0, 0, 0)
+
+        self.assertEqual(collection["type"], "FeatureCollection")
+        london, sydney = collection["features"]
+        self.assertEqual(london["properties"], {"count": 2})
+        self.assertEqual(london["geometry"]["coordinates"], [-0.25, 51.45])
+        self.assertNotIn("id", london)
+        self.assertEqual(sydney["id"], 3)
+        self.assertEqual(sydney["properties"],
+                         {"count": 1, "name": "Sydney", "slug": "sydney"})
+
+    def test_splits_clusters_at_higher_zoom(self):
+        rows = [(1, "51.4", "-0.3", "Bushy", "bushy"),
+                (2, "51.5", "-0.2", "Richmond", "richmond")]
+
+        collection = cluster(rows, 12, 2044, 1362)
+
+        self.assertEqual(len(collection["features"]), 2)
+
+    def test_keeps_polar_points(self):
+        collection = cluster([(1, "89.9", "0", "Pole", "pole")], 0, 0, 0)
+        self.assertEqual(len(collection["features"]), 1)
+
+    def tearDown(self):
+        pass
+
+
+class TestTileEndpoint(TestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy",
+            latitude="51.409694", longitude="-0.334032")
+        models.Event.objects.create(
+            country=self.uk, name="Richmond", slug="richmond",
+            latitude="51.442", longitude="-0.276", is_juniors=True)
+        self.client = APIClient()
+
+    def get_tile(self, z, x, y, **params):
+        response = self.client.get(
+            "/events/tiles/%d/%d/%d/" % (z, x, y), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/geo+json")
+        return response, json.loads(response.content.decode())
+
+    def test_world_tile_is_clustered(self):
+        _, content = self.get_tile(0, 0, 0)
+        self.assertEqual(len(content["features"]), 1)
+        self.assertEqual(content["features"][0]["properties"]["count"], 2)
+
+    def test_tile_without_events(self):
+        _, content = self.get_tile(1, 1, 1)
+        self.assertEqual(content["features"], [])
+
+    def test_filters_apply(self):
+        _, content = self.get_tile(0, 0, 0, is_juniors="true")
+        self.assertEqual(content["features"][0]["properties"]["slug"],
+                         "richmond")
+
+    def test_tile_is_cached_until_events_change(self):
+        first, _ = self.get_tile(0, 0, 0)
+        second, _ = self.get_tile(0, 0, 0)
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+
+        models.Event.objects.create(
+            country=self.uk, name="Sydney", slug="sydney",
+            latitude="-33.9", longitude="151.2")
+        third, content = self.get_tile(0, 0, 0)
+        self.assertEqual(third["X-Cache"], "MISS")
+        self.assertEqual(len(content["features"]), 2)
+
+    def test_event_on_tile_edges_is_in_one_tile(self):
+        models.Event.objects.create(
+            country=self.uk, name="Null Island", slug="nullisland",
+            latitude="0", longitude="0")
+        found = []
+        for x, y in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+            _, content = self.get_tile(1, x, y)
+            found += [(x, y) for feature in content["features"]
+                      if feature["properties"].get("slug") == "nullisland"]
+        self.assertEqual(found, [(1, 0)])
+
+    def test_events_on_map_edges_are_kept(self):
+        models.Event.objects.create(
+            country=self.uk, name="East", slug="east",
+            latitude="90", longitude="180")
+        _, content = self.get_tile(1, 1, 0)
+        self.assertIn("east", [feature["properties"].get("slug")
+                               for feature in content["features"]])
+
+    def test_missing_tile_gets_404(self):
+        response = self.client.get("/events/tiles/1/2/0/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_events_list_as_geojson(self):
+        response = self.client.get("/events/", {"format": "geojson"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = json.loads(response.content.decode())
+        self.assertEqual(content["type"], "FeatureCollection")
+        self.assertEqual(content["features"][0]["geometry"]["coordinates"],
+                         [-0.334032, 51.409694])
+
+    def test_only_events_are_rendered_as_geojson(self):
+        for path in ["/events/changes/", "/events/search/?q=bushy"]:
+            response = self.client.get(
+                path, HTTP_ACCEPT="application/geo+json")
+            self.assertEqual(response.status_code,
+                             status.HTTP_406_NOT_ACCEPTABLE)
+
+    def test_event_detail_as_geojson(self):
+        response = self.client.get(
+            "/events/1/", HTTP_ACCEPT="application/geo+json")
+        content = json.loads(response.content.decode())
+        self.assertEqual(content["type"], "Feature")
+        self.assertEqual(content["properties"]["slug"], "bushy")
+
+    def tearDown(self):
+        pass
@@ -53,7 +53,7 @@ class TestCountryURLs(TestCase):
         response = self.client.get("/countries/")
         countries_data = [
             self.uk_data, self.france_data, self.germany_data]
-        self.assertCountEqual(response.data, countries_data)
+        self.assertCountEqual(response.data["results"], countries_data)
 
     def test_post_to_country_list_gets_403(self):
         response = self.client.post(
@@ -141,7 +141,7 @@ class TestEventURLs(TestCase):
         response = self.client.get("/events/")
         parkruns_data = [
             self.bushy_data, self.lesdougnes_data, self.neckarau_data]
-        self.assertCountEqual(response.data, parkruns_data)
+        self.assertCountEqual(response.data["results"], parkruns_data)
 
     def test_post_to_event_list_gets_403(self):
         response = self.client.post(
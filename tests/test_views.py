@@ -17,6 +17,7 @@ from rest_framework import status
 from rest_framework.test import APIRequestFactory, APITestCase
 
 from parkrundata import models, views
+from parkrundata.spatial import event_index
 
 
 User = get_user_model()
@@ -215,6 +216,45 @@ class TestEventViewSetWithoutAuthentication(TestEventViewSetBase):
         response = self.client.delete("/events/1/")
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_nearest_events(self):
+        event_index.invalidate()
+        response = self.client.get(
+            "/events/nearest/", {"lat": "50.0", "lon": "7.0", "k": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e["slug"] for e in response.data],
+                         ["neckarau", "bushy"])
+        self.assertAlmostEqual(response.data[0]["distance_km"], 121.2,
+                               delta=0.5)
+
+    def test_nearest_events_within_radius(self):
+        event_index.invalidate()
+        response = self.client.get(
+            "/events/nearest/",
+            {"lat": "51.4", "lon": "-0.3", "radius_km": "10"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e["slug"] for e in response.data], ["bushy"])
+
+    def test_nearest_events_filtered(self):
+        # More excluded events nearby than the first lookup asks for
+        for i in range(5):
+            models.Event.objects.create(
+                country=self.germany, name="Neckarau juniors %d" % i,
+                slug="neckarau-juniors-%d" % i, is_juniors=True,
+                latitude="49.45", longitude="8.45%d" % i)
+        event_index.invalidate()
+        response = self.client.get(
+            "/events/nearest/",
+            {"lat": "49.45", "lon": "8.45", "k": 1, "is_juniors": "false"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e["slug"] for e in response.data], ["neckarau"])
+
+    def test_nearest_events_requires_valid_coordinates(self):
+        for params in [{}, {"lat": "91", "lon": "0"},
+                       {"lat": "0", "lon": "0", "k": "0"}]:
+            response = self.client.get("/events/nearest/", params)
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
 
 class TestEventViewSetWithAuthentication(TestEventViewSetBase):
     """
@@ -245,6 +285,20 @@ class TestEventViewSetWithAuthentication(TestEventViewSetBase):
         self.assertEqual(new_event.latitude, Decimal("1.234567"))
         self.assertEqual(new_event.longitude, Decimal("-1.234567"))
 
+    def test_cannot_create_duplicate_event(self):
+        event_index.invalidate()
+        response = self.client.post("/events/", {
+            "country": self.uk.id,
+            "name": "Bushy Park",
+            "slug": "bushypark",
+            "latitude": "51.409700",
+            "longitude": "-0.334000"
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("non_field_errors", response.data)
+        self.assertFalse(
+            models.Event.objects.filter(slug="bushypark").exists())
+
     def test_modify_event(self):
         data = {
             "country": self.germany.id,
@@ -285,3 +339,50 @@ class TestEventViewSetWithAuthentication(TestEventViewSetBase):
 
         with self.assertRaises(models.Event.DoesNotExist):
             models.Event.objects.get(id=1)
+
+
+class TestCountryEventViewSet(TestEventViewSetBase):
+
+    def test_retrieve_event_by_slug(self):
+        response = self.client.get("/countries/%d/events/bushy/" %
+                                   self.uk.id)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(),
+                         self.client.get("/events/1/").json())
+
+    def test_slug_in_other_country_raises_404(self):
+        response = self.client.get("/countries/%d/events/bushy/" %
+                                   self.france.id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_country_events(self):
+        response = self.client.get("/countries/%d/events/" % self.france.id)
+        self.assertEqual([event["slug"] for event in response.json()[
+            "results"]], ["lesdougnes"])
+
+    def test_cannot_modify_event(self):
+        self.client.force_authenticate(
+            user=User.objects.create(username="test"))
+        response = self.client.delete("/countries/%d/events/bushy/" %
+                                      self.uk.id)
+        self.assertEqual(response.status_code,
+                         status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_cannot_modify_event_unless_authenticated(self):
+        response = self.client.delete("/countries/%d/events/bushy/" %
+                                      self.uk.id)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_lookup_is_one_indexed_query(self):
+        from django.db import connection
+
+        path = "/countries/%d/events/bushy/" % self.uk.id
+        with self.assertNumQueries(2) as queries:
+            self.client.get(path, HTTP_ACCEPT="application/json")
+        # The validators, then the row, both searching on (country, slug)
+        if connection.vendor == "sqlite":
+            for query in queries:
+                plan = connection.cursor().execute(
+                    "EXPLAIN QUERY PLAN " + query["sql"]).fetchall()
+                self.assertIn("(country_id=? AND slug=?)", plan[0][-1])
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_wire
+------------
+
+Tests for `parkrundata` wire module and the binary renderers and parsers.
+"""
+
+import json
+import unittest
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from parkrundata import models, wire
+from parkrundata.serializers import EventSerializer
+
+
+BINARY = "application/vnd.parkrundata.event"
+MSGPACK = "application/msgpack"
+
+
+class TestCoordinates(TestCase):
+
+    def test_microdegrees_round_trip(self):
+        for value in ["51.409694", "-0.334032", "90.000000", "-180",
+                      "0.000001", "0"]:
+            encoded = wire.to_microdegrees(value)
+            self.assertIsInstance(encoded, int)
+            self.assertEqual(wire.from_microdegrees(encoded), Decimal(value))
+
+    def test_coordinates_fit_int32(self):
+        self.assertEqual(wire.to_microdegrees("-180"), -180000000)
+        self.assertLess(wire.to_microdegrees("180"), 2 ** 31)
+
+    def tearDown(self):
+        pass
+
+
+class TestEncodeEvents(TestCase):
+
+    def setUp(self):
+        self.event = {
+            "id": 1, "country": 2, "name": "Bushy", "slug": "bushy",
+            "is_juniors": False, "is_restricted": True,
+            "is_discontinued": False, "latitude": "51.409694",
+            "longitude": "-0.334032",
+        }
+
+    def decoded(self, **changes):
+        event = dict(self.event, **changes)
+        event["latitude"] = Decimal(event["latitude"])
+        event["longitude"] = Decimal(event["longitude"])
+        return event
+
+    def test_single_event_round_trip(self):
+        content = wire.encode_events(self.event)
+        self.assertEqual(wire.decode_events(content), self.decoded())
+
+    def test_page_round_trip(self):
+        page = {"next": "http://testserver/events/?cursor=x",
+                "previous": None, "results": [self.event, self.event]}
+
+        decoded = wire.decode_events(wire.encode_events(page))
+
+        self.assertEqual(decoded["next"], page["next"])
+        self.assertIsNone(decoded["previous"])
+        self.assertEqual(decoded["results"], [self.decoded()] * 2)
+
+    def test_list_round_trip(self):
+        self.assertEqual(wire.decode_events(wire.encode_events([])), [])
+
+    def test_sparse_fields(self):
+        event = {"id": 1, "is_juniors": True, "latitude": "1.5"}
+
+        decoded = wire.decode_events(wire.encode_events(event))
+
+        self.assertEqual(decoded, {"id": 1, "is_juniors": True,
+                                   "latitude": Decimal("1.5")})
+
+    def test_expanded_country_is_sent_as_id(self):
+        content = wire.encode_events(
+            dict(self.event, country={"id": 2, "name": "UK"}))
+        self.assertEqual(wire.decode_events(content)["country"], 2)
+
+    def test_smaller_than_json(self):
+        content = wire.encode_events([self.event] * 100)
+        self.assertLess(len(content),
+                        len(json.dumps([self.event] * 100)) / 3)
+
+    def test_only_events_are_encoded(self):
+        for data in [{"changed": [], "deleted": [], "token": "x"},
+                     [{"status": "created"}], [self.event, "bushy"],
+                     {"results": [{"detail": "Not found."}]}]:
+            with self.assertRaises(wire.WireFormatError):
+                wire.encode_events(data)
+
+    def test_malformed_payloads(self):
+        content = wire.encode_events([self.event])
+        for payload in [b"", b"JUNK" + content[4:], content[:-1],
+                        content + b"\0"]:
+            with self.assertRaises(wire.WireFormatError):
+                wire.decode_events(payload)
+
+    def tearDown(self):
+        pass
+
+
+class TestWireFormatsAPI(TestCase):
+
+    def setUp(self):
+        self.uk = models.Country.objects.create(
+            name="UK", url="www.parkrun.org.uk")
+        self.bushy = models.Event.objects.create(
+            country=self.uk, name="Bushy", slug="bushy", is_juniors=True,
+            latitude="51.409694", longitude="-0.334032")
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(username="user")
+        self.new_event = {
+            "country": self.uk.id, "name": "Crane Park",
+            "slug": "cranepark", "is_juniors": False,
+            "is_restricted": False, "is_discontinued": False,
+            "latitude": Decimal("51.443000"), "longitude": Decimal("-0.377"),
+        }
+
+    def test_binary_list(self):
+        response = self.client.get("/events/", HTTP_ACCEPT=BINARY)
+
+        self.assertEqual(response["Content-Type"], BINARY)
+        decoded = wire.decode_events(response.content)
+        self.assertEqual(
+            decoded["results"],
+            [dict(EventSerializer(self.bushy).data,
+                  latitude=Decimal("51.409694"),
+                  longitude=Decimal("-0.334032"))])
+
+    def test_binary_create_round_trips_through_serializer(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(
+            "/events/", wire.encode_events(self.new_event),
+            content_type=BINARY, HTTP_ACCEPT=BINARY)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        created = wire.decode_events(response.content)
+        self.assertEqual(created, dict(self.new_event, id=created["id"]))
+
+    def test_binary_is_only_offered_for_events(self):
+        response = self.client.get("/events/changes/", HTTP_ACCEPT=BINARY)
+
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+    def test_binary_error_is_json(self):
+        response = self.client.get("/events/", {"country": "uk"},
+                                   HTTP_ACCEPT=BINARY)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("country", json.loads(response.content.decode()))
+
+    def test_malformed_binary_gets_400(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post("/events/", b"junk",
+                                    content_type=BINARY)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @unittest.skipIf(wire.msgpack is None, "msgpack is not installed")
+    def test_msgpack_detail(self):
+        response = self.client.get("/events/%d/" % self.bushy.id,
+                                   HTTP_ACCEPT=MSGPACK)
+
+        self.assertEqual(response["Content-Type"], MSGPACK)
+        content = wire.msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(content["latitude"], 51409694)
+        self.assertEqual(content["longitude"], -334032)
+        self.assertEqual(content["name"], "Bushy")
+
+    @unittest.skipIf(wire.msgpack is None, "msgpack is not installed")
+    def test_msgpack_create_round_trips_through_serializer(self):
+        self.client.force_authenticate(user=self.user)
+        content = wire.msgpack.packb(wire.encode_coordinates(self.new_event))
+
+        response = self.client.post("/events/", content,
+                                    content_type=MSGPACK,
+                                    HTTP_ACCEPT=MSGPACK)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        created = wire.decode_coordinates(
+            wire.msgpack.unpackb(response.content, raw=False))
+        self.assertEqual(created, dict(self.new_event, id=created["id"]))
+
+    @unittest.skipIf(wire.msgpack is None, "msgpack is not installed")
+    def test_msgpack_countries(self):
+        response = self.client.get("/countries/", HTTP_ACCEPT=MSGPACK)
+
+        content = wire.msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(content["results"][0]["name"], "UK")
+
+    def tearDown(self):
+        pass
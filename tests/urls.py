@@ -1,9 +1,10 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals, absolute_import
 
-from django.conf.urls import url, include
+from django.urls import include, path
 
 
 urlpatterns = [
-    url(r'^', include('parkrundata.urls', namespace='parkrundata')),
+    path('', include('parkrundata.urls', namespace='parkrundata')),
+    path('', include('parkrundata.metrics_urls')),
 ]